@@ -1,15 +1,19 @@
 import streamlit as st
-import requests
-import base64
+import os
+import sys
+import tempfile
 import threading
 import time
 import sounddevice as sd
 import wavio
 import cv2
-import streamlit.components.v1 as components
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend"))
+import client  # noqa: E402  (shared with frontend/app.py)
 
 # Flask API URL
-API_URL = "http://localhost:5000"
+API_URL = client.API_URL
+RESULTS_PAGE_SIZE = 20  # saved results shown per page
 
 # -------------------- SESSION STATE --------------------
 if "recording_audio" not in st.session_state:
@@ -27,16 +31,8 @@ with st.expander("📁 Upload Audio or Video File", expanded=True):
     upload_option = st.radio("Select file type to upload", ("Audio", "Video"))
     uploaded_file = st.file_uploader(f"Upload an {upload_option.lower()} file", 
                                     type=["mp3", "wav", "m4a"] if upload_option == "Audio" else ["mp4", "mov"])
-    if uploaded_file:
-        file_bytes = uploaded_file.read()
-        b64_audio = base64.b64encode(file_bytes).decode()
-        if upload_option == "Audio":
-            audio_html = f"""
-            <audio controls>
-                <source src="data:audio/wav;base64,{b64_audio}" type="audio/wav">
-            </audio>
-            """
-            components.html(audio_html, height=70)
+    if uploaded_file and upload_option == "Audio":
+        st.audio(uploaded_file)
 
 # -------------------- RECORDING SECTION --------------------
 with st.expander("🎧 Live Recording", expanded=True):
@@ -53,11 +49,11 @@ with st.expander("🎧 Live Recording", expanded=True):
                     st.session_state["status"] = "Recording audio..."
                     recording = sd.rec(int(duration * fs), samplerate=fs, channels=1)
                     sd.wait()
-                    wavio.write("temp_audio.wav", recording, fs, sampwidth=2)
-                    with open("temp_audio.wav", "rb") as f:
-                        audio_bytes = f.read()
-                    st.session_state["audio_bytes"] = audio_bytes.hex()
-                    os.remove("temp_audio.wav")
+                    # Kept on disk and streamed to the backend when analyzed
+                    audio_path = tempfile.NamedTemporaryFile(prefix="truthscan_", suffix=".wav", delete=False).name
+                    wavio.write(audio_path, recording, fs, sampwidth=2)
+                    client.discard_recording(st.session_state.get("audio_path"))  # the previous recording
+                    st.session_state["audio_path"] = audio_path
                     st.session_state["recording_audio"] = False
                     st.session_state["status"] = "Recording complete."
                 threading.Thread(target=record_audio).start()
@@ -75,7 +71,8 @@ with st.expander("🎧 Live Recording", expanded=True):
                 def record_video():
                     cap = cv2.VideoCapture(0)
                     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    out = cv2.VideoWriter("temp_video.mp4", fourcc, 20.0, (640, 480))
+                    video_path = tempfile.NamedTemporaryFile(prefix="truthscan_", suffix=".mp4", delete=False).name
+                    out = cv2.VideoWriter(video_path, fourcc, 20.0, (640, 480))
                     st.session_state["status"] = "Recording video..."
                     start_time = time.time()
                     while time.time() - start_time < 10:
@@ -85,10 +82,8 @@ with st.expander("🎧 Live Recording", expanded=True):
                         out.write(frame)
                     cap.release()
                     out.release()
-                    with open("temp_video.mp4", "rb") as f:
-                        video_bytes = f.read()
-                    st.session_state["video_bytes"] = video_bytes.hex()
-                    os.remove("temp_video.mp4")
+                    client.discard_recording(st.session_state.get("video_path"))  # the previous recording
+                    st.session_state["video_path"] = video_path
                     st.session_state["recording_video"] = False
                     st.session_state["status"] = "Recording complete."
                 threading.Thread(target=record_video).start()
@@ -105,20 +100,22 @@ with st.expander("🧠 Analysis Settings", expanded=True):
 
 if st.button("🧠 Analyze"):
     with st.spinner("Analyzing..."):
-        data = {"context": context, "threshold": threshold}
-        if "audio_bytes" in st.session_state:
-            data["audio_bytes"] = st.session_state["audio_bytes"]
-        elif "video_bytes" in st.session_state:
-            data["video_bytes"] = st.session_state["video_bytes"]
+        if "audio_path" in st.session_state:
+            source, file_type = st.session_state["audio_path"], "audio"
+        elif "video_path" in st.session_state:
+            source, file_type = st.session_state["video_path"], "video"
         elif uploaded_file:
-            data["audio_bytes" if upload_option == "Audio" else "video_bytes"] = file_bytes.hex()
+            uploaded_file.seek(0)
+            source, file_type = uploaded_file, upload_option.lower()
         else:
             st.warning("⚠️ No file or recording available.")
             st.stop()
 
-        response = requests.post(f"{API_URL}/analyze", json=data)
-        if response.status_code == 200:
-            st.session_state["analysis_result"] = response.json()
+        try:
+            st.session_state["analysis_result"] = client.analyze(source, file_type, context, threshold, api_url=API_URL)
+        except client.ApiError as e:
+            st.error(f"⚠️ Analysis failed: {e}")
+        else:
             result = st.session_state["analysis_result"]
             st.subheader("📊 Analysis Result")
             st.markdown(f"**Transcription:**\n\n{result['transcription']}")
@@ -128,23 +125,28 @@ if st.button("🧠 Analyze"):
             st.markdown(f"**Probabilities:** Real (Human-Created) - {result['human_prob']}% | Fake (AI-Generated) - {result['ai_prob']}%")
             st.markdown(f"**Justification:**\n\n{result['justification']}")
             st.success("✅ Results saved to database!")
-        else:
-            st.error(f"⚠️ Analysis failed: {response.json().get('error')}")
 
 # -------------------- VIEW SAVED RESULTS --------------------
 with st.expander("📂 View Saved Results"):
-    response = requests.get(f"{API_URL}/results")
-    if response.status_code == 200:
-        results = response.json()
-        for row in results:
+    try:
+        page = client.get_results(st.session_state.get("results_cursor"), RESULTS_PAGE_SIZE, api_url=API_URL)
+    except client.ApiError:
+        st.error("⚠️ Could not retrieve saved results.")
+    else:
+        for row in page["results"]:
             st.markdown(f"**ID:** {row['id']} | **Timestamp:** {row['timestamp']}")
             st.markdown(f"**Transcription:** {row['transcription']}")
             st.markdown(f"**Classification:** {row['classification']}")
             st.markdown(f"**Probabilities:** Real - {row['human_prob']}% | Fake - {row['ai_prob']}%")
             st.markdown(f"**Justification:** {row['justification']}")
             st.markdown("---")
-    else:
-        st.error("⚠️ Could not retrieve saved results.")
+        col1, col2 = st.columns(2)
+        if st.session_state.get("results_cursor") and col1.button("⬅️ Newest results"):
+            st.session_state["results_cursor"] = None
+            st.rerun()
+        if page["next_cursor"] and col2.button("Older results ➡️"):
+            st.session_state["results_cursor"] = page["next_cursor"]
+            st.rerun()
 
 # -------------------- DISCLAIMER --------------------
 st.markdown("---")
@@ -1,108 +1,99 @@
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import google.generativeai as genai
-import speech_recognition as sr
-import cv2
 import numpy as np
-import mediapipe as mp
-import re
+import json
 import sqlite3
 import os
-import ffmpeg
-from io import BytesIO
+import threading
 import time
+import zipfile
+
+import metrics
+import storage
+from gaze import extract_gaze_series, GAZE_TARGET_FPS, GAZE_FRAME_STRIDE, GAZE_MAX_SIDE, warm_up as warm_up_gaze
+from gaze_features import GazeSeriesStore, gaze_report, THRESHOLDS as GAZE_THRESHOLDS, GAZE_AWAY_OFFSET
+from pipeline import Stage, StageError, run_stages
+from jobs import JobQueue, QueueFull
+from linguistic import count_filler_words, classify_locally
+from cache import ResultCache, file_sha256, gaze_key, analysis_key
+from transcription import transcribe_segmented, warm_up as warm_up_transcription
+from batch import BatchRunner, BatchBusy, collect_uploads
+from queries import results_page_query, results_export_query, encode_cursor, search_query
+from export import export_stream, parquet_available, EXPORT_FORMATS
+from media import decode_audio, stream_sha256, spool_upload, is_mp4_family, MediaError, SpoolFile, SAMPLE_RATE
+from uploads import UploadRequest, UploadStore, UploadNotFound, UploadConflict, UploadTooLarge
+from similarity import SimilarityIndex
+from live import run_session, LIVE_MAX_SESSIONS
+from llm import LLMClient, LLMUnavailable, VERDICT_SCHEMA, BATCH_SCHEMA
+
+try:
+    from flask_sock import Sock
+except ImportError:  # optional: /live is only served when flask-sock is installed
+    Sock = None
 
 app = Flask(__name__)
+app.request_class = UploadRequest  # multipart files are spooled and hashed while the body is parsed
 CORS(app)  # Enable CORS to allow requests from Streamlit (or other frontends)
 
 # -------------------- CONFIGURATION --------------------
 GOOGLE_API_KEY = "api_key"  # Replace with your actual Google API key
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel('gemini-1.5-pro')
-
-# MediaPipe setup for gaze tracking
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.5)
-
-# Database setup (SQLite)
-def init_db():
-    conn = sqlite3.connect("analysis_results.db")
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS results
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  transcription TEXT,
-                  classification TEXT,
-                  human_prob REAL,
-                  ai_prob REAL,
-                  justification TEXT,
-                  timestamp TEXT)''')
-    conn.commit()
-    return conn
+GEMINI_MODEL = 'gemini-1.5-pro'
+
+# Process role: "all" serves HTTP and runs queued jobs; "api" only serves HTTP (analyzers
+# still load on first use if /analyze is called); "worker" only runs queued jobs (worker.py)
+BACKEND_ROLE = os.environ.get("BACKEND_ROLE", "all")
+# Load Gemini, OpenCV/MediaPipe and the speech client at startup instead of on first use
+PRELOAD_ANALYZERS = os.environ.get("PRELOAD_ANALYZERS", "0") == "1"
+
+model = None  # built by get_model(); benchmarks may assign a stand-in
+_model_lock = threading.Lock()
+
+def get_model():
+    """The Gemini model, configured on first use (importing the SDK takes seconds)."""
+    global model
+    with _model_lock:
+        if model is None:
+            import google.generativeai as genai
+            genai.configure(api_key=GOOGLE_API_KEY)
+            model = genai.GenerativeModel(GEMINI_MODEL)
+        return model
+
+# Every Gemini call goes through here: JSON replies, retries, concurrency cap, circuit breaker
+llm_client = LLMClient(model=get_model)
+
+# Database setup (SQLite): pooled connections, schema migrations applied once at startup
+storage.pool.migrate()
+
+# Near-duplicate lookup: MinHash signatures are stored alongside each inserted result
+similarity_index = SimilarityIndex(connect=storage.connect)
+if BACKEND_ROLE != "api":
+    similarity_index.start()
+result_writer = (storage.WriteBehindBuffer(storage.pool, storage.RESULTS_INSERT, after_insert=similarity_index.store_inserted)
+                 if storage.WRITE_BEHIND else None)
+
+# Cache of transcripts, gaze reports and Gemini analyses keyed by upload hash
+result_cache = ResultCache(connect=storage.connect)
+upload_store = UploadStore()  # resumable uploads (/uploads)
+gaze_store = GazeSeriesStore(connect=storage.connect)
 
 # -------------------- PREPROCESSING FUNCTIONS --------------------
-def count_filler_words(transcription):
-    """Count filler words typical in human speech."""
-    filler_words = ["um", "uh", "like", "you know", "er", "well"]
-    pattern = r'\b(' + '|'.join(filler_words) + r')\b'
-    return len(re.findall(pattern, transcription.lower(), re.IGNORECASE))
-
 def extract_audio_from_video(video_path):
-    """Extract audio from a video file and return as bytes."""
-    output_audio_path = "temp_audio.wav"
-    try:
-        ffmpeg.input(video_path).output(output_audio_path, format='wav').run(overwrite_output=True, quiet=True)
-        with open(output_audio_path, "rb") as f:
-            audio_bytes = f.read()
-        os.remove(output_audio_path)
-        return audio_bytes
-    except Exception as e:
+    """Extract the audio track of a video file as 16 kHz mono PCM bytes (never written to disk)."""
+    try:
+        return decode_audio(video_path)
+    except MediaError:
         return None
 
-def transcribe_audio(audio_bytes):
-    """Transcribe audio bytes to text."""
-    recognizer = sr.Recognizer()
-    audio_data = BytesIO(audio_bytes)
-    with sr.AudioFile(audio_data) as source:
-        audio = recognizer.record(source)
-        try:
-            return recognizer.recognize_google(audio, language="en")
-        except sr.UnknownValueError:
-            return "❌ Could not understand the audio."
-        except sr.RequestError:
-            return "❌ Error with the speech recognition service."
-
-def analyze_gaze(video_path):
-    """Analyze gaze direction using MediaPipe to detect if the person is looking away."""
-    cap = cv2.VideoCapture(video_path)
-    looking_away_count = 0
-    total_frames = 0
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        total_frames += 1
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = face_mesh.process(frame_rgb)
-
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                left_iris = face_landmarks.landmark[468]  # Left iris center
-                right_iris = face_landmarks.landmark[473]  # Right iris center
-                nose_tip = face_landmarks.landmark[1]  # Nose tip as face center
-                left_gaze_offset = abs(left_iris.x - nose_tip.x)
-                right_gaze_offset = abs(right_iris.x - nose_tip.x)
-                if left_gaze_offset > 0.1 or right_gaze_offset > 0.1:
-                    looking_away_count += 1
-
-    cap.release()
-    looking_away_percentage = (looking_away_count / total_frames) * 100 if total_frames > 0 else 0
-    return looking_away_percentage
+def transcribe_audio(pcm, sample_rate=SAMPLE_RATE, recognizer=None):
+    """Transcribe 16-bit mono PCM bytes; returns the segmented transcription report."""
+    return transcribe_segmented(pcm, sample_rate, recognizer=recognizer)
+
+# Bump whenever the prompt or reply format changes so cached Gemini analyses are not reused
+PROMPT_VERSION = 2
 
 def get_gemini_response(transcription, gaze_percentage, context="Formal Interview"):
-    """Get analysis from Gemini API."""
+    """Get a validated verdict (classification, probability, justification) from Gemini."""
     filler_count = count_filler_words(transcription)
     prompt = f"""
     You are an advanced AI content analyzer designed to detect AI-generated responses in spoken text during interviews. 
@@ -120,128 +111,717 @@ def get_gemini_response(transcription, gaze_percentage, context="Formal Intervie
     Filler words detected: {filler_count}.
     Transcript: "{transcription}"
 
-    Provide:
-    - Classification: "Real (Human-Created)" or "Fake (AI-Generated)"
-    - Probability Score: 
-      - If "Real (Human-Created)": "Real (Human-Created) - <XX>%" (confidence it is human-created)
-      - If "Fake (AI-Generated)": "Fake (AI-Generated) - <XX>%" (confidence it is AI-generated)
-    - Justification: <Brief Reason, combining linguistic and behavioral analysis>
+    Answer in JSON with:
+    - classification: "Real (Human-Created)" or "Fake (AI-Generated)"
+    - probability: your confidence in that classification, from 0 to 100
+    - justification: a brief reason, combining linguistic and behavioral analysis
+    """
+    return llm_client.generate(prompt, VERDICT_SCHEMA)
+
+# -------------------- ANALYSIS PIPELINE --------------------
+class AnalysisError(Exception):
+    """An analysis stage failed; the message is safe to return to the client."""
+
+    def __init__(self, message, timings=None, status=500, retry_after=None):
+        super().__init__(message)
+        self.timings = timings or {}
+        self.status = status
+        self.retry_after = retry_after
+
+def parse_analysis(verdict, threshold):
+    """Classification, probabilities and justification from a validated Gemini verdict."""
+    confidence = verdict["probability"]
+    if verdict["classification"] == "Real (Human-Created)":
+        human_prob = confidence
+        ai_prob = 100 - human_prob
+    else:
+        ai_prob = confidence
+        human_prob = 100 - ai_prob
+
+    return {
+        "classification": "Fake (AI-Generated)" if ai_prob > threshold else "Real (Human-Created)",
+        "human_prob": human_prob,
+        "ai_prob": ai_prob,
+        "justification": verdict["justification"],
+    }
+
+def local_verdict(local, threshold):
+    """Build the parsed-analysis dict for a transcript the local classifier decided."""
+    ai_prob = int(round(local["ai_prob"]))
+    human_prob = 100 - ai_prob
+    features = local["features"]
+    justification = (f"Decided by the local pre-classifier ({ai_prob}% AI-generated): "
+                     f"{features['filler_rate']:.1f} filler words and {features['self_correction_rate']:.1f} "
+                     f"self-corrections per 100 words, {features['type_token_ratio']:.0%} distinct words.")
+    return {
+        "classification": "Fake (AI-Generated)" if ai_prob > threshold else "Real (Human-Created)",
+        "human_prob": human_prob,
+        "ai_prob": ai_prob,
+        "justification": justification,
+    }
+
+def save_results(rows):
+    """Insert (transcription, parsed, file_hash) rows into the results table in one transaction.
+
+    With the write-behind buffer enabled the rows are queued and grouped with other
+    requests' inserts instead.
+    """
+    if not rows:
+        return
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    values = [(transcription, parsed["classification"], parsed["human_prob"], parsed["ai_prob"],
+               parsed["justification"], timestamp, file_hash) for transcription, parsed, file_hash in rows]
+    metrics.inc("truthscan_db_rows_inserted_total", len(values))
+    if result_writer is not None:
+        result_writer.add(values)
+        return
+    conn = storage.connect()
+    try:
+        with metrics.timed("truthscan_db_insert_seconds"):
+            c = conn.cursor()
+            c.executemany(storage.RESULTS_INSERT, values)
+            similarity_index.store_inserted(conn, values)
+            conn.commit()
+    except sqlite3.Error as e:
+        raise AnalysisError(f"Database error: {e}")
+    finally:
+        conn.close()
+
+def save_result(transcription, parsed, file_hash=None):
+    """Insert one analysis into the results table (`file_hash` is None for live answers)."""
+    save_results([(transcription, parsed, file_hash)])
+
+def decode_uploaded_audio(source):
+    """Decode an audio upload (path or stream) to PCM, failing the pipeline on bad media."""
+    try:
+        return decode_audio(source)
+    except MediaError as e:
+        raise AnalysisError(f"Could not decode audio: {e}")
+
+def checked_transcription(audio, details):
+    """Transcribe PCM, failing the pipeline only if no chunk produced any text.
+
+    The per-chunk report (timings, retries, failures) is stored in `details`.
+    """
+    report = transcribe_audio(audio) if audio else None
+    if report is not None:
+        details["transcription"] = {k: report[k] for k in ("chunks", "complete", "failed_chunks")}
+    if not report or not report["text"]:
+        raise AnalysisError("Failed to transcribe audio")
+    return report
+
+def cached_transcription(audio, file_hash, details):
+    """Transcribe and remember the transcript of this upload (only if every chunk succeeded)."""
+    report = checked_transcription(audio, details)
+    if report["complete"]:
+        result_cache.put("transcript", file_hash, report["text"])
+    return report["text"]
+
+def cached_gaze(file_path, file_hash, gaze_options, cache_hits):
+    """Gaze report for this upload, sampling settings and thresholds.
+
+    With the cache enabled the landmark series is stored per file and sampling
+    settings, so new thresholds (here or through GET /gaze/<file_hash>) are applied
+    to the stored series without decoding the video again.
+    """
+    options = dict(gaze_options or {})
+    thresholds = {name: options.pop(name) for name in GAZE_THRESHOLDS if name in options}
+    key = gaze_key(file_hash, options)
+    series = gaze_store.get(key)
+    cache_hits["gaze"] = series is not None
+    if series is None:
+        series = extract_gaze_series(file_path, **options)
+        gaze_store.put(key, file_hash, series)
+    return gaze_report(series, **thresholds)
+
+def cached_gemini_response(transcription, gaze_percentage, context, cache_hits):
+    """Gemini analysis keyed by transcript, gaze bucket, context and prompt version."""
+    key = analysis_key(transcription, gaze_percentage, context, PROMPT_VERSION)
+    analysis = result_cache.get("analysis", key)
+    cache_hits["gemini"] = analysis is not None
+    if analysis is None:
+        analysis = get_gemini_response(transcription, gaze_percentage, context)
+        result_cache.put("analysis", key, analysis)
+    return analysis
+
+def media_stages(source, file_type, file_hash, gaze_options, cache_hits, details):
+    """Stages that turn an upload into a transcript, gaze report and local score.
+
+    The audio branch (extract/read -> transcribe) and, for videos, the gaze branch
+    are independent so they run concurrently; "local" waits for both.
+    """
+    transcription = result_cache.get("transcript", file_hash)
+    cache_hits["transcribe"] = transcription is not None
+
+    if transcription is not None:
+        stages = [Stage("transcribe", lambda: transcription)]
+    elif file_type == "audio":
+        stages = [Stage("audio", lambda: decode_uploaded_audio(source)),
+                  Stage("transcribe", lambda audio: cached_transcription(audio, file_hash, details), deps=["audio"])]
+    else:
+        stages = [Stage("audio", lambda: extract_audio_from_video(source)),
+                  Stage("transcribe", lambda audio: cached_transcription(audio, file_hash, details), deps=["audio"])]
+
+    if file_type == "audio":
+        stages.append(Stage("gaze", lambda: None))
+    else:
+        stages.append(Stage("gaze", lambda: cached_gaze(source, file_hash, gaze_options, cache_hits)))
+
+    stages.append(Stage("local", lambda transcribe, gaze: classify_locally(
+        transcribe, gaze["looking_away_percentage"] if gaze else None), deps=["transcribe", "gaze"]))
+    return stages
+
+def record_stage_timings(timings):
+    """Feed per-stage wall-clock timings (ms) into the stage latency histogram."""
+    for stage, ms in timings.items():
+        metrics.observe("truthscan_stage_seconds", ms / 1000, stage=stage)
+
+def run_graph(stages):
+    """Run a stage graph, converting stage failures into AnalysisError."""
+    try:
+        results, timings = run_stages(stages)
+    except StageError as e:
+        metrics.inc("truthscan_stage_errors_total", stage=e.stage)
+        record_stage_timings(e.timings)
+        if isinstance(e.error, AnalysisError):
+            raise AnalysisError(str(e.error), e.timings)
+        if isinstance(e.error, LLMUnavailable):  # the transcript is cached, so a retry resumes at Gemini
+            raise AnalysisError(str(e.error), e.timings, status=503, retry_after=e.error.retry_after)
+        raise AnalysisError(f"Error in {e.stage} stage: {e.error}", e.timings)
+    record_stage_timings(timings)
+    return results, timings
+
+def build_response(results, parsed, file_hash, cache_hits, details, timings):
+    """Assemble the /analyze payload from stage results and the parsed verdict."""
+    gaze = results["gaze"]
+    return {
+        "transcription": results["transcribe"],
+        "gaze_percentage": gaze["looking_away_percentage"] if gaze else 0.0,
+        "gaze_frames_sampled": gaze["frames_sampled"] if gaze else 0,
+        "gaze_frames_total": gaze["frames_total"] if gaze else 0,
+        "gaze_report": gaze,
+        **parsed,
+        "decided_by": "local" if results["local"]["decided"] else "gemini",
+        "local_ai_prob": results["local"]["ai_prob"],
+        "file_hash": file_hash,
+        "cache": cache_hits,
+        "transcription_report": details.get("transcription"),
+        "similar_results": results.get("similar", []),
+        "timings": timings,
+    }
+
+def run_analysis(source, file_type, context, threshold, gaze_options=None, file_hash=None):
+    """Analyze an audio/video upload and store the result.
+
+    `source` is a file path, or for audio also a seekable binary stream which is
+    piped straight into ffmpeg; videos need a path because gaze analysis seeks.
+
+    The work is a small stage graph: the audio branch (extract/read -> transcribe)
+    and, for videos, the gaze branch run concurrently; Gemini starts as soon as both
+    are done. Returns the response payload including per-stage timings in ms.
+
+    Transcripts and gaze reports are cached by the SHA-256 of the file and Gemini
+    replies by transcript/gaze/context, so re-running with only a new `threshold`
+    makes no external calls.
+
+    Prior results with near-identical transcripts (estimated Jaccard over word
+    3-grams) are listed in "similar_results".
+    """
+    if file_hash is None:
+        file_hash = file_sha256(source) if isinstance(source, str) else stream_sha256(source)
+    cache_hits = {}
+    details = {}
+
+    stages = media_stages(source, file_type, file_hash, gaze_options, cache_hits, details) + [
+        Stage("gemini", lambda transcribe, gaze, local: None if local["decided"] else cached_gemini_response(
+            transcribe, gaze["looking_away_percentage"] if gaze else 0.0, context, cache_hits),
+            deps=["transcribe", "gaze", "local"]),
+        Stage("parse", lambda gemini, local: local_verdict(local, threshold) if gemini is None
+              else parse_analysis(gemini, threshold), deps=["gemini", "local"]),
+        # looked up before saving so an upload never matches its own row
+        Stage("similar", lambda transcribe: similarity_index.similar(transcribe, file_hash), deps=["transcribe"]),
+        Stage("save", lambda transcribe, parse, similar: save_result(transcribe, parse, file_hash),
+              deps=["transcribe", "parse", "similar"]),
+    ]
+    results, timings = run_graph(stages)
+    return build_response(results, results["parse"], file_hash, cache_hits, details, timings)
+
+def read_number(form, name, default, kind=float):
+    """`form[name]` converted with `kind`; raises ValueError naming the field if malformed."""
+    try:
+        return kind(form.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name}: {form.get(name)!r}")
+
+def read_analysis_params(form):
+    """Read the analysis settings shared by /analyze, /jobs, /analyze/batch and /live from a form.
+
+    Raises ValueError for malformed numbers.
+    """
+    return {
+        "context": form.get('context', 'Formal Interview'),
+        "threshold": read_number(form, 'threshold', 50.0),
+        "gaze_options": {
+            "target_fps": read_number(form, 'gaze_fps', GAZE_TARGET_FPS),
+            "frame_stride": read_number(form, 'gaze_stride', GAZE_FRAME_STRIDE, int),
+            "max_side": read_number(form, 'gaze_max_side', GAZE_MAX_SIDE, int),
+            "workers": read_number(form, 'gaze_workers', 0, int) or None,
+            "away_offset": read_number(form, 'gaze_away_offset', GAZE_AWAY_OFFSET),
+        },
+    }
+
+# -------------------- JOB QUEUE --------------------
+def run_job(file_path, file_type, params):
+    """Job handler: analyze a stored upload with the parameters it was submitted with."""
+    return run_analysis(file_path, file_type, **params)
+
+job_queue = JobQueue(connect=storage.connect, handler=run_job)
+if BACKEND_ROLE != "api":
+    job_queue.start()
+
+# -------------------- BATCH ANALYSIS --------------------
+def get_gemini_batch_response(items, context="Formal Interview"):
+    """Get analyses of several transcripts from one Gemini prompt."""
+    sections = "".join(f"""
+    ### Item {number}
+    Gaze percentage (looking away): {item['gaze_percentage']:.2f}%.
+    Filler words detected: {count_filler_words(item['transcription'])}.
+    Transcript: "{item['transcription']}"
+""" for number, item in enumerate(items, 1))
+    prompt = f"""
+    You are an advanced AI content analyzer designed to detect AI-generated responses in spoken text during interviews. 
+    Your goal is to differentiate between human-spoken responses and AI-generated ones.
+    Analyze each of the {len(items)} items below independently.
+
+    Consider the following factors while analyzing:
+    - Linguistic Analysis:
+      - Human traits: filler words (e.g., "um," "uh"), self-corrections, personal anecdotes, emotional tone, slight grammatical errors, or context-specific phrasing (e.g., nervousness in interviews).
+      - AI traits: overly formal tone, perfect grammar, repetitive structure, lack of personal depth, generic phrasing.
+    - Behavioral Analysis:
+      - Gaze tracking: If the person is looking away frequently (e.g., reading from a screen), it may indicate they are reading AI-generated responses.
+      - A higher gaze percentage (looking away) suggests reading behavior.
+
+    Context: {context}.
+    {sections}
+    Answer in JSON with an "items" list holding, for every item in order:
+    - item: the item number
+    - classification: "Real (Human-Created)" or "Fake (AI-Generated)"
+    - probability: your confidence in that classification, from 0 to 100
+    - justification: a brief reason, combining linguistic and behavioral analysis
+    """
+    return llm_client.generate(prompt, BATCH_SCHEMA, mode="batch")
+
+def split_batch_analysis(analysis, count):
+    """Split a packed Gemini reply into per-item verdicts (None where an item is missing)."""
+    blocks = [None] * count
+    for entry in analysis["items"]:
+        verdict = dict(entry)
+        index = verdict.pop("item") - 1
+        if 0 <= index < count and blocks[index] is None:
+            blocks[index] = verdict
+    return blocks
+
+def prepare_batch_item(item, params):
+    """Transcribe, gaze-track and locally score one spooled batch file."""
+    results, _ = run_graph(media_stages(item["path"], item["file_type"], item["file_hash"],
+                                        params["gaze_options"], {}, {}))
+    gaze = results["gaze"]
+    return {
+        "transcription": results["transcribe"],
+        "gaze_percentage": gaze["looking_away_percentage"] if gaze else 0.0,
+        "local": results["local"],
+        "file_hash": item["file_hash"],
+    }
+
+def classify_batch(prepared, params):
+    """Verdicts for a pack of prepared items with at most one packed Gemini call.
+
+    Locally decided and cached items skip Gemini; an item missing or unparseable in
+    the packed reply falls back to its own single-item call. Failed items are
+    returned as exceptions in their slot.
     """
-    response = model.generate_content(prompt)
-    return response.text
+    context, threshold = params["context"], params["threshold"]
+    verdicts = [None] * len(prepared)
+    pending = []
+    for index, item in enumerate(prepared):
+        if item["local"]["decided"]:
+            verdicts[index] = local_verdict(item["local"], threshold)
+            continue
+        cached = result_cache.get("analysis", analysis_key(item["transcription"], item["gaze_percentage"], context, PROMPT_VERSION))
+        if cached is None:
+            pending.append(index)
+        else:
+            verdicts[index] = parse_analysis(cached, threshold)
+
+    if not pending:
+        return verdicts
+    try:
+        reply = get_gemini_batch_response([prepared[index] for index in pending], context)
+    except Exception as e:
+        for index in pending:
+            verdicts[index] = AnalysisError(f"Error in gemini stage: {e}")
+        return verdicts
+
+    for index, block in zip(pending, split_batch_analysis(reply, len(pending))):
+        item = prepared[index]
+        if block is not None:
+            verdicts[index] = parse_analysis(block, threshold)
+            result_cache.put("analysis", analysis_key(item["transcription"], item["gaze_percentage"], context, PROMPT_VERSION), block)
+            continue
+        try:  # missing from the packed reply: ask for this item alone
+            verdicts[index] = parse_analysis(
+                cached_gemini_response(item["transcription"], item["gaze_percentage"], context, {}), threshold)
+        except Exception as e:
+            verdicts[index] = e
+    return verdicts
+
+batch_runner = BatchRunner(connect=storage.connect, prepare=prepare_batch_item, classify=classify_batch,
+                           save=lambda rows: save_results([(item["transcription"], verdict, item["file_hash"])
+                                                            for item, verdict in rows]))
+if BACKEND_ROLE != "worker":
+    batch_runner.recover()  # batches run inside the HTTP process that accepted them
+
+# -------------------- LIVE SESSIONS --------------------
+def finalize_live_answer(transcription, gaze_percentage, context, threshold):
+    """Final verdict for one streamed answer: local classifier, else Gemini; stored like /analyze results."""
+    local = classify_locally(transcription, gaze_percentage)
+    if local["decided"]:
+        parsed = local_verdict(local, threshold)
+    else:
+        parsed = parse_analysis(cached_gemini_response(transcription, gaze_percentage or 0.0, context, {}), threshold)
+    similar = similarity_index.similar(transcription)
+    save_result(transcription, parsed)
+    return {**parsed, "decided_by": "local" if local["decided"] else "gemini", "local_ai_prob": local["ai_prob"],
+            "similar_results": similar}
+
+live_slots = threading.BoundedSemaphore(LIVE_MAX_SESSIONS)
+
+def warm_up():
+    """Load every analyzer now rather than during the first request."""
+    get_model()
+    warm_up_transcription()
+    warm_up_gaze()
+    similarity_index.refresh()
+
+if PRELOAD_ANALYZERS and BACKEND_ROLE != "api":
+    warm_up()
 
 # -------------------- API Endpoints --------------------
 @app.route('/analyze', methods=['POST'])
 def analyze_file():
-    """Endpoint to analyze an uploaded audio or video file."""
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
+    """Endpoint to analyze an uploaded audio or video file.
+
+    With `trace=1` the response also lists every metric recorded while serving it.
+    """
+    with metrics.tracing(request.form.get('trace') == '1') as trace:
+        body, status = analyze_upload()
+    if trace is not None:
+        body["trace"] = trace
+    headers = {"Retry-After": str(body["retry_after"])} if body.get("retry_after") else {}
+    return jsonify(body), status, headers
+
+def analyze_upload():
+    """Analyze the file posted to /analyze; returns (response body, status code).
+
+    The file is either a multipart `file` part or the `upload_id` of a finished
+    resumable upload (see /uploads).
+    """
+    upload_id = request.form.get('upload_id')
+    if 'file' not in request.files and not upload_id:
+        return {"error": "No file uploaded"}, 400
 
-    file = request.files['file']
+    file = request.files.get('file')
     file_type = request.form.get('file_type', 'audio')  # Default to audio
-    context = request.form.get('context', 'Formal Interview')
-    threshold = float(request.form.get('threshold', 50.0))
+    try:
+        params = read_analysis_params(request.form)
+    except ValueError as e:
+        return {"error": str(e)}, 400
 
     if file_type not in ["audio", "video"]:
-        return jsonify({"error": "Invalid file type"}), 400
-
-    # Save the uploaded file temporarily
-    temp_file_path = f"temp_{file_type}_{int(time.time())}.{'wav' if file_type == 'audio' else 'mp4'}"
-    file.save(temp_file_path)
+        return {"error": "Invalid file type"}, 400
+
+    # Large multipart files already sit in a hashed SpoolFile (see UploadRequest) and
+    # are decoded from its path. Otherwise audio is piped from the upload stream into
+    # ffmpeg; video and MP4-family audio (m4a) are spooled to a unique temporary file
+    # because gaze analysis and the MP4 index need random access
+    spool_path = None
+    if upload_id:
+        try:
+            spool_path = source = upload_store.path(upload_id)
+        except UploadNotFound:
+            return {"error": "Upload not found"}, 404
+        file_hash = None
+    elif isinstance(file.stream, SpoolFile):
+        file.stream.flush()
+        source = file.stream.name
+        file_hash = file.stream.sha256()
+    elif file_type == "audio" and not is_mp4_family(file.stream):
+        source = file.stream
+        file_hash = stream_sha256(source)
+    else:
+        spool_path, file_hash = spool_upload(file.stream)
+        source = spool_path
 
-    # Process the file
-    transcription = ""
-    gaze_percentage = 0.0
+    try:
+        result = run_analysis(source, file_type, file_hash=file_hash, **params)
+    except AnalysisError as e:
+        body = {"error": str(e), "timings": e.timings}
+        if e.retry_after:
+            body["retry_after"] = e.retry_after
+        return body, e.status
+    finally:
+        if spool_path:
+            os.remove(spool_path)
 
-    if file_type == "audio":
-        with open(temp_file_path, "rb") as f:
-            audio_bytes = f.read()
-        transcription = transcribe_audio(audio_bytes)
-    else:
-        audio_bytes = extract_audio_from_video(temp_file_path)
-        if audio_bytes:
-            transcription = transcribe_audio(audio_bytes)
-        gaze_percentage = analyze_gaze(temp_file_path)
+    return result, 200
 
-    os.remove(temp_file_path)
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Endpoint to analyze many audio/video files (or .zip archives of them) in the background."""
+    uploads = request.files.getlist('files') + request.files.getlist('file')
+    if not uploads:
+        return jsonify({"error": "No file uploaded"}), 400
+    try:
+        params = read_analysis_params(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if not transcription or "❌" in transcription:
-        return jsonify({"error": "Failed to transcribe audio"}), 500
+    try:
+        items = collect_uploads(uploads)
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({"error": str(e)}), 400
+    if not items:
+        return jsonify({"error": "No supported audio or video files in upload"}), 400
 
-    # Analyze with Gemini
-    analysis = get_gemini_response(transcription, gaze_percentage, context)
+    try:
+        batch_id = batch_runner.submit(items, params)
+    except BatchBusy:
+        for item in items:
+            os.remove(item["path"])
+        return jsonify({"error": "Too many batches running, try again later"}), 503, {"Retry-After": "60"}
+
+    return jsonify({"batch_id": batch_id, "total": len(items), "status": "running"}), 202
+
+@app.route('/analyze/batch/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    """Endpoint to report the progress and per-file verdicts of a batch."""
+    batch = batch_runner.get(batch_id)
+    if batch is None:
+        return jsonify({"error": "Batch not found"}), 404
+    return jsonify(batch)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Endpoint to queue an uploaded audio or video file for asynchronous analysis."""
+    upload_id = request.form.get('upload_id')
+    if 'file' not in request.files and not upload_id:
+        return jsonify({"error": "No file uploaded"}), 400
 
-    # Parse the response
+    file_type = request.form.get('file_type', 'audio')
+    if file_type not in ["audio", "video"]:
+        return jsonify({"error": "Invalid file type"}), 400
     try:
-        lines = [line.strip() for line in analysis.split("\n") if line.strip()]
-        class_line = next(line for line in lines if "Classification:" in line)
-        prob_line = next(line for line in lines if "Probability Score:" in line)
-        just_line = "\n".join([line for line in lines if "Justification:" in line or line.startswith("-")])
+        params = read_analysis_params(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        initial_class = re.search(r"Classification:\s*(.+)", class_line).group(1).strip()
-        prob_match = re.search(r"(\d+)%", prob_line)
-        if not prob_match:
-            raise ValueError("Probability Score not found")
+    if upload_id:
+        try:
+            upload = upload_store.path(upload_id)
+        except UploadNotFound:
+            return jsonify({"error": "Upload not found"}), 404
+    else:
+        upload = request.files['file']
+        if isinstance(upload.stream, SpoolFile):
+            upload = upload.stream.detach()  # moved into the job directory instead of copied
+    try:
+        job_id = job_queue.submit(upload, file_type, params)
+    except QueueFull:
+        if isinstance(upload, str) and not upload_id:
+            os.remove(upload)  # the detached spool file; a resumable upload is kept for a retry
+        return jsonify({"error": "Job queue is full, try again later"}), 503, {"Retry-After": "30"}
+
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """Endpoint to start a resumable upload; chunks are then sent with PATCH /uploads/<upload_id>."""
+    upload_id = upload_store.create()
+    return jsonify({"upload_id": upload_id, "offset": 0}), 201, {"Location": f"/uploads/{upload_id}"}
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Endpoint reporting how many bytes of an upload have arrived (where to resume)."""
+    try:
+        offset = upload_store.offset(upload_id)
+    except UploadNotFound:
+        return jsonify({"error": "Upload not found"}), 404
+    return jsonify({"upload_id": upload_id, "offset": offset}), 200, {"Upload-Offset": str(offset)}
+
+@app.route('/uploads/<upload_id>', methods=['PATCH'])
+def append_upload(upload_id):
+    """Endpoint appending the raw request body to an upload at the `Upload-Offset` header."""
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({"error": "Upload-Offset header required"}), 400
+    try:
+        offset = upload_store.append(upload_id, offset, request.stream)
+    except UploadNotFound:
+        return jsonify({"error": "Upload not found"}), 404
+    except UploadConflict as e:
+        return jsonify({"error": str(e), "offset": e.offset}), 409, {"Upload-Offset": str(e.offset)}
+    except UploadTooLarge:
+        return jsonify({"error": "Upload too large"}), 413
+    return jsonify({"upload_id": upload_id, "offset": offset}), 200, {"Upload-Offset": str(offset)}
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Endpoint to abandon an upload."""
+    try:
+        upload_store.delete(upload_id)
+    except UploadNotFound:
+        return jsonify({"error": "Upload not found"}), 404
+    return "", 204
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Endpoint to poll the status and result of a queued analysis."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
 
-        confidence = int(prob_match.group(1))
-        if "Real (Human-Created)" in initial_class:
-            human_prob = confidence
-            ai_prob = 100 - human_prob
-        else:
-            ai_prob = confidence
-            human_prob = 100 - ai_prob
+@app.route('/results', methods=['GET'])
+def get_results():
+    """Endpoint to retrieve one page of saved analysis results, newest first.
 
-        final_class = "Fake (AI-Generated)" if ai_prob > threshold else "Real (Human-Created)"
-    except (StopIteration, AttributeError, ValueError) as e:
-        return jsonify({"error": f"Error parsing analysis: {e}"}), 500
+    Query arguments: limit, cursor (from the previous page's next_cursor), fields
+    (comma separated projection) and the filters classification, min_ai_prob,
+    max_ai_prob, since and until.
+    """
+    try:
+        sql, params, fields, limit = results_page_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Save to database
-    conn = init_db()
+    conn = storage.connect()
     try:
         c = conn.cursor()
-        c.execute("INSERT INTO results (transcription, classification, human_prob, ai_prob, justification, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
-                  (transcription, final_class, human_prob, ai_prob, just_line, time.strftime("%Y-%m-%d %H:%M:%S")))
-        conn.commit()
+        c.execute(sql, params)
+        rows = c.fetchall()
+        results = [dict(zip(fields, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = results[-1]
+            next_cursor = encode_cursor(last["timestamp"], last["id"])
+        return jsonify({"results": results, "next_cursor": next_cursor})
     except sqlite3.Error as e:
         return jsonify({"error": f"Database error: {e}"}), 500
     finally:
         conn.close()
 
-    # Return the result
-    return jsonify({
-        "transcription": transcription,
-        "gaze_percentage": gaze_percentage,
-        "classification": final_class,
-        "human_prob": human_prob,
-        "ai_prob": ai_prob,
-        "justification": just_line
-    })
+@app.route('/results/export', methods=['GET'])
+def export_results():
+    """Endpoint streaming every matching result as NDJSON, CSV or Parquet, oldest first.
 
-@app.route('/results', methods=['GET'])
-def get_results():
-    """Endpoint to retrieve saved analysis results."""
-    conn = init_db()
+    Query arguments: format (ndjson, csv or parquet; default ndjson), fields and the
+    /results filters. Rows are read from one cursor in fixed-size chunks, so memory
+    stays flat however many rows match.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unknown format: {export_format}"}), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({"error": "Parquet export requires pyarrow"}), 501
     try:
-        c = conn.cursor()
-        c.execute("SELECT * FROM results ORDER BY timestamp DESC")
-        rows = c.fetchall()
-        results = [
-            {
-                "id": row[0],
-                "transcription": row[1],
-                "classification": row[2],
-                "human_prob": row[3],
-                "ai_prob": row[4],
-                "justification": row[5],
-                "timestamp": row[6]
-            }
-            for row in rows
-        ]
-        return jsonify(results)
+        sql, params, fields = results_export_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = storage.connect()
+    try:
+        cursor = conn.execute(sql, params)
+    except sqlite3.Error as e:
+        conn.close()
+        return jsonify({"error": f"Database error: {e}"}), 500
+
+    def close():
+        cursor.close()
+        conn.close()
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response = Response(export_stream(export_format, cursor, fields), mimetype=mimetype,
+                        headers={"Content-Disposition": f'attachment; filename="results.{extension}"'})
+    response.call_on_close(close)  # also runs when the client disconnects mid-stream
+    return response
+
+@app.route('/results/search', methods=['GET'])
+def search_results():
+    """Endpoint to full-text search saved transcriptions and justifications.
+
+    Query arguments: q, phrase=1 (exact phrase), limit, offset and the /results
+    filters. Matches are ranked by relevance and come with highlighted snippets.
+    """
+    try:
+        sql, params, fields, limit, offset = search_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = storage.connect()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+        results = [dict(zip(fields, row)) for row in rows[:limit]]
+        next_offset = offset + limit if len(rows) > limit else None
+        return jsonify({"results": results, "next_offset": next_offset})
     except sqlite3.Error as e:
         return jsonify({"error": f"Database error: {e}"}), 500
     finally:
         conn.close()
 
+@app.route('/gaze/<file_hash>', methods=['GET'])
+def get_gaze(file_hash):
+    """Endpoint recomputing a video's gaze metrics from its stored landmark series.
+
+    Any of away_offset, sweep_min_span, sweep_return and sweep_window_s can be
+    passed as query parameters; the video is not decoded again. Series are kept
+    only while the result cache is enabled, and expire with it.
+    """
+    series = gaze_store.latest(file_hash)
+    if series is None:
+        return jsonify({"error": "No gaze series for this file"}), 404
+    try:
+        thresholds = {name: float(request.args[name]) for name in GAZE_THRESHOLDS if name in request.args}
+    except ValueError:
+        return jsonify({"error": "Thresholds must be numbers"}), 400
+    return jsonify({"file_hash": file_hash, **gaze_report(series, **thresholds)})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Endpoint exposing stage latencies and counters in the Prometheus text format."""
+    if not metrics.METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+if Sock is not None:
+    sock = Sock(app)
+
+    @sock.route('/live')
+    def live_session(ws):
+        """WebSocket endpoint streaming one interview: see live.py for the message format."""
+        if not live_slots.acquire(blocking=False):
+            ws.send(json.dumps({"type": "error", "error": "Too many live sessions, try again later"}))
+            return
+        try:
+            try:
+                params = read_analysis_params(request.args)
+                sample_rate = read_number(request.args, 'sample_rate', SAMPLE_RATE, int)
+            except ValueError as e:
+                ws.send(json.dumps({"type": "error", "error": str(e)}))
+                return
+            run_session(ws, finalize_live_answer, params["context"], params["threshold"], sample_rate)
+        finally:
+            live_slots.release()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from jobs import worker_alive, worker_id
+from media import spool_upload
+
+# -------------------- CONFIGURATION --------------------
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))  # files decoded/transcribed at once
+BATCH_PROMPT_SIZE = int(os.environ.get("BATCH_PROMPT_SIZE", 8))  # transcripts per Gemini prompt
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", 500))
+# total uncompressed size of the zip members spooled for one batch request
+BATCH_MAX_UNZIPPED_BYTES = int(os.environ.get("BATCH_MAX_UNZIPPED_BYTES", 4 * 1024 ** 3))
+BATCH_MAX_ACTIVE = int(os.environ.get("BATCH_MAX_ACTIVE", 2))  # batches processed at the same time
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a"}
+VIDEO_EXTENSIONS = {".mp4", ".mov"}
+
+
+class BatchBusy(Exception):
+    """Raised when BATCH_MAX_ACTIVE batches are already running."""
+
+
+def file_type_for(name):
+    """'audio' or 'video' from a file name's extension, None if unsupported."""
+    extension = os.path.splitext(name)[1].lower()
+    if extension in AUDIO_EXTENSIONS:
+        return "audio"
+    if extension in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+def collect_uploads(uploads, max_files=BATCH_MAX_FILES, max_unzipped_bytes=BATCH_MAX_UNZIPPED_BYTES):
+    """Spool uploaded files (and the members of uploaded .zip archives) to disk.
+
+    Returns a list of {"name", "path", "file_hash", "file_type"}; files with
+    unsupported extensions are skipped. Raises ValueError when there are more
+    than `max_files` items, or when the zip members would unpack to more than
+    `max_unzipped_bytes` in total. That is checked against the sizes in each
+    archive's directory before any member is written; zipfile never reads a
+    member past its declared size.
+    """
+    items = []
+    unzipped = 0
+
+    def add(name, stream):
+        if len(items) >= max_files:
+            raise ValueError(f"Too many files in batch (max {max_files})")
+        extension = os.path.splitext(name)[1].lower()
+        path, file_hash = spool_upload(stream, suffix=extension)
+        items.append({"name": name, "path": path, "file_hash": file_hash, "file_type": file_type_for(name)})
+
+    try:
+        for upload in uploads:
+            name = upload.filename or "upload"
+            if name.lower().endswith(".zip"):
+                with zipfile.ZipFile(upload.stream) as archive:
+                    members = [member for member in archive.infolist()
+                               if not member.is_dir() and file_type_for(member.filename)]
+                    unzipped += sum(member.file_size for member in members)
+                    if unzipped > max_unzipped_bytes:
+                        raise ValueError(f"Archives unpack to more than {max_unzipped_bytes} bytes")
+                    for member in members:
+                        with archive.open(member) as stream:
+                            add(member.filename, stream)
+            elif file_type_for(name):
+                add(name, upload.stream)
+    except Exception:
+        for item in items:
+            os.remove(item["path"])
+        raise
+    return items
+
+
+class BatchRunner:
+    """Runs bulk analyses in the background and records their progress in SQLite.
+
+    `prepare(item, params)` decodes, transcribes and scores one file and returns a
+    prepared dict (raising on failure); `classify(prepared_list, params)` turns a pack
+    of up to BATCH_PROMPT_SIZE prepared items into parsed verdicts (or exceptions)
+    with a single LLM round trip; `save(rows)` stores a list of result rows at once.
+    """
+
+    def __init__(self, connect, prepare, classify, save, concurrency=BATCH_CONCURRENCY,
+                 prompt_size=BATCH_PROMPT_SIZE, max_active=BATCH_MAX_ACTIVE):
+        self.connect = connect
+        self.prepare = prepare
+        self.classify = classify
+        self.save = save
+        self.concurrency = concurrency
+        self.prompt_size = prompt_size
+        self._slots = threading.BoundedSemaphore(max_active)
+
+    def recover(self):
+        """Mark batches cut short by a restart; they cannot resume because their spool files are gone.
+
+        Several HTTP processes may share the database, so only batches whose process
+        is gone are touched (see jobs.worker_alive).
+        """
+        conn = self.connect()
+        try:
+            active = conn.execute("SELECT id, worker FROM batches WHERE status IN ('queued', 'running')").fetchall()
+            stale = [(batch_id,) for batch_id, worker in active if not worker_alive(worker)]
+            conn.executemany("UPDATE batches SET status = 'interrupted' WHERE id = ? AND status IN ('queued', 'running')",
+                             stale)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def submit(self, items, params):
+        """Start analyzing spooled items in the background; returns the batch id."""
+        if not self._slots.acquire(blocking=False):
+            raise BatchBusy()
+        batch_id = uuid.uuid4().hex
+        states = [{"name": item["name"], "status": "queued"} for item in items]
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        conn = self.connect()
+        try:
+            conn.execute("INSERT INTO batches (id, status, total, processed, failed, items, created_at, updated_at, worker) "
+                         "VALUES (?, 'running', ?, 0, 0, ?, ?, ?, ?)",
+                         (batch_id, len(items), json.dumps(states), now, now, worker_id()))
+            conn.commit()
+        finally:
+            conn.close()
+        threading.Thread(target=self._run, args=(batch_id, items, states, params), daemon=True).start()
+        return batch_id
+
+    def get(self, batch_id):
+        """Return the progress of a batch, or None if it does not exist."""
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT id, status, total, processed, failed, items, created_at, updated_at FROM batches WHERE id = ?",
+                               (batch_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"batch_id": row[0], "status": row[1], "total": row[2], "processed": row[3], "failed": row[4],
+                "items": json.loads(row[5]), "created_at": row[6], "updated_at": row[7]}
+
+    def _update(self, batch_id, states, status="running"):
+        processed = sum(state["status"] in ("done", "failed") for state in states)
+        failed = sum(state["status"] == "failed" for state in states)
+        conn = self.connect()
+        try:
+            conn.execute("UPDATE batches SET status = ?, processed = ?, failed = ?, items = ?, updated_at = ? WHERE id = ?",
+                         (status, processed, failed, json.dumps(states), time.strftime("%Y-%m-%d %H:%M:%S"), batch_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _run(self, batch_id, items, states, params):
+        lock = threading.Lock()
+        prepared = {}
+
+        def prepare_one(index):
+            item = items[index]
+            try:
+                result = self.prepare(item, params)
+                with lock:
+                    prepared[index] = result
+                    states[index]["status"] = "transcribed"
+            except Exception as e:
+                with lock:
+                    states[index].update(status="failed", error=str(e))
+            finally:
+                os.remove(item["path"])
+            with lock:
+                self._update(batch_id, states)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                list(executor.map(prepare_one, range(len(items))))
+
+                order = sorted(prepared)
+                packs = [order[i:i + self.prompt_size] for i in range(0, len(order), self.prompt_size)]
+                verdicts = executor.map(lambda pack: self.classify([prepared[i] for i in pack], params), packs)
+
+                rows = []
+                for pack, pack_verdicts in zip(packs, verdicts):
+                    for index, verdict in zip(pack, pack_verdicts):
+                        if isinstance(verdict, Exception):
+                            states[index].update(status="failed", error=str(verdict))
+                            continue
+                        states[index].update(status="done", classification=verdict["classification"],
+                                             human_prob=verdict["human_prob"], ai_prob=verdict["ai_prob"])
+                        rows.append((prepared[index], verdict))
+
+            self.save(rows)
+            self._update(batch_id, states, status="done")
+        except Exception as e:
+            # nothing was stored, so every item that has not already failed failed here
+            for state in states:
+                if state["status"] != "failed":
+                    state.update(status="failed", error=str(e))
+            self._update(batch_id, states, status="failed")
+        finally:
+            self._slots.release()
@@ -0,0 +1,119 @@
+"""Stream /results/export in each format and show that server memory stays flat.
+
+Usage:
+    python benchmarks/bench_export.py                          # 1,000,000 rows, every format
+    python benchmarks/bench_export.py --rows 200000 --formats ndjson,csv
+
+The backend runs in this process on a threaded werkzeug server with a temporary
+database seeded with --rows synthetic results. Each format is downloaded to a
+temporary file and its rows are counted. "server MB" is the growth of this process's
+peak RSS during the download, reset through /proc/self/clear_refs (Linux only).
+pyarrow is imported beforehand, so its one-off ~60 MB is not counted. The "fetchall"
+row is for comparison: it builds the whole table in memory with fetchall() and
+json.dumps, as a single unpaged /results response would.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+
+FORMATS = ("ndjson", "csv", "parquet")
+
+
+def vm_hwm_mb():
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return int(fields["VmHWM"].split()[0]) / 1024
+
+
+def vm_rss_mb():
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return int(fields["VmRSS"].split()[0]) / 1024
+
+
+def count_rows(path, export_format):
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, "rb") as f:
+        lines = sum(1 for _ in f)
+    return lines - 1 if export_format == "csv" else lines
+
+
+def download(url, path):
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(path, "wb") as f:
+            for block in response.iter_content(64 * 1024):
+                f.write(block)
+
+
+def fetchall_json(storage):
+    conn = storage.connect()
+    try:
+        rows = conn.execute("SELECT * FROM results ORDER BY timestamp, id").fetchall()
+        return len(json.dumps(rows))
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated: " + ", ".join(FORMATS))
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="truthscan_export_")
+    os.environ.setdefault("DB_PATH", os.path.join(directory, "results.db"))
+    server = None
+    try:
+        from werkzeug.serving import make_server
+
+        import backend
+        from load import seed_results
+
+        seed_results(backend.storage, args.rows)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+        server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/results/export"
+        formats = [name.strip() for name in args.formats.split(",") if name.strip()]
+        if "parquet" in formats:
+            import pyarrow.parquet  # noqa: F401
+
+        print(f"{args.rows} rows")
+        print(f"{'format':<9} {'rows':>9} {'MB':>8} {'seconds':>8} {'rows/s':>9} {'server MB':>9}")
+        for export_format in formats + ["fetchall"]:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")  # reset this process's VmHWM to its current RSS
+            before = vm_rss_mb()
+            start = time.perf_counter()
+            if export_format == "fetchall":
+                size, rows = fetchall_json(backend.storage), args.rows
+            else:
+                path = os.path.join(directory, f"results.{export_format}")
+                download(f"{url}?format={export_format}", path)
+                size, rows = os.path.getsize(path), count_rows(path, export_format)
+                os.remove(path)
+            elapsed = time.perf_counter() - start
+            print(f"{export_format:<9} {rows:>9} {size / 1024 ** 2:>8.1f} {elapsed:>8.1f} {rows / elapsed:>9.0f} "
+                  f"{vm_hwm_mb() - before:>9.0f}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark the sampled/downscaled gaze engine against a full-frame pass.
+
+Usage:
+    python benchmarks/bench_gaze.py                      # synthetic clip, stand-in face mesh
+    python benchmarks/bench_gaze.py --mediapipe --video interview.mp4
+
+The second table runs the full-frame pass on 1, 2, 4, ... pool workers to show how
+throughput scales with cores; the looking-away % must match across worker counts.
+The third shows the stored landmark series for the 5fps@640 mode: its size and how
+long recomputing the metrics from it takes compared with decoding the clip again.
+
+The synthetic clip draws a fixed "nose" dot and two moving "iris" dots; the stand-in
+face mesh locates them by colour, so the looking-away drift reflects frame sampling
+only and the frames/sec reflects decode + resize cost.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gaze  # noqa: E402
+from gaze_features import decode_series, encode_series, gaze_report  # noqa: E402
+from synthetic import ColourDotMesh, write_synthetic_clip  # noqa: E402
+
+MODES = {
+    "full": {"target_fps": 0, "frame_stride": 1, "max_side": 0},
+    "10fps@640": {"target_fps": 10, "frame_stride": 1, "max_side": 640},
+    "5fps@640": {"target_fps": 5, "frame_stride": 1, "max_side": 640},
+    "5fps@320": {"target_fps": 5, "frame_stride": 1, "max_side": 320},
+    "2fps@320": {"target_fps": 2, "frame_stride": 1, "max_side": 320},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="analyze this clip instead of a synthetic one")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--mediapipe", action="store_true", help="use the real FaceMesh instead of the stand-in")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="largest pool size to measure")
+    parser.add_argument("--min-segment", type=int, default=120, help="GAZE_MIN_SEGMENT_FRAMES for the scaling run")
+    args = parser.parse_args()
+
+    video_path = args.video
+    if not video_path:
+        fd, video_path = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+        write_synthetic_clip(video_path, args.seconds, args.fps, args.width, args.height)
+
+    mesh_factory = gaze.create_face_mesh if args.mediapipe else ColourDotMesh
+    gaze.GAZE_POOL_SIZE = args.workers
+    gaze.GAZE_MIN_SEGMENT_FRAMES = args.min_segment
+    baseline = None
+    print(f"{'mode':<12} {'sampled':>8} {'total':>8} {'seconds':>8} {'frames/s':>9} {'away %':>8} {'drift':>7}")
+    try:
+        for name, options in MODES.items():
+            start = time.perf_counter()
+            report = gaze.analyze_gaze(video_path, workers=1, mesh_factory=mesh_factory, **options)
+            elapsed = time.perf_counter() - start
+            percentage = report["looking_away_percentage"]
+            if baseline is None:
+                baseline = percentage
+            print(f"{name:<12} {report['frames_sampled']:>8} {report['frames_total']:>8} {elapsed:>8.2f} "
+                  f"{report['frames_total'] / elapsed:>9.1f} {percentage:>8.2f} {percentage - baseline:>+7.2f}")
+
+        print(f"\n{'workers':<8} {'segments':>8} {'seconds':>8} {'frames/s':>9} {'speedup':>8} {'away %':>8}")
+        single = None
+        workers = 1
+        while True:
+            gaze.analyze_gaze(video_path, workers=workers, mesh_factory=mesh_factory, **MODES["full"])  # warm the pool
+            start = time.perf_counter()
+            report = gaze.analyze_gaze(video_path, workers=workers, mesh_factory=mesh_factory, **MODES["full"])
+            elapsed = time.perf_counter() - start
+            single = single or elapsed
+            print(f"{workers:<8} {report['segments']:>8} {elapsed:>8.2f} {report['frames_total'] / elapsed:>9.1f} "
+                  f"{single / elapsed:>7.2f}x {report['looking_away_percentage']:>8.2f}")
+            if workers >= args.workers:
+                break
+            workers = min(workers * 2, args.workers)
+
+        start = time.perf_counter()
+        series = gaze.extract_gaze_series(video_path, workers=1, mesh_factory=mesh_factory, **MODES["5fps@640"])
+        extract = time.perf_counter() - start
+        blob = encode_series(series["landmarks"])
+        start = time.perf_counter()
+        report = gaze_report({**series, "landmarks": decode_series(blob)})
+        recompute = time.perf_counter() - start
+        print(f"\n{'series':<8} {'bytes':>8} {'extract s':>10} {'recompute ms':>13} {'away %':>8} {'longest s':>10} "
+              f"{'sweeps':>7} {'no face':>8}")
+        print(f"{'5fps@640':<8} {len(blob):>8} {extract:>10.2f} {recompute * 1000:>13.2f} "
+              f"{report['looking_away_percentage']:>8.2f} {report['longest_away_seconds']:>10.2f} "
+              f"{report['reading_sweeps']:>7} {report['face_absent_frames']:>8}")
+    finally:
+        gaze.shutdown_pool()
+        if not args.video:
+            os.remove(video_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Benchmark the local linguistic pre-classifier on the fixture corpus.
+
+Usage:
+    python benchmarks/bench_linguistic.py [--gemini-latency 4.0] [--folds 6] [--refit]
+
+For several confidence bands it reports how many transcripts would still be
+escalated to Gemini, how accurate the locally decided ones are, the local
+classification latency, and the Gemini time saved (decided locally x the given
+average Gemini latency). Accuracy and escalation are held-out: the corpus is split
+into --folds stratified folds and each fold is scored by a model fitted on the
+others. Transcripts are scored in their as_spoken() form, and gaze is left out
+because the fixture gaze values are not measurements. --refit prints MODEL weights
+fitted on the whole corpus.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import linguistic  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "transcripts.jsonl")
+BANDS = [0.05, 0.1, 0.2, 0.3]
+
+
+def samples(corpus):
+    return [(linguistic.extract_features(d["transcription"]), int(d["label"] == "ai")) for d in corpus]
+
+
+def cross_validate(corpus, folds):
+    """(AI probability, label) for every transcript, each from a model that did not see it."""
+    by_label = {}
+    for d in corpus:
+        by_label.setdefault(d["label"], []).append(d)
+    fold_of = {}
+    for items in by_label.values():
+        for position, d in enumerate(items):
+            fold_of[id(d)] = position % folds
+    scored = []
+    for fold in range(folds):
+        train = [d for d in corpus if fold_of[id(d)] != fold]
+        model = linguistic.fit(samples(train))
+        scored += [(linguistic.predict_proba(linguistic.extract_features(d["transcription"]), model), d["label"])
+                   for d in corpus if fold_of[id(d)] == fold]
+    return scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--gemini-latency", type=float, default=4.0, help="average Gemini call in seconds")
+    parser.add_argument("--folds", type=int, default=6)
+    parser.add_argument("--refit", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.fixtures) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    if args.refit:
+        print(json.dumps(linguistic.fit(samples(corpus)), indent=4))
+        return
+
+    start = time.perf_counter()
+    for d in corpus:
+        linguistic.classify_locally(d["transcription"])
+    per_item_ms = (time.perf_counter() - start) * 1000 / len(corpus)
+    scored = cross_validate(corpus, args.folds)
+
+    print(f"{len(corpus)} transcripts, {args.folds}-fold held-out, local classifier {per_item_ms:.3f} ms/transcript\n")
+    print(f"{'band':>6} {'escalated':>10} {'local acc':>10} {'saved s':>8} {'saved %':>8}")
+    for band in BANDS:
+        local = [(p, label) for p, label in scored if p <= band or p >= 1 - band]
+        correct = sum((p >= 0.5) == (label == "ai") for p, label in local)
+        escalated = len(scored) - len(local)
+        saved = len(local) * (args.gemini_latency - per_item_ms / 1000)
+        accuracy = f"{correct / len(local):.1%}" if local else "-"
+        print(f"{band:>6.2f} {escalated / len(scored):>10.1%} {accuracy:>10} {saved:>8.1f} "
+              f"{saved / (len(scored) * args.gemini_latency):>8.1%}")
+    overall = sum((p >= 0.5) == (label == "ai") for p, label in scored) / len(scored)
+    print(f"\nheld-out accuracy with every transcript decided locally: {overall:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Measure how soon a /live WebSocket session reports while an answer is still being spoken.
+
+Usage:
+    python benchmarks/bench_live.py                             # 3 answers of 30 s, audio only, real time
+    python benchmarks/bench_live.py --video --fps 15 --speed 4  # with webcam frames, 4x faster than real time
+    python benchmarks/bench_live.py --sessions 4 --llm-latency 3
+
+The backend runs in this process on a threaded werkzeug server with a temporary
+database and the fakes from benchmarks/fakes.py (--recognizer-latency, --llm-latency);
+video frames are located by the colour-dot FaceMesh stand-in. Each client streams
+synthetic speech in --frame-ms audio messages paced at --speed times real time
+(plus JPEG frames from the synthetic gaze clip with --video) and sends
+"answer_end" after each answer. Needs flask-sock; --video also needs ffmpeg.
+
+Reported per session (medians across sessions):
+    first update     -- seconds from the first audio frame to the first "update"
+    first words      -- seconds from the first audio frame to an update with text
+    final            -- seconds from "answer_end" to that answer's "final" verdict
+    upload only      -- the same answer recorded first, then posted to /analyze:
+                        answer length / --speed + the /analyze time (the first signal before)
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fakes import FakeModel, FakeRecognizer  # noqa: E402
+from synthetic import ColourDotMesh, speech_pcm, write_speech_wav, write_synthetic_clip  # noqa: E402
+
+AUDIO_FRAME, VIDEO_FRAME = b"\x01", b"\x02"
+
+
+def start_server(args, directory):
+    """Import the backend with fakes wired in and serve it on a free local port."""
+    os.environ.setdefault("DB_PATH", os.path.join(directory, "results.db"))
+    os.environ.setdefault("CACHE_ENABLED", "0")
+    from werkzeug.serving import make_server
+
+    import backend
+    import gaze
+    import live
+    import transcription
+
+    if backend.Sock is None:
+        sys.exit("flask-sock is not installed: pip install flask-sock")
+    transcription.default_recognizer = FakeRecognizer(latency=args.recognizer_latency, seed=1)
+    backend.model = FakeModel(latency=args.llm_latency, seed=2)
+    live.default_mesh_factory = ColourDotMesh
+    backend.extract_gaze_series = functools.partial(gaze.extract_gaze_series, mesh_factory=ColourDotMesh)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def video_frames(directory, args, seed):
+    """JPEG-encoded frames of a synthetic gaze clip, one answer long."""
+    path = os.path.join(directory, f"clip{seed}.mp4")
+    write_synthetic_clip(path, args.answer_seconds, args.fps, 640, 480, seed=seed)
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+    capture.release()
+    return frames
+
+
+def run_client(port, args, directory, seed, report):
+    """Stream --answers answers over one session and record when messages arrive."""
+    from simple_websocket import Client, ConnectionClosed
+
+    answers = [(speech_pcm(args.answer_seconds, seed=seed * 100 + answer),
+                video_frames(directory, args, seed * 100 + answer) if args.video else [])
+               for answer in range(args.answers)]
+    ws = Client.connect(f"ws://127.0.0.1:{port}/live?threshold=50")
+    messages = []
+    done = threading.Event()
+
+    def listen():
+        try:
+            while True:
+                message = json.loads(ws.receive())
+                messages.append((time.perf_counter(), message))
+                if message["type"] == "closed":
+                    break
+        except Exception:
+            pass
+        done.set()
+
+    threading.Thread(target=listen, daemon=True).start()
+    step = int(16000 * args.frame_ms / 1000)
+    began, answer_ends = None, []
+    for pcm, frames in answers:
+        start = time.perf_counter()
+        began = began or start
+        sent_frames = 0
+        for offset in range(0, len(pcm), step):
+            ws.send(AUDIO_FRAME + pcm[offset:offset + step].tobytes())
+            position = (offset + step) / 16000
+            while sent_frames < len(frames) and sent_frames / args.fps < position:
+                ws.send(VIDEO_FRAME + frames[sent_frames])
+                sent_frames += 1
+            delay = start + position / args.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        answer_ends.append(time.perf_counter())
+        ws.send(json.dumps({"type": "answer_end"}))
+    ws.send(json.dumps({"type": "stop"}))
+    done.wait(120)
+    try:
+        ws.close()
+    except ConnectionClosed:
+        pass  # the server closed first
+
+    updates = [(at, m) for at, m in messages if m["type"] == "update"]
+    finals = {m["answer"]: at for at, m in messages if m["type"] == "final"}
+    errors = [m["error"] for _, m in messages if m["type"] == "error"]
+    report.append({
+        "first_update": updates[0][0] - began if updates else None,
+        "first_words": next((at - began for at, m in updates if m["transcription"]), None),
+        "finals": [finals[answer] - ended for answer, ended in enumerate(answer_ends) if answer in finals],
+        "errors": errors,
+    })
+
+
+def upload_baseline(port, args, directory):
+    """Seconds POST /analyze takes for one recorded answer."""
+    path = os.path.join(directory, "answer.wav")
+    write_speech_wav(path, args.answer_seconds, seed=999)
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        response = requests.post(f"http://127.0.0.1:{port}/analyze", files={"file": f},
+                                 data={"file_type": "audio", "threshold": "50"}, timeout=600)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+def median(values):
+    values = [value for value in values if value is not None]
+    return f"{statistics.median(values):.2f}" if values else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1, help="concurrent WebSocket clients")
+    parser.add_argument("--answers", type=int, default=3)
+    parser.add_argument("--answer-seconds", type=float, default=30)
+    parser.add_argument("--speed", type=float, default=1.0, help="streaming speed relative to real time")
+    parser.add_argument("--frame-ms", type=int, default=100, help="audio per message")
+    parser.add_argument("--video", action="store_true", help="also stream JPEG frames")
+    parser.add_argument("--fps", type=float, default=15)
+    parser.add_argument("--recognizer-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=1.5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="truthscan_live_")
+    server = None
+    try:
+        server, port = start_server(args, directory)
+        report = []
+        clients = [threading.Thread(target=run_client, args=(port, args, directory, seed, report))
+                   for seed in range(args.sessions)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        baseline = upload_baseline(port, args, directory)
+
+        finals = [value for session in report for value in session["finals"]]
+        print(f"{args.sessions} session(s) x {args.answers} answers of {args.answer_seconds:g} s at {args.speed:g}x, "
+              f"video {'on' if args.video else 'off'}")
+        print(f"{'first update s':>14} {'first words s':>14} {'final p50 s':>12} {'final max s':>12} "
+              f"{'upload only s':>14} {'errors':>7}")
+        print(f"{median(s['first_update'] for s in report):>14} {median(s['first_words'] for s in report):>14} "
+              f"{median(finals):>12} {max(finals, default=0):>12.2f} {args.answer_seconds / args.speed + baseline:>14.2f} "
+              f"{sum(len(s['errors']) for s in report):>7}")
+        for error in sorted({e for s in report for e in s["errors"]})[:3]:
+            print(f"    {error}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
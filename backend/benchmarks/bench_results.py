@@ -0,0 +1,122 @@
+"""Benchmark /results queries on a synthetic results table.
+
+Usage:
+    python benchmarks/bench_results.py [--rows 1000000] [--skip-legacy]
+
+Builds a throwaway SQLite database with --rows synthetic analyses, then compares
+the legacy unbounded `SELECT * ... ORDER BY timestamp DESC` (materialized as dicts
+and JSON) against keyset-paginated, filtered and projected pages, with and
+without the RESULTS_INDEXES.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from queries import RESULT_COLUMNS, RESULTS_INDEXES, encode_cursor, results_page_query  # noqa: E402
+
+LIST_FIELDS = "id,classification,human_prob,ai_prob,timestamp"
+CASES = {
+    "first page (all columns)": {},
+    "first page (list fields)": {"fields": LIST_FIELDS},
+    "classification filter": {"fields": LIST_FIELDS, "classification": "Fake (AI-Generated)"},
+    "ai_prob 90-100": {"fields": LIST_FIELDS, "min_ai_prob": "90"},
+    "one-day range": {"fields": LIST_FIELDS, "since": "2025-02-01", "until": "2025-02-01"},
+}
+
+
+def build_table(path, rows, seed=0):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE results
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     transcription TEXT,
+                     classification TEXT,
+                     human_prob REAL,
+                     ai_prob REAL,
+                     justification TEXT,
+                     timestamp TEXT)''')
+    start = time.mktime((2025, 1, 1, 0, 0, 0, 0, 0, -1))
+    words = "um so I think the project we shipped was really about teamwork and delivering value".split()
+
+    def generate():
+        for i in range(rows):
+            ai_prob = rng.randint(0, 100)
+            yield (" ".join(rng.choices(words, k=120)),
+                   "Fake (AI-Generated)" if ai_prob > 50 else "Real (Human-Created)",
+                   100 - ai_prob, ai_prob,
+                   "- Justification: " + " ".join(rng.choices(words, k=40)),
+                   time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + i * 60)))
+
+    conn.executemany("INSERT INTO results (transcription, classification, human_prob, ai_prob, justification, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+                     generate())
+    conn.commit()
+    return conn
+
+
+def fetch_page(conn, args):
+    sql, params, fields, limit = results_page_query(args)
+    rows = conn.execute(sql, params).fetchall()
+    results = [dict(zip(fields, row)) for row in rows[:limit]]
+    next_cursor = encode_cursor(results[-1]["timestamp"], results[-1]["id"]) if len(rows) > limit else None
+    return json.dumps({"results": results, "next_cursor": next_cursor}), next_cursor
+
+
+def timed(func, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def run_cases(conn, label):
+    for name, args in CASES.items():
+        print(f"{label:<10} {name:<28} {timed(lambda: fetch_page(conn, args)):>10.2f} ms")
+
+    def walk(pages=20):
+        cursor = None
+        for _ in range(pages):
+            _, cursor = fetch_page(conn, {"fields": LIST_FIELDS, **({"cursor": cursor} if cursor else {})})
+    print(f"{label:<10} {'20 pages via cursor':<28} {timed(walk, repeat=3) / 20:>10.2f} ms/page")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-legacy", action="store_true", help="skip the full-table legacy query")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        conn = build_table(path, args.rows)
+        print(f"built {args.rows} rows in {time.perf_counter() - start:.1f} s ({os.path.getsize(path) / 1e6:.0f} MB)\n")
+
+        if not args.skip_legacy:
+            def legacy():
+                rows = conn.execute("SELECT * FROM results ORDER BY timestamp DESC").fetchall()
+                return json.dumps([dict(zip(RESULT_COLUMNS, row)) for row in rows])
+            print(f"{'legacy':<10} {'SELECT * (whole table)':<28} {timed(legacy, repeat=1):>10.2f} ms")
+
+        run_cases(conn, "no index")
+        start = time.perf_counter()
+        for index in RESULTS_INDEXES:
+            conn.execute(index)
+        conn.commit()
+        print(f"\ncreated indexes in {time.perf_counter() - start:.1f} s\n")
+        run_cases(conn, "indexed")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark near-duplicate lookup (MinHash + LSH) on large result tables.
+
+Usage:
+    python benchmarks/bench_similarity.py [--sizes 100000,1000000] [--queries 500] [--words 120]
+
+Fills a temporary database with synthetic transcripts (Zipf-distributed
+vocabulary) through the same insert path as the backend, then for each size
+reports signature cost at insert time, the time to load the LSH index from
+SQLite, its memory, lookup latency and recall. Queries are edited copies of
+stored transcripts with a known true Jaccard similarity; recall counts the
+ones at or above the threshold whose original was reported.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage  # noqa: E402
+from similarity import SimilarityIndex, SIMILARITY_THRESHOLD, SHINGLE_SIZE, LSH_BANDS  # noqa: E402
+
+VOCABULARY = 20000
+INSERT_BATCH = 5000
+
+
+class Corpus:
+    def __init__(self, words, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.words = words
+        self.vocabulary = np.array([f"w{i}" for i in range(VOCABULARY)])
+        weights = 1.0 / np.arange(1, VOCABULARY + 1)
+        self.weights = weights / weights.sum()
+
+    def texts(self, count):
+        indices = self.rng.choice(VOCABULARY, size=(count, self.words), p=self.weights)
+        return [" ".join(row) for row in self.vocabulary[indices]]
+
+    def edit(self, text, rate, tag):
+        words = text.split()
+        for i in self.rng.choice(len(words), max(1, int(len(words) * rate)), replace=False):
+            words[i] = f"edit{tag}x{i}"
+        return " ".join(words)
+
+
+def true_jaccard(a, b):
+    grams = lambda words: {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    a, b = grams(a.split()), grams(b.split())
+    return len(a & b) / len(a | b)
+
+
+def fill(pool, index, corpus, count):
+    """Insert `count` more results with signatures; returns seconds spent signing."""
+    signing = 0.0
+    for done in range(0, count, INSERT_BATCH):
+        texts = corpus.texts(min(INSERT_BATCH, count - done))
+        values = [(text, "Real (Human-Created)", 80, 20, "- Justification: synthetic", "2026-01-01 00:00:00", None)
+                  for text in texts]
+        conn = pool.connect()
+        try:
+            conn.executemany(storage.RESULTS_INSERT, values)
+            start = time.perf_counter()
+            index.store_inserted(conn, values)
+            signing += time.perf_counter() - start
+            conn.commit()
+        finally:
+            conn.close()
+    return signing
+
+
+def measure(pool, corpus, size, queries):
+    rng = corpus.rng
+    conn = pool.connect()
+    try:
+        ids = rng.choice(size, queries, replace=False) + 1
+        originals = dict(conn.execute(f"SELECT id, transcription FROM results WHERE id IN ({','.join('?' * queries)})",
+                                      [int(i) for i in ids]).fetchall())
+    finally:
+        conn.close()
+
+    index = SimilarityIndex(connect=pool.connect, max_results=10, max_indexed=size)  # the whole corpus
+    start = time.perf_counter()
+    index.refresh()
+    load = time.perf_counter() - start
+    memory = sum(keys.nbytes + ids_.nbytes for keys, ids_ in zip(index.lsh._keys, index.lsh._ids))
+
+    latencies, expected, found = [], 0, 0
+    for number, (result_id, text) in enumerate(originals.items()):
+        query = corpus.edit(text, rng.uniform(0.02, 0.25), number)
+        start = time.perf_counter()
+        matches = index.similar(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if true_jaccard(text, query) >= index.threshold:
+            expected += 1
+            found += any(match["id"] == result_id for match in matches)
+    latencies = np.array(latencies)
+    return load, memory, np.percentile(latencies, 50), np.percentile(latencies, 95), found, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--words", type=int, default=120)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_similarity_")
+    try:
+        pool = storage.ConnectionPool(os.path.join(directory, "results.db"))
+        pool.migrate()
+        corpus = Corpus(args.words)
+        writer = SimilarityIndex(connect=pool.connect)
+        print(f"threshold {SIMILARITY_THRESHOLD}, {LSH_BANDS} bands, {args.words}-word transcripts")
+        print(f"{'rows':>9} {'sign us/row':>12} {'load s':>8} {'index MB':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall':>12}")
+        stored = 0
+        for size in sorted(int(size) for size in args.sizes.split(",")):
+            signing = fill(pool, writer, corpus, size - stored)
+            sign_us = signing / (size - stored) * 1e6
+            stored = size
+            load, memory, p50, p95, found, expected = measure(pool, corpus, size, args.queries)
+            recall = f"{found}/{expected} {found / max(expected, 1):.0%}"
+            print(f"{size:>9} {sign_us:>12.0f} {load:>8.1f} {memory / 2 ** 20:>9.0f} {p50:>8.2f} {p95:>8.2f} {recall:>12}")
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
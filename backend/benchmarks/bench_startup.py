@@ -0,0 +1,72 @@
+"""Measure backend import time and memory per process role.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 3]
+
+Each configuration imports backend.py in a fresh interpreter (with a temporary
+database) and reports the import wall time, RSS after import, and the time and
+RSS once every analyzer has been loaded (what the first /analyze request, or
+PRELOAD_ANALYZERS=1, pays). "eager" imports the heavy modules up front the way
+backend.py did before they were made lazy.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+sys.path.insert(0, {backend_dir!r})
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        return int(next(line for line in f if line.startswith("VmRSS")).split()[1]) / 1024
+
+start = time.perf_counter()
+if {eager!r}:
+    import cv2, mediapipe, google.generativeai, speech_recognition
+import backend
+imported = time.perf_counter() - start
+imported_rss = rss_mb()
+start = time.perf_counter()
+backend.warm_up()
+print(json.dumps({{"import": imported, "import_rss": imported_rss,
+                  "warm": time.perf_counter() - start, "warm_rss": rss_mb()}}))
+"""
+
+CONFIGS = [
+    ("eager (old)", {"BACKEND_ROLE": "all"}, True),
+    ("all (lazy)", {"BACKEND_ROLE": "all"}, False),
+    ("api", {"BACKEND_ROLE": "api"}, False),
+]
+
+
+def measure(env, eager, directory):
+    env = dict(os.environ, DB_PATH=os.path.join(directory, "results.db"), JOB_UPLOAD_DIR=directory, **env)
+    output = subprocess.run([sys.executable, "-c", CHILD.format(backend_dir=BACKEND_DIR, eager=eager)],
+                            env=env, cwd=directory, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per configuration (medians are shown)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as directory:
+        print(f"{'config':<12} {'import s':>9} {'RSS MB':>7} {'warm-up s':>10} {'warm RSS MB':>12}")
+        for name, env, eager in CONFIGS:
+            runs = [measure(env, eager, directory) for _ in range(args.repeat)]
+            median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            print(f"{name:<12} {median['import']:>9.2f} {median['import_rss']:>7.0f} "
+                  f"{median['warm']:>10.2f} {median['warm_rss']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
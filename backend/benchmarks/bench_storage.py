@@ -0,0 +1,140 @@
+"""Benchmark result inserts and reads under concurrent writers.
+
+Usage:
+    python benchmarks/bench_storage.py [--writers 8] [--rows 500] [--readers 4]
+
+Compares the legacy pattern (new connection + CREATE TABLE IF NOT EXISTS per
+request, rollback journal) with the pooled WAL storage layer, with and without
+the write-behind buffer. Readers run keyset page queries while writers insert.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage  # noqa: E402
+from queries import results_page_query  # noqa: E402
+
+ROW = ("um so I think I led the migration and it went fine", "Real (Human-Created)", 80, 20,
+       "- Justification: filler words", "2026-01-01 00:00:00", None)
+
+
+def legacy_connect(path):
+    conn = sqlite3.connect(path)
+    conn.execute(storage.MIGRATIONS[0][0])
+    conn.commit()
+    return conn
+
+
+def legacy_insert(path):
+    conn = legacy_connect(path)
+    try:
+        conn.execute(storage.RESULTS_INSERT, ROW)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def legacy_read(path):
+    conn = legacy_connect(path)
+    try:
+        sql, params, _, _ = results_page_query({"fields": "id,classification,ai_prob,timestamp"})
+        conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def run(label, insert, read, writers, rows, readers):
+    stop = threading.Event()
+    reads = [0] * readers
+    errors = []
+
+    def write_loop():
+        for _ in range(rows):
+            try:
+                insert()
+            except sqlite3.Error as e:
+                errors.append(e)
+
+    def read_loop(index):
+        while not stop.is_set():
+            try:
+                read()
+                reads[index] += 1
+            except sqlite3.Error as e:
+                errors.append(e)
+
+    reader_threads = [threading.Thread(target=read_loop, args=(i,)) for i in range(readers)]
+    writer_threads = [threading.Thread(target=write_loop) for _ in range(writers)]
+    for thread in reader_threads:
+        thread.start()
+    start = time.perf_counter()
+    for thread in writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in reader_threads:
+        thread.join()
+    return elapsed, sum(reads), len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=500, help="inserts per writer")
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+    total = args.writers * args.rows
+
+    print(f"{'mode':<22} {'inserts/s':>10} {'reads/s':>10} {'errors':>7}")
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "legacy.db")
+        elapsed, reads, errors = run("legacy", lambda: legacy_insert(path), lambda: legacy_read(path),
+                                     args.writers, args.rows, args.readers)
+        print(f"{'legacy':<22} {total / elapsed:>10.0f} {reads / elapsed:>10.0f} {errors:>7}")
+
+        for label, write_behind in (("pooled WAL", False), ("pooled WAL + buffer", True)):
+            pool = storage.ConnectionPool(os.path.join(directory, f"{label}.db"))
+            pool.migrate()
+            buffer = storage.WriteBehindBuffer(pool, storage.RESULTS_INSERT) if write_behind else None
+
+            def insert():
+                if buffer is not None:
+                    buffer.add([ROW])
+                    return
+                conn = pool.connect()
+                try:
+                    conn.execute(storage.RESULTS_INSERT, ROW)
+                    conn.commit()
+                finally:
+                    conn.close()
+
+            def read():
+                conn = pool.connect()
+                try:
+                    sql, params, _, _ = results_page_query({"fields": "id,classification,ai_prob,timestamp"})
+                    conn.execute(sql, params).fetchall()
+                finally:
+                    conn.close()
+
+            elapsed, reads, errors = run(label, insert, read, args.writers, args.rows, args.readers)
+            if buffer is not None:
+                start = time.perf_counter()
+                buffer.flush()
+                elapsed += time.perf_counter() - start
+            print(f"{label:<22} {total / elapsed:>10.0f} {reads / elapsed:>10.0f} {errors:>7}")
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
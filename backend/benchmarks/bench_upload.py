@@ -0,0 +1,161 @@
+"""Compare how the frontends' upload methods send a large video: payload bytes and peak memory.
+
+Usage:
+    python benchmarks/bench_upload.py                  # 500 MB upload, every mode
+    python benchmarks/bench_upload.py --size-mb 100 --modes multipart-stream,resumable
+
+Modes (each client runs in its own process so its peak RSS is its own):
+    hex-json          what "app (1).py" did: file_bytes.hex() inside a JSON body
+    multipart-bytes   what frontend/app.py did: requests files= with the file's bytes
+    multipart-stream  frontend/client.py: one multipart request read from disk as it is sent
+    resumable         frontend/client.py: 8 MB PATCH /uploads chunks, then /analyze by upload id
+
+The backend runs in this process on a threaded werkzeug server with a temporary
+database and fake Speech/Gemini backends. The upload is random bytes, so every
+mode except hex-json (which the backend never accepted; it is sent to a raw
+upload so the body is read) ends in an ffmpeg decode error after the transfer.
+Only the transfer is measured. "payload MB" is the sum of request Content-Lengths.
+"server MB" is the growth of this process's peak RSS during the mode. It is reset
+through /proc/self/clear_refs, so it is Linux only.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(BENCHMARKS)), "frontend"))
+
+MODES = ("hex-json", "multipart-bytes", "multipart-stream", "resumable")
+FIELDS = {"file_type": "video", "context": "Formal Interview", "threshold": "50"}
+
+
+def vm_hwm_mb():
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return int(fields["VmHWM"].split()[0]) / 1024
+
+
+def vm_rss_mb():
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return int(fields["VmRSS"].split()[0]) / 1024
+
+
+def run_client(mode, url, path):
+    """Upload `path` the way `mode` does; prints {"status", "seconds", "peak_mb"} as JSON."""
+    import client
+
+    start = time.perf_counter()
+    if mode == "hex-json":
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        upload_id = requests.post(f"{url}/uploads").json()["upload_id"]
+        body = json.dumps({**FIELDS, "video_bytes": file_bytes.hex()})
+        response = requests.patch(f"{url}/uploads/{upload_id}", data=body,
+                                  headers={"Content-Type": "application/json", "Upload-Offset": "0"})
+        status = response.status_code
+    elif mode == "multipart-bytes":
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        status = requests.post(f"{url}/analyze", files={"file": ("video.mp4", file_bytes, "video/mp4")},
+                               data=FIELDS).status_code
+    else:
+        if mode == "multipart-stream":
+            client.RESUMABLE_MIN_BYTES = float("inf")
+        else:
+            client.RESUMABLE_MIN_BYTES = 0
+        try:
+            client.analyze(path, "video", FIELDS["context"], FIELDS["threshold"], api_url=url)
+            status = 200
+        except client.ApiError as e:
+            status = e.status
+    print(json.dumps({"status": status, "seconds": time.perf_counter() - start, "peak_mb": vm_hwm_mb()}))
+
+
+def start_server(directory):
+    """Import the backend with fakes wired in; returns (server, url, payload counter)."""
+    os.environ.setdefault("DB_PATH", os.path.join(directory, "results.db"))
+    os.environ.setdefault("CACHE_ENABLED", "0")
+    os.environ.setdefault("SPOOL_DIR", directory)
+    os.environ.setdefault("UPLOAD_DIR", os.path.join(directory, "partial"))
+    from werkzeug.serving import make_server
+
+    from fakes import FakeModel, FakeRecognizer
+    import backend
+    import transcription
+
+    transcription.default_recognizer = FakeRecognizer(latency=0.01, seed=1)
+    backend.model = FakeModel(latency=0.01, seed=2)
+    backend.warm_up()  # so the first mode's server memory does not include loading the analyzers
+
+    payload = {"bytes": 0}
+    wsgi_app = backend.app.wsgi_app
+
+    def counting_app(environ, start_response):
+        payload["bytes"] += int(environ.get("CONTENT_LENGTH") or 0)
+        return wsgi_app(environ, start_response)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    server = make_server("127.0.0.1", 0, counting_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", payload
+
+
+def write_payload(path, size_mb):
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated: " + ", ".join(MODES))
+    parser.add_argument("--client", nargs=3, metavar=("MODE", "URL", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.client:
+        run_client(*args.client)
+        return
+
+    directory = tempfile.mkdtemp(prefix="truthscan_upload_")
+    server = None
+    try:
+        server, url, payload = start_server(directory)
+        path = os.path.join(directory, "interview.mp4")
+        write_payload(path, args.size_mb)
+
+        print(f"{args.size_mb} MB video upload")
+        print(f"{'mode':<17} {'status':>6} {'payload MB':>10} {'x file':>7} {'client peak MB':>14} "
+              f"{'server MB':>9} {'seconds':>8}")
+        for mode in [name.strip() for name in args.modes.split(",") if name.strip()]:
+            payload["bytes"] = 0
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")  # reset this process's VmHWM to its current RSS
+            before = vm_rss_mb()
+            result = subprocess.run([sys.executable, os.path.abspath(__file__), "--client", mode, url, path],
+                                    capture_output=True, text=True)
+            if result.returncode:
+                print(f"{mode:<17} failed: {result.stderr.strip().splitlines()[-1]}")
+                continue
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            sent = payload["bytes"] / 1024 ** 2
+            print(f"{mode:<17} {report['status']:>6} {sent:>10.0f} {sent / args.size_mb:>7.2f} "
+                  f"{report['peak_mb']:>14.0f} {vm_hwm_mb() - before:>9.0f} {report['seconds']:>8.1f}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Offline stand-ins for Google Speech and Gemini with configurable latency and output.
+
+FakeRecognizer has the transcription.GoogleRecognizer call signature and FakeModel
+the generate_content() method of genai.GenerativeModel, so either can be swapped in
+without touching the code under test:
+
+    transcription.default_recognizer = FakeRecognizer(latency=0.3)
+    backend.model = FakeModel(latency=1.5)
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "transcripts.jsonl")
+
+DEFAULT_REPLY = {
+    "classification": "Fake (AI-Generated)",
+    "probability": 72,
+    "justification": "Uniform sentence structure and no filler words; the speaker looks away regularly.",
+}
+INVALID_REPLY = '{"classification": "Fake (AI-Generated)", "probab'  # a reply cut off mid-JSON
+
+
+def fixture_transcripts():
+    """The labeled transcripts shipped in fixtures/transcripts.jsonl."""
+    with open(FIXTURES, encoding="utf-8") as f:
+        return [json.loads(line)["transcription"] for line in f if line.strip()]
+
+
+class _Latency:
+    """latency + per_second * seconds of work, scaled by a uniform +/- jitter fraction."""
+
+    def __init__(self, latency, per_second=0.0, jitter=0.2, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.per_second = per_second
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self, seconds=0.0):
+        with self._lock:
+            scale = 1 + self._rng.uniform(-self.jitter, self.jitter)
+            fail = self._rng.random() < self.failure_rate
+        time.sleep(max(0.0, (self.latency + self.per_second * seconds) * scale))
+        if fail:
+            raise RuntimeError("injected failure")
+
+    def chance(self, rate):
+        with self._lock:
+            return self._rng.random() < rate
+
+
+class FakeRecognizer(_Latency):
+    """(pcm, sample_rate) -> text after a delay; cycles through `texts` (the fixtures by default).
+
+    Each call returns about `words_per_second` words per second of audio, so stitched
+    transcripts have realistic length whatever the chunking.
+    """
+
+    def __init__(self, latency=0.3, per_second=0.02, jitter=0.2, failure_rate=0.0, texts=None,
+                 words_per_second=2.5, seed=None):
+        super().__init__(latency, per_second, jitter, failure_rate, seed)
+        self.words = " ".join(texts or fixture_transcripts()).split()
+        self.words_per_second = words_per_second
+        self._position = 0
+
+    def __call__(self, pcm, sample_rate):
+        seconds = len(pcm) / 2 / sample_rate
+        self.wait(seconds)
+        count = max(1, int(seconds * self.words_per_second))
+        with self._lock:
+            start = self._position
+            self._position = (start + count) % len(self.words)
+        return " ".join(self.words[(start + i) % len(self.words)] for i in range(count))
+
+
+class FakeModel(_Latency):
+    """generate_content(prompt) -> object with .text (a JSON reply), after a delay.
+
+    `reply` (a verdict dict) is returned for single-transcript prompts; packed prompts
+    ("### Item N" sections) get {"items": [...]} with `reply` and the item number per
+    item. `invalid_rate` of the replies are cut off mid-JSON, and `failure_rate` of
+    the calls raise, like a flaky provider.
+    """
+
+    def __init__(self, latency=1.5, per_item=0.2, jitter=0.2, failure_rate=0.0, invalid_rate=0.0, reply=DEFAULT_REPLY,
+                 seed=None):
+        super().__init__(latency, per_item, jitter, failure_rate, seed)
+        self.invalid_rate = invalid_rate
+        self.reply = reply
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        items = [int(number) for number in re.findall(r"^\s*### Item (\d+)\s*$", prompt, flags=re.MULTILINE)]
+        with self._lock:
+            self.calls += 1
+        self.wait(len(items))
+        if self.chance(self.invalid_rate):
+            return SimpleNamespace(text=INVALID_REPLY)
+        if not items:
+            return SimpleNamespace(text=json.dumps(self.reply))
+        return SimpleNamespace(text=json.dumps({"items": [{"item": number, **self.reply} for number in items]}))
@@ -0,0 +1,226 @@
+"""Load test /analyze and /results offline, with fake Speech and Gemini backends.
+
+Usage:
+    python benchmarks/load.py                                       # audio /analyze, then /results
+    python benchmarks/load.py --media video --seconds 60 --resolution 1280x720 --concurrency 4
+    python benchmarks/load.py --endpoints results --concurrency 32 --requests 2000 --seed-rows 100000
+    python benchmarks/load.py --recognizer-latency 0.5 --llm-latency 3 --llm-failure-rate 0.05 --llm-invalid-rate 0.1
+    python benchmarks/load.py --url http://localhost:5000 --pid <server pid>   # an already running server
+
+By default the backend runs in this process on a threaded werkzeug server with a
+temporary database, the result cache disabled (--cache keeps it on), the speech
+recognizer and Gemini replaced by benchmarks/fakes.py and, for videos, FaceMesh
+replaced by the colour-dot stand-in (--mediapipe runs the real one). Uploads are
+synthetic files from benchmarks/synthetic.py; decoding them needs the ffmpeg binary.
+
+Each endpoint is driven by --concurrency client threads until --requests requests
+(or --duration seconds) and reported as requests/s and p50/p95/p99 latency. Peak
+RSS is this process's high-water mark (server + client) and that of the largest
+live child (gaze pool workers); with --url, pass --pid to read the server's instead.
+Linux only (reads /proc).
+"""
+import argparse
+import functools
+import itertools
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fakes import FakeModel, FakeRecognizer  # noqa: E402
+from synthetic import ColourDotMesh, write_interview_clip, write_speech_wav  # noqa: E402
+
+
+def start_server(args, directory):
+    """Import the backend with fakes wired in and serve it on a free local port."""
+    os.environ.setdefault("DB_PATH", os.path.join(directory, "results.db"))
+    os.environ.setdefault("CACHE_ENABLED", "1" if args.cache else "0")
+    from werkzeug.serving import make_server
+
+    import backend
+    import gaze
+    import transcription
+
+    transcription.default_recognizer = FakeRecognizer(latency=args.recognizer_latency, seed=1)
+    backend.model = FakeModel(latency=args.llm_latency, failure_rate=args.llm_failure_rate,
+                              invalid_rate=args.llm_invalid_rate, seed=2)
+    if not args.mediapipe:
+        backend.extract_gaze_series = functools.partial(gaze.extract_gaze_series, mesh_factory=ColourDotMesh)
+    if args.seed_rows:
+        seed_results(backend.storage, args.seed_rows)
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no per-request access log
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def seed_results(storage, count):
+    """Insert `count` synthetic rows so /results pages come from a realistically sized table."""
+    rng = np.random.default_rng(3)
+    labels = ("Real (Human-Created)", "Fake (AI-Generated)")
+    conn = storage.connect()
+    try:
+        for done in range(0, count, 10000):
+            rows = []
+            for i in range(done, min(count, done + 10000)):
+                ai_prob = int(rng.integers(0, 101))
+                timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1.7e9 + i))
+                rows.append((f"synthetic transcript {i}", labels[ai_prob > 50], 100 - ai_prob, ai_prob,
+                             "- Justification: synthetic", timestamp, None))
+            conn.executemany(storage.RESULTS_INSERT, rows)
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def make_uploads(args, directory):
+    """Write --files distinct synthetic uploads; returns their paths."""
+    width, height = (int(side) for side in args.resolution.split("x"))
+    paths = []
+    for seed in range(args.files):
+        if args.media == "audio":
+            path = os.path.join(directory, f"answer{seed}.wav")
+            write_speech_wav(path, args.seconds, seed=seed)
+        else:
+            path = os.path.join(directory, f"answer{seed}.mp4")
+            write_interview_clip(path, args.seconds, args.fps, width, height, seed=seed)
+        paths.append(path)
+    return paths
+
+
+def analyze_request(base_url, uploads, args):
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def send(session):
+        with lock:
+            path = uploads[next(counter) % len(uploads)]
+        with open(path, "rb") as f:
+            return session.post(f"{base_url}/analyze", files={"file": f},
+                                data={"file_type": args.media, "threshold": "50"}, timeout=600)
+    return send
+
+
+def results_request(base_url, args):
+    def send(session):
+        return session.get(f"{base_url}/results", params={"limit": args.page_size}, timeout=60)
+    return send
+
+
+def drive(send, concurrency, requests_total, duration):
+    """Run `send(session)` from `concurrency` threads; returns (latencies in s, errors, elapsed s)."""
+    latencies, errors = [], []
+    remaining = iter(range(requests_total))
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                if next(remaining, None) is None or (deadline and time.perf_counter() > deadline):
+                    return
+            start = time.perf_counter()
+            try:
+                response = send(session)
+                ok = response.status_code == 200
+                error = None if ok else f"HTTP {response.status_code}: {response.text[:200]}"
+            except requests.RequestException as e:
+                error = str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    errors.append(error)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+def _vm_hwm_mb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        fields = dict(line.split(":", 1) for line in f if ":" in line)
+    return int(fields["VmHWM"].split()[0]) / 1024
+
+
+def peak_rss_mb(pid=None):
+    """(peak RSS of the server process, largest live child such as a gaze worker) in MB."""
+    pid = pid or os.getpid()
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children.extend(f.read().split())
+    child_peaks = []
+    for child in children:
+        try:
+            child_peaks.append(_vm_hwm_mb(child))
+        except (OSError, KeyError):
+            pass  # exited in the meantime
+    return _vm_hwm_mb(pid), max(child_peaks, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default="analyze,results", help="comma-separated: analyze, results")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--duration", type=float, default=0, help="stop each endpoint after this many seconds")
+    parser.add_argument("--url", help="target a running server instead of an in-process one")
+    parser.add_argument("--pid", type=int, help="server pid for peak RSS when using --url")
+    parser.add_argument("--media", choices=("audio", "video"), default="audio")
+    parser.add_argument("--seconds", type=float, default=30, help="length of each synthetic upload")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--files", type=int, default=8, help="distinct uploads to rotate through")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--seed-rows", type=int, default=10000, help="rows inserted before /results is driven")
+    parser.add_argument("--recognizer-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=1.5)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--llm-invalid-rate", type=float, default=0.0, help="fraction of malformed Gemini replies")
+    parser.add_argument("--cache", action="store_true", help="keep the result cache enabled")
+    parser.add_argument("--mediapipe", action="store_true", help="use the real FaceMesh for videos")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="truthscan_load_")
+    server = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            server, base_url = start_server(args, directory)
+        endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+        uploads = make_uploads(args, directory) if "analyze" in endpoints else []
+
+        print(f"{args.media} uploads of {args.seconds:g} s, concurrency {args.concurrency}")
+        print(f"{'endpoint':<9} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'peak RSS MB':>11} {'child MB':>9}")
+        for name in endpoints:
+            send = analyze_request(base_url, uploads, args) if name == "analyze" else results_request(base_url, args)
+            latencies, errors, elapsed = drive(send, args.concurrency, args.requests, args.duration)
+            p50, p95, p99 = (np.percentile(latencies, q) * 1000 if len(latencies) else 0.0 for q in (50, 95, 99))
+            rss, child = peak_rss_mb(args.pid)
+            print(f"{name:<9} {len(latencies):>8} {len(errors):>6} {len(latencies) / elapsed:>8.1f} "
+                  f"{p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {rss:>11.0f} {child:>9.0f}")
+            for error in sorted(set(errors))[:3]:
+                print(f"    {error}")
+    finally:
+        if server is not None:
+            server.shutdown()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Synthetic interview media for benchmarks: speech-like audio and a gaze test clip.
+
+Nothing here needs a camera, a microphone or network access. Audio is band-limited
+noise shaped into word bursts separated by pauses, so the silence splitter sees
+realistic chunk boundaries; the clip draws a "nose" dot and one "iris" dot per
+eye, in distinct colours, that ColourDotMesh can locate without MediaPipe.
+"""
+import os
+import random
+import tempfile
+import wave
+from types import SimpleNamespace
+
+import cv2
+import ffmpeg
+import numpy as np
+
+SAMPLE_RATE = 16000
+EYE_CENTRE = 0.04  # horizontal distance of each eye's centre from the nose (fraction of frame width)
+EYE_HALF_WIDTH = 0.03
+
+
+class ColourDotMesh:
+    """Stand-in for FaceMesh: nose = red dot, right iris = green dot, left iris = blue dot.
+
+    Eye corners sit at fixed offsets from the nose. As in an unmirrored camera image,
+    the subject's right eye (iris 468, corners 33 and 133) is on the image left.
+    """
+
+    def process(self, frame_rgb):
+        height, width = frame_rgb.shape[:2]
+        _, _, _, nose = cv2.minMaxLoc(frame_rgb[:, :, 0])
+        _, _, _, right_iris = cv2.minMaxLoc(frame_rgb[:, :, 1])
+        _, _, _, left_iris = cv2.minMaxLoc(frame_rgb[:, :, 2])
+        landmarks = {}
+        landmarks[1] = SimpleNamespace(x=nose[0] / width, y=nose[1] / height)
+        landmarks[468] = SimpleNamespace(x=right_iris[0] / width, y=right_iris[1] / height)
+        landmarks[473] = SimpleNamespace(x=left_iris[0] / width, y=left_iris[1] / height)
+        corners = ((33, -EYE_CENTRE - EYE_HALF_WIDTH), (133, -EYE_CENTRE + EYE_HALF_WIDTH),
+                   (362, EYE_CENTRE - EYE_HALF_WIDTH), (263, EYE_CENTRE + EYE_HALF_WIDTH))
+        for index, offset in corners:
+            landmarks[index] = SimpleNamespace(x=nose[0] / width + offset, y=nose[1] / height)
+        return SimpleNamespace(multi_face_landmarks=[SimpleNamespace(landmark=landmarks)])
+
+
+def speech_pcm(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """Mono int16 samples: 0.2-0.6 s "words" in 2-8 s phrases, with 0.5-1.5 s pauses between phrases."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    samples = np.zeros(total, dtype=np.float32)
+    position = 0
+    while position < total:
+        phrase_end = min(total, position + int(rng.uniform(2, 8) * sample_rate))
+        while position < phrase_end:
+            length = min(phrase_end - position, int(rng.uniform(0.2, 0.6) * sample_rate))
+            envelope = np.sin(np.linspace(0, np.pi, length)) * rng.uniform(2000, 6000)
+            voiced = np.sin(2 * np.pi * rng.uniform(90, 220) * np.arange(length) / sample_rate)
+            samples[position:position + length] = envelope * (0.6 * voiced + 0.4 * rng.normal(0, 1, length))
+            position += length + int(rng.uniform(0.02, 0.12) * sample_rate)
+        position += int(rng.uniform(0.5, 1.5) * sample_rate)
+    samples += rng.normal(0, 20, total)  # room noise
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+def write_speech_wav(path, seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """Write speech_pcm() as a 16-bit mono WAV file."""
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(speech_pcm(seconds, sample_rate, seed).tobytes())
+
+
+def write_synthetic_clip(path, seconds, fps, width, height, seed=0):
+    """Write a clip whose iris dots alternate between centred and looking-away spans."""
+    rng = random.Random(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    centre = (width // 2, height // 2)
+    frames = int(seconds * fps)
+    frame_index = 0
+    away = False
+    while frame_index < frames:
+        span = int(rng.uniform(0.2, 3.0) * fps)
+        offset = int(width * rng.uniform(0.15, 0.3)) * rng.choice((-1, 1)) if away else int(width * rng.uniform(-0.02, 0.02))
+        for _ in range(min(span, frames - frame_index)):
+            frame = np.full((height, width, 3), 40, dtype=np.uint8)
+            cv2.circle(frame, centre, 12, (0, 0, 255), -1)  # BGR red: nose
+            for eye, colour in ((-EYE_CENTRE, (0, 255, 0)), (EYE_CENTRE, (255, 0, 0))):  # green: right iris, blue: left
+                cv2.circle(frame, (centre[0] + int(width * eye) + offset, centre[1] - height // 8), 8, colour, -1)
+            writer.write(frame)
+            frame_index += 1
+        away = not away
+    writer.release()
+
+
+def write_interview_clip(path, seconds, fps=30, width=1280, height=720, seed=0):
+    """Write an mp4 with the gaze test picture and a speech-like AAC soundtrack (needs ffmpeg)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory) as scratch:
+        video_path = os.path.join(scratch, "video.mp4")
+        audio_path = os.path.join(scratch, "audio.wav")
+        write_synthetic_clip(video_path, seconds, fps, width, height, seed)
+        write_speech_wav(audio_path, seconds, seed=seed)
+        (ffmpeg.output(ffmpeg.input(video_path), ffmpeg.input(audio_path), path, vcodec="copy", acodec="aac", shortest=None)
+         .global_args("-nostdin", "-loglevel", "error").overwrite_output().run())
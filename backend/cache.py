@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import time
+
+import metrics
+
+# -------------------- CONFIGURATION --------------------
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_AGE = int(os.environ.get("CACHE_MAX_AGE", 7 * 24 * 3600))  # seconds
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_EVICT_EVERY = 50  # run eviction once per this many writes
+
+GAZE_BUCKET = 5.0  # gaze percentages are bucketed to this many points in Gemini cache keys
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def gaze_key(file_hash, gaze_options):
+    """Key for a gaze series: the file plus every sampling option that changes it."""
+    options = {k: v for k, v in (gaze_options or {}).items() if k != "workers"}
+    return f"{file_hash}:{json.dumps(options, sort_keys=True)}"
+
+
+def analysis_key(transcription, gaze_percentage, context, prompt_version):
+    """Cache key for a Gemini analysis."""
+    transcript_hash = hashlib.sha256(transcription.encode("utf-8")).hexdigest()
+    bucket = int(gaze_percentage // GAZE_BUCKET)
+    return f"{transcript_hash}:{bucket}:{context}:{prompt_version}"
+
+
+class ResultCache:
+    """A content-addressed cache of intermediate analysis results in SQLite.
+
+    Entries live in namespaces ("transcript", "analysis"); values are stored
+    as JSON. Entries older than CACHE_MAX_AGE are dropped, and once the cache grows
+    past CACHE_MAX_BYTES the least recently used entries are evicted.
+    """
+
+    def __init__(self, connect, enabled=CACHE_ENABLED, max_age=CACHE_MAX_AGE, max_bytes=CACHE_MAX_BYTES):
+        self.connect = connect
+        self.enabled = enabled
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._writes = 0
+
+    def get(self, namespace, key):
+        """Return the cached value, or None on a miss or an expired entry."""
+        if not self.enabled:
+            return None
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                               (namespace, key)).fetchone()
+            if row is None or row[1] < time.time() - self.max_age:
+                metrics.inc("truthscan_cache_requests_total", namespace=namespace, result="miss")
+                return None
+            metrics.inc("truthscan_cache_requests_total", namespace=namespace, result="hit")
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                         (time.time(), namespace, key))
+            conn.commit()
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def put(self, namespace, key, value):
+        """Store a JSON-serializable value."""
+        if not self.enabled:
+            return
+        encoded = json.dumps(value)
+        now = time.time()
+        conn = self.connect()
+        try:
+            conn.execute("INSERT OR REPLACE INTO cache (namespace, key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                         (namespace, key, encoded, len(encoded), now, now))
+            conn.commit()
+            self._writes += 1
+            if self._writes % CACHE_EVICT_EVERY == 0:
+                self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM cache WHERE created_at < ?", (time.time() - self.max_age,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total > self.max_bytes:
+            # walk from least recently used until enough bytes are freed
+            excess = total - self.max_bytes
+            cutoff = None
+            for accessed_at, size in conn.execute("SELECT accessed_at, size FROM cache ORDER BY accessed_at"):
+                excess -= size
+                cutoff = accessed_at
+                if excess <= 0:
+                    break
+            conn.execute("DELETE FROM cache WHERE accessed_at <= ?", (cutoff,))
+        conn.commit()
@@ -0,0 +1,114 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+
+# -------------------- CONFIGURATION --------------------
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 1000))  # rows fetched from the cursor at a time
+EXPORT_PARQUET_ROWS = int(os.environ.get("EXPORT_PARQUET_ROWS", 10000))  # rows per Parquet row group (~5 MB while built)
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+# Arrow type of each results column (see queries.RESULT_COLUMNS)
+PARQUET_TYPES = {
+    "id": "int64",
+    "transcription": "string",
+    "classification": "string",
+    "human_prob": "double",
+    "ai_prob": "double",
+    "justification": "string",
+    "timestamp": "string",
+}
+
+
+def parquet_available():
+    """Whether pyarrow, which format=parquet needs, is installed (without importing it)."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def fetch_chunks(cursor, size):
+    """Rows of an executed cursor, `size` at a time."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def ndjson_stream(cursor, fields, chunk_rows=EXPORT_CHUNK_ROWS):
+    """One JSON object per line; one bytes block per chunk of rows."""
+    for rows in fetch_chunks(cursor, chunk_rows):
+        yield "".join(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n" for row in rows).encode()
+
+
+def csv_stream(cursor, fields, chunk_rows=EXPORT_CHUNK_ROWS):
+    """A header line, then one bytes block per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode()
+    for rows in fetch_chunks(cursor, chunk_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+class _ByteSink:
+    """Write-only file object that holds what ParquetWriter wrote until it is taken."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def parquet_stream(cursor, fields, row_group_rows=EXPORT_PARQUET_ROWS):
+    """A Parquet file written one row group (one columnar batch) at a time."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(field, pa.type_for_alias(PARQUET_TYPES[field])) for field in fields])
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in fetch_chunks(cursor, row_group_rows):
+            columns = [pa.array(column, type=schema.field(index).type) for index, column in enumerate(zip(*rows))]
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()  # footer
+
+
+STREAMS = {"ndjson": ndjson_stream, "csv": csv_stream, "parquet": parquet_stream}
+
+
+def export_stream(export_format, cursor, fields):
+    """Bytes blocks of the rows left in `cursor`, encoded as `export_format`."""
+    return STREAMS[export_format](cursor, fields)
@@ -0,0 +1,255 @@
+import contextlib
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import metrics
+from gaze_features import LANDMARKS, SERIES_DTYPE, GAZE_AWAY_OFFSET, away_mask, gaze_report
+
+# cv2 and mediapipe are imported where they are used: importing MediaPipe takes
+# seconds and ~100 MB, which processes that never analyze a video should not pay.
+
+# -------------------- CONFIGURATION --------------------
+# Gaze sampling: analyze at most GAZE_TARGET_FPS frames per second (0 = every frame),
+# never less than every GAZE_FRAME_STRIDE-th frame, downscaled to GAZE_MAX_SIDE pixels (0 = full size)
+GAZE_TARGET_FPS = 5.0
+GAZE_FRAME_STRIDE = 1
+GAZE_MAX_SIDE = 640
+
+# Process pool: videos are split into frame-range segments analyzed by GAZE_POOL_SIZE workers,
+# each segment at least GAZE_MIN_SEGMENT_FRAMES long (shorter videos are analyzed in-process)
+GAZE_POOL_SIZE = int(os.environ.get("GAZE_POOL_SIZE", os.cpu_count() or 1))
+GAZE_MIN_SEGMENT_FRAMES = 600
+# Idle FaceMesh graphs kept per process for reuse (~20 MB each); extra ones are closed when returned
+GAZE_MESH_POOL_SIZE = int(os.environ.get("GAZE_MESH_POOL_SIZE", 4))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def create_face_mesh():
+    """Build a FaceMesh graph with iris landmarks enabled."""
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.5)
+
+
+class MeshPool:
+    """FaceMesh graphs reused across requests and threads.
+
+    A graph is not safe to share, so each one is lent to a single caller at a time.
+    New graphs are built when none is idle; up to `size` idle ones per factory are
+    kept, and any beyond that are closed when returned so their native memory is freed.
+    """
+
+    def __init__(self, size=GAZE_MESH_POOL_SIZE):
+        self.size = size
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, factory=create_face_mesh):
+        with self._lock:
+            idle = self._idle.get(factory)
+            if idle:
+                return idle.pop()
+        return factory()
+
+    def release(self, mesh, factory=create_face_mesh):
+        with self._lock:
+            idle = self._idle.setdefault(factory, [])
+            if len(idle) < self.size:
+                idle.append(mesh)
+                return
+        close = getattr(mesh, "close", None)
+        if close is not None:
+            close()
+
+    @contextlib.contextmanager
+    def borrow(self, factory=create_face_mesh):
+        """Context manager lending one mesh for the duration of the block."""
+        mesh = self.acquire(factory)
+        try:
+            yield mesh
+        finally:
+            self.release(mesh, factory)
+
+
+face_meshes = MeshPool()
+
+
+def get_pool():
+    """Return the shared gaze process pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: the parent may already hold MediaPipe/Flask threads
+            _pool = ProcessPoolExecutor(max_workers=GAZE_POOL_SIZE, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def warm_up(pool=False):
+    """Import OpenCV/MediaPipe and build an idle FaceMesh before the first video.
+
+    With `pool=True` the worker processes are started and warmed as well.
+    """
+    import cv2  # noqa: F401
+    with face_meshes.borrow():
+        pass
+    if pool:
+        for future in [get_pool().submit(warm_up) for _ in range(GAZE_POOL_SIZE)]:
+            future.result()
+
+
+def shutdown_pool():
+    """Stop the gaze process pool (it is restarted lazily by the next request)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def sampling_stride(source_fps, target_fps=GAZE_TARGET_FPS, frame_stride=GAZE_FRAME_STRIDE):
+    """Number of source frames per analyzed frame."""
+    stride = max(1, int(frame_stride))
+    if target_fps and source_fps > target_fps:
+        stride = max(stride, int(round(source_fps / target_fps)))
+    return stride
+
+
+def face_landmarks(frame, mesh, max_side=GAZE_MAX_SIDE):
+    """(len(LANDMARKS), 2) normalized x/y of the gaze landmarks in a BGR frame; None if no face is found."""
+    import cv2
+    height, width = frame.shape[:2]
+    if max_side and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    results = mesh.process(frame_rgb)
+
+    if not results.multi_face_landmarks:
+        return None
+    landmark = results.multi_face_landmarks[0].landmark  # max_num_faces=1
+    return np.array([(landmark[i].x, landmark[i].y) for i in LANDMARKS], dtype=np.float32)
+
+
+def looking_away(frame, mesh, max_side=GAZE_MAX_SIDE, away_offset=GAZE_AWAY_OFFSET):
+    """Whether the face in a BGR frame is looking away; None if no face is found."""
+    points = face_landmarks(frame, mesh, max_side)
+    return None if points is None else bool(away_mask(points[np.newaxis], away_offset)[0])
+
+
+def analyze_segment(video_path, start, end, stride, max_side, mesh):
+    """Gaze landmarks of the sampled frames in [start, end), one row per frame (NaN without a face).
+
+    Frames are sampled by their absolute index, so any split of the video into
+    segments samples exactly the same frames as a single sequential pass.
+    `end=None` reads to the end of the file.
+    """
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    rows = []
+    no_face = np.full((len(LANDMARKS), 2), np.nan, dtype=np.float32)
+    index = start
+
+    while cap.isOpened() and (end is None or index < end):
+        # grab() advances without decoding; only sampled frames are retrieved
+        if not cap.grab():
+            break
+        index += 1
+        if (index - 1) % stride:
+            continue
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
+
+        points = face_landmarks(frame, mesh, max_side)
+        rows.append(no_face if points is None else points)
+
+    cap.release()
+    return {
+        "frames_total": index - start,
+        "landmarks": np.stack(rows) if rows else np.empty((0, len(LANDMARKS), 2), dtype=np.float32),
+    }
+
+
+def _run_segment(video_path, start, end, stride, max_side, mesh_factory):
+    """Pool entry point: analyze one segment with a FaceMesh of this worker process."""
+    with face_meshes.borrow(mesh_factory) as mesh:
+        return analyze_segment(video_path, start, end, stride, max_side, mesh)
+
+
+def segment_bounds(frame_count, workers, min_segment_frames=None):
+    """Split [0, frame_count) into at most `workers` contiguous (start, end) ranges.
+
+    The last range is open-ended (end=None) because container frame counts are estimates.
+    """
+    min_segment_frames = min_segment_frames or GAZE_MIN_SEGMENT_FRAMES
+    segments = max(1, min(workers, frame_count // min_segment_frames))
+    size = frame_count // segments
+    bounds = [(i * size, (i + 1) * size) for i in range(segments)]
+    bounds[-1] = (bounds[-1][0], None)
+    return bounds
+
+
+def extract_gaze_series(video_path, target_fps=GAZE_TARGET_FPS, frame_stride=GAZE_FRAME_STRIDE,
+                        max_side=GAZE_MAX_SIDE, workers=None, mesh=None, mesh_factory=create_face_mesh):
+    """Track the gaze landmarks (irises, nose, eye corners) through a video with MediaPipe.
+
+    Returns the series gaze_features.gaze_report() computes metrics from:
+    "landmarks" (sampled frames x LANDMARKS x 2, NaN where no face was found),
+    "sample_interval" in seconds, "frames_total", "frame_stride" and "segments".
+
+    Only every n-th frame is decoded, where n is the larger of `frame_stride` and the
+    ratio between the source FPS and `target_fps`. Sampled frames are downscaled so that
+    their longest side is at most `max_side` before they reach FaceMesh.
+
+    Long videos are split into frame ranges analyzed in parallel by the process pool
+    (`workers` segments at most, default GAZE_POOL_SIZE); passing an explicit `mesh`
+    forces a single in-process pass.
+    """
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    cap.release()
+
+    stride = sampling_stride(source_fps, target_fps, frame_stride)
+    workers = min(workers or GAZE_POOL_SIZE, GAZE_POOL_SIZE)
+    bounds = segment_bounds(frame_count, workers) if mesh is None else [(0, None)]
+
+    if len(bounds) == 1 and mesh is not None:
+        parts = [analyze_segment(video_path, 0, None, stride, max_side, mesh)]
+    elif len(bounds) == 1:
+        with face_meshes.borrow(mesh_factory) as borrowed:
+            parts = [analyze_segment(video_path, 0, None, stride, max_side, borrowed)]
+    else:
+        pool = get_pool()
+        futures = [pool.submit(_run_segment, video_path, start, end, stride, max_side, mesh_factory)
+                   for start, end in bounds]
+        parts = [future.result() for future in futures]
+
+    total_frames = sum(part["frames_total"] for part in parts)
+    # rounded to the storage precision so reports recomputed from a stored series match this one
+    landmarks = np.concatenate([part["landmarks"] for part in parts]).astype(SERIES_DTYPE).astype(np.float32)
+    metrics.inc("truthscan_gaze_frames_total", total_frames, kind="decoded")
+    metrics.inc("truthscan_gaze_frames_total", len(landmarks), kind="sampled")
+    return {
+        "landmarks": landmarks,
+        "sample_interval": stride / source_fps if source_fps else 0.0,
+        "frames_total": total_frames,
+        "frame_stride": stride,
+        "segments": len(parts),
+    }
+
+
+def analyze_gaze(video_path, target_fps=GAZE_TARGET_FPS, frame_stride=GAZE_FRAME_STRIDE,
+                 max_side=GAZE_MAX_SIDE, workers=None, mesh=None, mesh_factory=create_face_mesh, **thresholds):
+    """Gaze report of a video: extract_gaze_series() followed by gaze_report(**thresholds)."""
+    series = extract_gaze_series(video_path, target_fps, frame_stride, max_side, workers, mesh, mesh_factory)
+    return {**gaze_report(series, **thresholds), "segments": series["segments"]}
@@ -0,0 +1,198 @@
+import time
+import warnings
+
+import numpy as np
+
+from cache import CACHE_ENABLED, CACHE_EVICT_EVERY, CACHE_MAX_AGE, CACHE_MAX_BYTES
+
+# -------------------- CONFIGURATION --------------------
+# FaceMesh landmarks kept per sampled frame, in series column order. Sides are the subject's,
+# as in MediaPipe: iris centre 468 lies between eye corners 33 and 133, iris centre 473 between 362 and 263.
+LANDMARKS = (468, 473, 1, 33, 133, 362, 263)
+RIGHT_IRIS, LEFT_IRIS, NOSE, RIGHT_EYE_OUTER, RIGHT_EYE_INNER, LEFT_EYE_INNER, LEFT_EYE_OUTER = range(len(LANDMARKS))
+
+GAZE_AWAY_OFFSET = 0.1  # horizontal iris-to-nose distance (fraction of frame width) that counts as looking away
+SWEEP_MIN_SPAN = 0.12  # gradual drift of the iris within the eye (fraction of eye width) before a return
+SWEEP_RETURN = 0.1  # jump back between two samples (fraction of eye width) that ends a sweep
+SWEEP_MAX_SPEED = 1.0  # fastest drift (eye widths per second); at low sample rates a jump must also outpace it
+SWEEP_WINDOW_S = 4.0  # longest time one sweep (a line of text) may take
+THRESHOLDS = ("away_offset", "sweep_min_span", "sweep_return", "sweep_window_s")  # gaze_report() keyword arguments
+
+SERIES_DTYPE = np.float16  # normalized coordinates; half precision is ~0.0005 at 1.0
+
+
+def encode_series(landmarks):
+    """(frames, len(LANDMARKS), 2) coordinates -> compact bytes (NaN rows = no face)."""
+    return np.ascontiguousarray(landmarks, dtype=SERIES_DTYPE).tobytes()
+
+
+def decode_series(blob):
+    return np.frombuffer(blob, dtype=SERIES_DTYPE).reshape(-1, len(LANDMARKS), 2).astype(np.float32)
+
+
+def away_mask(landmarks, away_offset=GAZE_AWAY_OFFSET):
+    """Per frame: either iris further than `away_offset` from the nose horizontally (False without a face)."""
+    offsets = np.abs(landmarks[:, [RIGHT_IRIS, LEFT_IRIS], 0] - landmarks[:, [NOSE], 0])
+    return (offsets > away_offset).any(axis=1)  # NaN compares False
+
+
+def runs(mask):
+    """(start, length) arrays of the runs of True in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+
+def eye_position(landmarks):
+    """Horizontal iris position between the eye corners, 0 (image left) to 1, averaged over both eyes."""
+    positions = []
+    for iris, corner_a, corner_b in ((RIGHT_IRIS, RIGHT_EYE_OUTER, RIGHT_EYE_INNER),
+                                     (LEFT_IRIS, LEFT_EYE_INNER, LEFT_EYE_OUTER)):
+        low = np.minimum(landmarks[:, corner_a, 0], landmarks[:, corner_b, 0])
+        width = np.abs(landmarks[:, corner_a, 0] - landmarks[:, corner_b, 0])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            positions.append((landmarks[:, iris, 0] - low) / width)
+    return (positions[0] + positions[1]) / 2
+
+
+def reading_sweeps(position, sample_interval, min_span=SWEEP_MIN_SPAN, return_jump=SWEEP_RETURN,
+                   window_s=SWEEP_WINDOW_S):
+    """Count reading-like sweeps: a gradual drift across the eye followed by a fast jump back.
+
+    Both directions are counted, since cameras may or may not mirror the image.
+    A jump is a step of at least `return_jump`, or of what a drift at SWEEP_MAX_SPEED
+    covers in one sample if that is more. A return at step i counts when, since the
+    previous jump and within the preceding `window_s`, the position drifted at least
+    `min_span` the other way; the previous line's own return is left out that way.
+    """
+    if len(position) < 3 or not sample_interval:
+        return 0
+    window = max(2, int(round(window_s / sample_interval)))
+    jump = max(return_jump, SWEEP_MAX_SPEED * sample_interval)
+    steps = np.diff(position)  # NaN around face-absent frames
+    with np.errstate(invalid="ignore"):
+        jumps = np.flatnonzero(np.abs(steps) >= jump)
+    jumps = jumps[jumps + 1 < len(steps)]
+    last_jump = np.full(len(steps), -1)
+    last_jump[jumps + 1] = jumps  # the latest jump before each step
+    last_jump = np.maximum.accumulate(last_jump)
+    padded = np.concatenate((np.full(window, np.nan), position))
+    history = np.lib.stride_tricks.sliding_window_view(padded, window + 1)[:len(steps)]  # samples i-window..i
+    sample = np.arange(len(steps))[:, None] - window + np.arange(window + 1)
+    history = np.where(sample > last_jump[:, None], history, np.nan)  # only the samples since that jump
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN windows at the start or after a lost face
+        rise = position[:-1] - np.nanmin(history, axis=1)
+        fall = np.nanmax(history, axis=1) - position[:-1]
+        back_left = (steps <= -jump) & (rise >= min_span)
+        back_right = (steps >= jump) & (fall >= min_span)
+    return int(np.count_nonzero(back_left | back_right))
+
+
+def gaze_report(series, away_offset=GAZE_AWAY_OFFSET, sweep_min_span=SWEEP_MIN_SPAN, sweep_return=SWEEP_RETURN,
+                sweep_window_s=SWEEP_WINDOW_S):
+    """Gaze metrics for a landmark series; cheap enough to recompute for any thresholds.
+
+    `series` holds "landmarks" (frames x LANDMARKS x 2, NaN without a face),
+    "sample_interval" (seconds between samples, 0 if unknown), "frames_total" and
+    "frame_stride". Frames without a face count as not looking away, as they always have.
+    """
+    landmarks = series["landmarks"]
+    interval = series["sample_interval"]
+    sampled = len(landmarks)
+    absent = np.isnan(landmarks[:, NOSE, 0])
+    away = away_mask(landmarks, away_offset)
+    _, away_runs = runs(away)
+    sweeps = reading_sweeps(eye_position(landmarks), interval, sweep_min_span, sweep_return, sweep_window_s)
+    minutes = sampled * interval / 60
+    return {
+        "looking_away_percentage": float(away.sum()) / sampled * 100 if sampled else 0,
+        "longest_away_seconds": round(float(away_runs.max(initial=0)) * interval, 2),
+        "away_episodes": len(away_runs),
+        "reading_sweeps": sweeps,
+        "reading_sweeps_per_minute": round(sweeps / minutes, 2) if minutes else None,
+        "face_absent_frames": int(absent.sum()),
+        "face_absent_percentage": float(absent.sum()) / sampled * 100 if sampled else 0,
+        "frames_total": series["frames_total"],
+        "frames_sampled": sampled,
+        "frame_stride": series["frame_stride"],
+        "sample_interval": interval,
+        "thresholds": {"away_offset": away_offset, "sweep_min_span": sweep_min_span,
+                       "sweep_return": sweep_return, "sweep_window_s": sweep_window_s},
+    }
+
+
+class GazeSeriesStore:
+    """Landmark series in the `gaze_series` table, keyed like the gaze cache (file + sampling options).
+
+    The series are part of the result cache: nothing is read or stored while it is
+    disabled, series older than CACHE_MAX_AGE are dropped, and once the table grows
+    past CACHE_MAX_BYTES the least recently used series are evicted.
+    """
+
+    def __init__(self, connect, enabled=CACHE_ENABLED, max_age=CACHE_MAX_AGE, max_bytes=CACHE_MAX_BYTES):
+        self.connect = connect
+        self.enabled = enabled
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._writes = 0
+
+    def _read(self, where, params):
+        """The newest unexpired series matching `where`, marked as used; None if there is none."""
+        if not self.enabled:
+            return None
+        conn = self.connect()
+        try:
+            row = conn.execute(
+                "SELECT series_key, frames_total, frame_stride, sample_interval, landmarks FROM gaze_series "
+                f"WHERE {where} AND created_at >= ? ORDER BY created_at DESC LIMIT 1",
+                (*params, time.time() - self.max_age)).fetchone()
+            if row is None:
+                return None
+            series_key, frames_total, frame_stride, sample_interval, blob = row
+            conn.execute("UPDATE gaze_series SET accessed_at = ? WHERE series_key = ?", (time.time(), series_key))
+            conn.commit()
+        finally:
+            conn.close()
+        return {"landmarks": decode_series(blob), "sample_interval": sample_interval,
+                "frames_total": frames_total, "frame_stride": frame_stride}
+
+    def get(self, series_key):
+        return self._read("series_key = ?", (series_key,))
+
+    def latest(self, file_hash):
+        """Most recently stored series of a file, whatever its sampling options."""
+        return self._read("file_hash = ?", (file_hash,))
+
+    def put(self, series_key, file_hash, series):
+        if not self.enabled:
+            return
+        blob = encode_series(series["landmarks"])
+        now = time.time()
+        conn = self.connect()
+        try:
+            conn.execute("INSERT OR REPLACE INTO gaze_series (series_key, file_hash, frames_total, frame_stride, "
+                         "sample_interval, landmarks, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (series_key, file_hash, series["frames_total"], series["frame_stride"],
+                          series["sample_interval"], blob, len(blob), now, now))
+            conn.commit()
+            self._writes += 1
+            if self._writes % CACHE_EVICT_EVERY == 0:
+                self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM gaze_series WHERE created_at < ?", (time.time() - self.max_age,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM gaze_series").fetchone()[0]
+        if total > self.max_bytes:
+            # walk from least recently used until enough bytes are freed
+            excess = total - self.max_bytes
+            cutoff = None
+            for accessed_at, size in conn.execute("SELECT accessed_at, size FROM gaze_series ORDER BY accessed_at"):
+                excess -= size
+                cutoff = accessed_at
+                if excess <= 0:
+                    break
+            conn.execute("DELETE FROM gaze_series WHERE accessed_at <= ?", (cutoff,))
+        conn.commit()
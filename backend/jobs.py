@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+# -------------------- CONFIGURATION --------------------
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))  # analysis threads in this process
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 32))  # max queued (not yet running) jobs
+JOB_UPLOAD_DIR = os.environ.get("JOB_UPLOAD_DIR", "uploads")
+JOB_POLL_INTERVAL = 1.0  # seconds between queue checks when idle
+JOB_FINISH_BACKOFF_MAX = 30.0  # seconds between attempts to store a finished job while the database is busy
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while JOB_QUEUE_SIZE jobs are already waiting."""
+
+
+class JobQueue:
+    """A bounded job queue persisted in the SQLite `jobs` table.
+
+    The table itself is the queue: submitting inserts a `queued` row, workers claim
+    the oldest one inside an IMMEDIATE transaction, so queued jobs survive restarts
+    and several processes can share the same database safely.
+    """
+
+    def __init__(self, connect, handler, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE,
+                 upload_dir=JOB_UPLOAD_DIR):
+        self.connect = connect
+        self.handler = handler  # handler(file_path, file_type, params) -> result dict
+        self.workers = workers
+        self.max_queued = max_queued
+        self.upload_dir = upload_dir
+        self._wakeup = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Requeue jobs whose worker process died and start this process's workers.
+
+        Several processes may run workers against the same database (see worker.py),
+        so jobs claimed by a live process on this host are left alone.
+        """
+        conn = self.connect()
+        try:
+            running = conn.execute("SELECT id, worker FROM jobs WHERE status = 'running'").fetchall()
+            stale = [(_now(), job_id) for job_id, worker in running if not worker_alive(worker)]
+            conn.executemany("UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? WHERE id = ? AND status = 'running'",
+                             stale)
+            conn.commit()
+        finally:
+            conn.close()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _queued_count(self, conn):
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def submit(self, upload, file_type, params):
+        """Store an uploaded file and queue it for analysis; returns the job id.
+
+        `upload` is a werkzeug FileStorage, or the path of a file already on disk
+        (a spooled or resumable upload), which is moved into the upload directory.
+        Raises QueueFull instead of accepting work that cannot be started soon; a
+        path `upload` is then left where it was, for the caller to keep or remove.
+        """
+        conn = self.connect()
+        try:
+            if self._queued_count(conn) >= self.max_queued:
+                raise QueueFull()
+
+            job_id = uuid.uuid4().hex
+            file_path = os.path.join(self.upload_dir, f"{job_id}.{'wav' if file_type == 'audio' else 'mp4'}")
+            os.makedirs(self.upload_dir, exist_ok=True)
+            if isinstance(upload, str):
+                shutil.move(upload, file_path)
+            else:
+                upload.save(file_path)
+
+            conn.execute("BEGIN IMMEDIATE")
+            if self._queued_count(conn) >= self.max_queued:
+                conn.rollback()
+                if isinstance(upload, str):
+                    shutil.move(file_path, upload)
+                else:
+                    os.remove(file_path)
+                raise QueueFull()
+            now = _now()
+            conn.execute("INSERT INTO jobs (id, status, file_path, file_type, params, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                         (job_id, file_path, file_type, json.dumps(params), now, now))
+            conn.commit()
+        finally:
+            conn.close()
+
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        """Return the status (and result or error) of a job, or None if it does not exist."""
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT id, status, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                               (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = {"job_id": row[0], "status": row[1], "created_at": row[4], "updated_at": row[5]}
+        if row[1] == "queued":
+            job["position"] = self._position(job_id)
+        if row[2] is not None:
+            job["result"] = json.loads(row[2])
+        if row[3] is not None:
+            job["error"] = row[3]
+        return job
+
+    def _position(self, job_id):
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND rowid < (SELECT rowid FROM jobs WHERE id = ?)",
+                                (job_id,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _claim(self):
+        """Atomically mark the oldest queued job as running and return it."""
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT id, file_path, file_type, params FROM jobs WHERE status = 'queued' ORDER BY rowid LIMIT 1").fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', worker = ?, updated_at = ? WHERE id = ?",
+                             (worker_id(), _now(), row[0]))
+            conn.commit()
+            return row
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = self.connect()
+        try:
+            conn.execute("UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                         (status, json.dumps(result) if result is not None else None, error, _now(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _work(self):
+        while True:
+            try:
+                job = self._claim()
+            except Exception:
+                job = None  # database busy; retry after the poll interval
+            if job is None:
+                self._wakeup.wait(JOB_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+
+            job_id, file_path, file_type, params = job
+            try:
+                outcome = {"status": "done", "result": self.handler(file_path, file_type, json.loads(params))}
+            except Exception as e:
+                outcome = {"status": "failed", "error": str(e)}
+            finally:
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            self._record(job_id, **outcome)
+
+    def _record(self, job_id, status, result=None, error=None):
+        """_finish() that never gives up, so a claimed job does not stay 'running' while this process lives.
+
+        A busy or locked database is retried with backoff; a result that cannot be
+        stored is recorded as a failure instead.
+        """
+        delay = JOB_POLL_INTERVAL
+        while True:
+            try:
+                self._finish(job_id, status, result, error)
+                return
+            except sqlite3.Error:
+                logger.exception("Could not store job %s, retrying in %.0f s", job_id, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, JOB_FINISH_BACKOFF_MAX)
+            except Exception as e:  # e.g. a result that is not JSON-serializable
+                logger.exception("Could not store the result of job %s", job_id)
+                status, result, error = "failed", None, f"Could not store the result: {e}"
+
+
+def _now():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_alive(worker):
+    """Whether the process that claimed a job (or started a batch) may still be running it."""
+    if not worker:
+        return False
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname():
+        return True  # cannot check another machine's processes
+    if int(pid) == os.getpid():
+        return False  # our own pid from a previous run (e.g. pid 1 in a restarted container)
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,135 @@
+import math
+import os
+import re
+import statistics
+
+# -------------------- CONFIGURATION --------------------
+# Transcripts whose local AI probability is at most LOCAL_BAND or at least 1 - LOCAL_BAND
+# are decided without calling Gemini; everything in between is escalated. Off by default:
+# MODEL has only been validated on the fixture corpus, not on real transcripts.
+LOCAL_CLASSIFIER_ENABLED = os.environ.get("LOCAL_CLASSIFIER_ENABLED", "0") == "1"
+LOCAL_BAND = float(os.environ.get("LOCAL_BAND", 0.1))
+
+FILLER_WORDS = ["um", "uh", "like", "you know", "er", "well"]
+# "like" as a verb ("would like to", "I like") is not a filler; removed before counting
+LIKE_VERB = r"\b(?:would|i'd|we'd|i|you|we|they|really|also|don't|didn't) like\b|\blike to\b"
+SELF_CORRECTIONS = [r"\bi mean\b", r"\bno wait\b", r"\bsorry\b", r"\bactually\b", r"\blet me think\b",
+                    r"\b(\w+) \1\b"]
+MATTR_WINDOW = 50
+
+# Only features that survive speech-to-text: recognize_google returns unpunctuated text,
+# so punctuation and capitalization carry no signal in production.
+FEATURES = ["filler_rate", "self_correction_rate", "type_token_ratio", "gaze"]
+
+# Logistic regression over standardized features, fitted on fixtures/transcripts.jsonl
+# with fit() (see benchmarks/bench_linguistic.py --refit). Positive weight = more AI-like.
+# The fixture gaze values are not measurements, so gaze is left out of the fit (weight 0).
+MODEL = {
+    "means": [2.5506, 0.8234, 0.9283, 0.0],
+    "stds": [3.6678, 1.7191, 0.053, 1.0],
+    "weights": [-3.0414, -1.7272, 0.4824, 0.0],
+    "bias": -0.7129,
+}
+
+
+def count_filler_words(transcription):
+    """Count filler words typical in human speech."""
+    pattern = r'\b(' + '|'.join(FILLER_WORDS) + r')\b'
+    return len(re.findall(pattern, re.sub(LIKE_VERB, " ", transcription.lower())))
+
+
+def as_spoken(transcription):
+    """The transcript as speech-to-text returns it: lowercase words, no punctuation."""
+    return " ".join(re.findall(r"[a-z0-9']+", transcription.lower()))
+
+
+def _mattr(words, window=MATTR_WINDOW):
+    """Moving-average type/token ratio, which unlike plain TTR does not fall with length."""
+    if len(words) <= window:
+        return len(set(words)) / len(words) if words else 0.0
+    ratios = [len(set(words[i:i + window])) / window for i in range(len(words) - window + 1)]
+    return sum(ratios) / len(ratios)
+
+
+def extract_features(transcription, gaze_percentage=None):
+    """Compute the linguistic/behavioral feature vector (ordered as FEATURES).
+
+    The text is first reduced to as_spoken() form, so typed and transcribed answers
+    score alike. `gaze_percentage` is None for audio-only input; the gaze feature is
+    then None and treated as neutral by predict_proba().
+    """
+    text = as_spoken(transcription)
+    words = text.split()
+    per_100_words = 100.0 / max(len(words), 1)
+    corrections = sum(len(re.findall(p, text)) for p in SELF_CORRECTIONS)
+
+    return [
+        count_filler_words(text) * per_100_words,
+        corrections * per_100_words,
+        _mattr(words),
+        gaze_percentage / 100.0 if gaze_percentage is not None else None,
+    ]
+
+
+def predict_proba(features, model=MODEL):
+    """Probability (0-1) that a feature vector comes from an AI-generated answer.
+
+    Missing (None) features contribute nothing, as if they were at the corpus mean.
+    """
+    z = model["bias"]
+    for x, mean, std, weight in zip(features, model["means"], model["stds"], model["weights"]):
+        if x is not None:
+            z += weight * (x - mean) / std
+    return 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+
+
+def classify_locally(transcription, gaze_percentage=None, band=None):
+    """Score a transcript locally and decide whether it is clear-cut.
+
+    Returns {"ai_prob": 0-100, "decided": bool, "features": {...}}; `decided` is
+    False when the probability falls inside the confidence band and Gemini is needed.
+    """
+    band = LOCAL_BAND if band is None else band
+    features = extract_features(transcription, gaze_percentage)
+    probability = predict_proba(features)
+    decided = LOCAL_CLASSIFIER_ENABLED and (probability <= band or probability >= 1 - band)
+    return {
+        "ai_prob": round(probability * 100, 1),
+        "decided": decided,
+        "features": dict(zip(FEATURES, features)),
+    }
+
+
+def fit(samples, epochs=2000, learning_rate=0.1, l2=0.01):
+    """Fit MODEL-shaped logistic regression weights.
+
+    `samples` is a list of (features, label) pairs with label 1 for AI-generated.
+    Features that are None in every sample are left out (mean 0, std 1, weight 0).
+    """
+    columns = list(zip(*[features for features, _ in samples]))
+    present = [all(x is not None for x in column) for column in columns]
+    means = [statistics.mean(column) if used else 0.0 for column, used in zip(columns, present)]
+    stds = [(statistics.pstdev(column) or 1.0) if used else 1.0 for column, used in zip(columns, present)]
+    rows = [([(x - m) / s if used else 0.0 for x, m, s, used in zip(features, means, stds, present)], label)
+            for features, label in samples]
+
+    weights = [0.0] * len(means)
+    bias = 0.0
+    for _ in range(epochs):
+        grad_w = [l2 * w for w in weights]
+        grad_b = 0.0
+        for x, label in rows:
+            z = bias + sum(w * xi for w, xi in zip(weights, x))
+            error = 1.0 / (1.0 + math.exp(-z)) - label
+            grad_b += error / len(rows)
+            for i, xi in enumerate(x):
+                grad_w[i] += error * xi / len(rows)
+        weights = [w - learning_rate * g for w, g in zip(weights, grad_w)]
+        bias -= learning_rate * grad_b
+
+    return {
+        "means": [round(m, 4) for m in means],
+        "stds": [round(s, 4) for s in stds],
+        "weights": [round(w, 4) for w in weights],
+        "bias": round(bias, 4),
+    }
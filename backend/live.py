@@ -0,0 +1,340 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+import transcription
+from gaze import looking_away, create_face_mesh, face_meshes, GAZE_TARGET_FPS, GAZE_MAX_SIDE
+from linguistic import count_filler_words, classify_locally
+from media import SAMPLE_RATE, SAMPLE_WIDTH
+from transcription import (frame_energies, speech_threshold, recognize_chunk, TRANSCRIBE_RETRIES,
+                           VAD_FRAME_MS, VAD_MIN_SILENCE_MS, VAD_MIN_CHUNK_S, VAD_MAX_CHUNK_S, VAD_PADDING_MS)
+
+# -------------------- CONFIGURATION --------------------
+LIVE_MAX_SESSIONS = int(os.environ.get("LIVE_MAX_SESSIONS", 8))  # concurrent /live connections
+LIVE_UPDATE_INTERVAL = 3.0  # seconds between provisional updates pushed to the client
+LIVE_ANSWER_SILENCE_S = 4.0  # a pause this long after speech ends the current answer
+LIVE_GAZE_WINDOW_S = 10.0  # rolling window for the gaze percentage in updates
+LIVE_ENERGY_HISTORY_S = 120.0  # audio history the speech threshold adapts to
+LIVE_RECOGNIZER_WORKERS = 2  # concurrent chunk recognitions per session
+
+# Binary messages start with one of these tags
+AUDIO_FRAME = 0x01  # followed by 16-bit little-endian mono PCM at the session sample rate
+VIDEO_FRAME = 0x02  # followed by one encoded image (JPEG/PNG/WebP)
+
+# Builds the FaceMesh a session borrows from gaze.face_meshes when none is passed in
+default_mesh_factory = create_face_mesh
+
+
+class StreamingTranscriber:
+    """Cuts a live PCM stream into chunks at pauses and recognizes them as they complete.
+
+    Uses the same energy VAD as transcription.split_on_silence; the threshold adapts
+    to the last LIVE_ENERGY_HISTORY_S seconds of the stream. Offsets are counted in
+    whole VAD frames of the audio not yet sent for recognition.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, recognizer=None, executor=None):
+        self.sample_rate = sample_rate
+        self.recognizer = recognizer or transcription.default_recognizer
+        self.executor = executor
+        self.frame_bytes = int(sample_rate * VAD_FRAME_MS / 1000) * SAMPLE_WIDTH
+        self.min_silence = max(1, VAD_MIN_SILENCE_MS // VAD_FRAME_MS)
+        self.min_chunk = int(VAD_MIN_CHUNK_S * 1000 / VAD_FRAME_MS)
+        self.max_chunk = int(VAD_MAX_CHUNK_S * 1000 / VAD_FRAME_MS)
+        self.padding = VAD_PADDING_MS // VAD_FRAME_MS
+        self.answer_silence = int(LIVE_ANSWER_SILENCE_S * 1000 / VAD_FRAME_MS)
+        self.chunks = []  # recognition futures in stream order
+        self.seconds = 0.0
+        self._energies = deque(maxlen=int(LIVE_ENERGY_HISTORY_S * 1000 / VAD_FRAME_MS))
+        self._pending = bytearray()  # audio not yet sent for recognition
+        self._scanned = 0  # frames of _pending already classified
+        self._speech_end = None  # frame just after the last voiced one, None while silent
+        self._silent_frames = 0
+        self._answer_has_speech = False
+
+    def feed(self, pcm):
+        """Add PCM bytes; returns True once a pause long enough to end an answer was reached."""
+        self._pending.extend(pcm)
+        self.seconds += len(pcm) / SAMPLE_WIDTH / self.sample_rate
+        unscanned = np.frombuffer(bytes(self._pending[self._scanned * self.frame_bytes:]), dtype=np.int16)
+        energies = frame_energies(unscanned, self.sample_rate)
+        if not len(energies):
+            return False
+        self._energies.extend(energies.tolist())
+        threshold = speech_threshold(np.fromiter(self._energies, dtype=np.float64))
+
+        answer_ended = False
+        for energy in energies:
+            self._scanned += 1
+            if energy > threshold:
+                self._silent_frames = 0
+                self._speech_end = self._scanned
+                self._answer_has_speech = True
+            else:
+                self._silent_frames += 1
+                if self._speech_end is None:
+                    if self._scanned > 2 * self.padding:
+                        self._drop(self._scanned - self.padding)  # leading silence is never sent
+                elif self._silent_frames >= self.min_silence and self._scanned >= self.min_chunk:
+                    self._cut(min(self._speech_end + self.padding, self._scanned))
+                if self._answer_has_speech and self._silent_frames >= self.answer_silence:
+                    answer_ended = True
+            if self._scanned >= self.max_chunk:
+                self._cut(self._scanned)
+        return answer_ended
+
+    def _drop(self, frames):
+        del self._pending[:frames * self.frame_bytes]
+        self._scanned -= frames
+
+    def _cut(self, frames):
+        """Send the first `frames` of pending audio for recognition, if they contain speech."""
+        if self._speech_end is not None:
+            pcm = bytes(self._pending[:frames * self.frame_bytes])
+            self.chunks.append(self.executor.submit(recognize_chunk, len(self.chunks), pcm, 0,
+                                                    len(pcm) // SAMPLE_WIDTH, self.sample_rate, self.recognizer,
+                                                    TRANSCRIBE_RETRIES))
+        self._drop(frames)
+        self._speech_end = None
+
+    def flush(self):
+        """Send whatever speech is pending (at an answer boundary or the end of the stream)."""
+        if self._speech_end is not None:
+            self._cut(len(self._pending) // self.frame_bytes)
+        self._silent_frames = 0
+        self._answer_has_speech = False
+
+    def text(self, first_chunk=0):
+        """Transcript of the chunks from `first_chunk` on that have been recognized so far."""
+        texts = (future.result()["text"].strip() for future in self.chunks[first_chunk:] if future.done())
+        return " ".join(text for text in texts if text)
+
+
+class RollingGaze:
+    """Looking-away statistics over the frames of the last `window` seconds and the whole answer.
+
+    Without an explicit `mesh`, one is borrowed from gaze.face_meshes on the first
+    frame and kept for the session (FaceMesh tracks the face across frames);
+    close() returns it.
+    """
+
+    def __init__(self, window=LIVE_GAZE_WINDOW_S, target_fps=GAZE_TARGET_FPS, max_side=GAZE_MAX_SIDE, mesh=None):
+        self.window = window
+        self.min_interval = 1.0 / target_fps if target_fps else 0.0
+        self.max_side = max_side
+        self.mesh = mesh
+        self._borrowed = None  # (mesh, factory) taken from gaze.face_meshes
+        self._recent = deque()  # (time, away or None)
+        self._last = None
+        self.reset()
+
+    def reset(self):
+        self.frames = self.away = self.absent = self.skipped = 0
+
+    def feed(self, image_bytes, now=None):
+        """Analyze one encoded frame, unless it arrives sooner than the target frame rate allows."""
+        import cv2
+        now = time.monotonic() if now is None else now
+        if self._last is not None and now - self._last < self.min_interval:
+            self.skipped += 1
+            return
+        frame = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Video frame is not a decodable image")
+        self._last = now
+        if self.mesh is None and self._borrowed is None:
+            self._borrowed = (face_meshes.acquire(default_mesh_factory), default_mesh_factory)
+        away = looking_away(frame, self.mesh or self._borrowed[0], self.max_side)
+        self._recent.append((now, away))
+        self.frames += 1
+        self.away += bool(away)
+        self.absent += away is None
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+
+    @property
+    def percentage(self):
+        """Looking-away percentage of the frames analyzed in this answer."""
+        return self.away / self.frames * 100 if self.frames else None
+
+    def stats(self):
+        window_away = [away for _, away in self._recent]
+        return {
+            "window_percentage": sum(map(bool, window_away)) / len(window_away) * 100 if window_away else None,
+            "answer_percentage": self.percentage,
+            "frames": self.frames,
+            "face_absent_frames": self.absent,
+            "skipped_frames": self.skipped,
+        }
+
+    def close(self):
+        """Return the borrowed FaceMesh, if any."""
+        if self._borrowed is not None:
+            face_meshes.release(*self._borrowed)
+            self._borrowed = None
+
+
+class LiveSession:
+    """One streamed interview: incremental transcript, rolling gaze and provisional verdicts.
+
+    `send(message)` pushes a JSON-serializable dict to the client (it may be called
+    from worker threads). `finalize(transcription, gaze_percentage, context, threshold)`
+    returns the final verdict for one answer (local or Gemini) and stores it; it runs
+    on a background thread at each answer boundary.
+    """
+
+    def __init__(self, send, finalize, context="Formal Interview", threshold=50.0, sample_rate=SAMPLE_RATE,
+                 recognizer=None, mesh=None):
+        self.send = send
+        self.finalize = finalize
+        self.context = context
+        self.threshold = threshold
+        self._executor = ThreadPoolExecutor(max_workers=LIVE_RECOGNIZER_WORKERS + 1)
+        self.transcriber = StreamingTranscriber(sample_rate, recognizer, self._executor)
+        self.gaze = RollingGaze(mesh=mesh)
+        self.answer = 0
+        self._answer_chunk = 0
+        self._started = time.monotonic()
+        self._last_update = self._started
+        self._recognized = 0  # chunks recognized at the last update
+        self._finals = []
+
+    def receive(self, message):
+        """Handle one client message (bytes = tagged media frame, str = JSON control message).
+
+        Returns False once the client asked to stop.
+        """
+        if isinstance(message, (bytes, bytearray)):
+            if not message:
+                return True
+            tag, payload = message[0], bytes(message[1:])
+            if tag == AUDIO_FRAME:
+                if self.transcriber.feed(payload):
+                    self.end_answer()
+            elif tag == VIDEO_FRAME:
+                self.gaze.feed(payload)
+            else:
+                raise ValueError(f"Unknown frame tag {tag}")
+        else:
+            control = json.loads(message)
+            if control.get("type") == "answer_end":
+                self.end_answer()
+            elif control.get("type") == "stop":
+                return False
+        self.tick()
+        return True
+
+    def tick(self):
+        """Push a provisional update every LIVE_UPDATE_INTERVAL, and as soon as new words are recognized."""
+        now = time.monotonic()
+        recognized = sum(future.done() for future in self.transcriber.chunks)
+        if now - self._last_update >= LIVE_UPDATE_INTERVAL or recognized > self._recognized:
+            self._last_update, self._recognized = now, recognized
+            self.send(self.update())
+
+    def update(self):
+        text = self.transcriber.text(self._answer_chunk)
+        gaze_percentage = self.gaze.percentage
+        message = {
+            "type": "update",
+            "answer": self.answer,
+            "elapsed": round(time.monotonic() - self._started, 2),
+            "audio_seconds": round(self.transcriber.seconds, 2),
+            "transcription": text,
+            "filler_words": count_filler_words(text),
+            "gaze": self.gaze.stats(),
+            "pending_chunks": sum(not future.done() for future in self.transcriber.chunks[self._answer_chunk:]),
+        }
+        if text:
+            local = classify_locally(text, gaze_percentage)
+            message["provisional"] = {
+                "ai_prob": round(local["ai_prob"], 1),
+                "classification": "Fake (AI-Generated)" if local["ai_prob"] > self.threshold else "Real (Human-Created)",
+                "confident": local["decided"],
+            }
+        return message
+
+    def end_answer(self):
+        """Close the current answer and compute its final verdict in the background."""
+        self.transcriber.flush()
+        first, last = self._answer_chunk, len(self.transcriber.chunks)
+        if first == last:
+            return  # nothing was said
+        answer, gaze_percentage = self.answer, self.gaze.percentage
+        self._finals.append(self._executor.submit(self._final, answer, first, last, gaze_percentage,
+                                                  time.perf_counter()))
+        self.answer += 1
+        self._answer_chunk = last
+        self.gaze.reset()
+
+    def _final(self, answer, first, last, gaze_percentage, ended):
+        chunks = [future.result() for future in self.transcriber.chunks[first:last]]
+        text = " ".join(chunk["text"].strip() for chunk in chunks if chunk["text"].strip())
+        try:
+            if not text:
+                raise ValueError("Failed to transcribe audio")
+            verdict = self.finalize(text, gaze_percentage, self.context, self.threshold)
+            message = {"type": "final", "answer": answer, "transcription": text,
+                       "gaze_percentage": gaze_percentage, "failed_chunks": sum(not chunk["ok"] for chunk in chunks),
+                       **verdict}
+        except Exception as e:
+            message = {"type": "error", "answer": answer, "error": str(e)}
+        metrics.observe("truthscan_live_final_seconds", time.perf_counter() - ended)
+        try:
+            self.send(message)
+        except Exception:
+            pass  # client already gone; the verdict is stored anyway
+
+    def close(self):
+        """End the last answer and wait for every final verdict."""
+        self.end_answer()
+        try:
+            for future in self._finals:
+                future.result()
+        finally:
+            self._executor.shutdown()
+            self.gaze.close()
+
+
+def run_session(ws, finalize, context="Formal Interview", threshold=50.0, sample_rate=SAMPLE_RATE):
+    """Serve one /live WebSocket until the client stops or disconnects.
+
+    Messages are handled in arrival order; a bad frame is reported to the client
+    and skipped. Whatever was said before a disconnect is still finalized and stored.
+    """
+    from simple_websocket import ConnectionClosed
+
+    lock = threading.Lock()
+
+    def send(message):
+        with lock:
+            ws.send(json.dumps(message))
+
+    session = LiveSession(send, finalize, context, threshold, sample_rate)
+    metrics.inc("truthscan_live_sessions_total")
+    send({"type": "ready", "sample_rate": sample_rate, "update_interval": LIVE_UPDATE_INTERVAL})
+    try:
+        while True:
+            message = ws.receive(timeout=LIVE_UPDATE_INTERVAL / 2)
+            if message is None:
+                session.tick()  # keep pushing updates while the client is quiet
+                continue
+            try:
+                if not session.receive(message):
+                    break
+            except ValueError as e:
+                send({"type": "error", "error": str(e)})
+    except ConnectionClosed:
+        pass
+    finally:
+        session.close()
+    try:
+        send({"type": "closed", "answers": session.answer})
+    except ConnectionClosed:
+        pass
@@ -0,0 +1,192 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+
+import metrics
+
+# -------------------- CONFIGURATION --------------------
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))  # Gemini calls in flight per process
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", 3))  # extra attempts after a transient error or invalid output
+LLM_BACKOFF = 0.5  # seconds, doubled per retry, with +/- 50% jitter
+LLM_BACKOFF_MAX = 8.0
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 60))  # seconds per generate_content call
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))  # consecutive failed calls that open the circuit
+LLM_BREAKER_RESET = float(os.environ.get("LLM_BREAKER_RESET", 30))  # seconds before a trial call is let through
+
+# HTTP statuses (google.api_core exceptions carry one as `.code`) that retrying cannot fix
+PERMANENT_STATUSES = (400, 401, 403, 404)
+# Validation-only schema keys the Gemini response_schema does not accept
+LOCAL_SCHEMA_KEYS = ("minimum", "maximum")
+
+CLASSIFICATIONS = ["Real (Human-Created)", "Fake (AI-Generated)"]
+VERDICT_PROPERTIES = {
+    "classification": {"type": "string", "enum": CLASSIFICATIONS},
+    "probability": {"type": "integer", "minimum": 0, "maximum": 100,
+                    "description": "Confidence in the classification, in percent"},
+    "justification": {"type": "string", "description": "Brief reason, combining linguistic and behavioral analysis"},
+}
+VERDICT_SCHEMA = {"type": "object", "properties": VERDICT_PROPERTIES, "required": list(VERDICT_PROPERTIES)}
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {"items": {"type": "array", "items": {
+        "type": "object",
+        "properties": {"item": {"type": "integer"}, **VERDICT_PROPERTIES},
+        "required": ["item", *VERDICT_PROPERTIES],
+    }}},
+    "required": ["items"],
+}
+
+
+class LLMError(Exception):
+    """A Gemini call failed for good (permanent error, or retries exhausted)."""
+
+
+class LLMUnavailable(LLMError):
+    """The circuit breaker is open: Gemini failed repeatedly and is not being called."""
+
+    def __init__(self, retry_after):
+        self.retry_after = math.ceil(retry_after)  # whole seconds, for Retry-After
+        super().__init__(f"Gemini is unavailable, retry in {self.retry_after} s")
+
+
+class InvalidOutput(LLMError):
+    """The reply is not JSON or does not match the requested schema."""
+
+
+_TYPES = {"object": dict, "array": list, "string": str, "integer": int, "number": (int, float), "boolean": bool}
+
+
+def validate(value, schema, path="$"):
+    """Check `value` against the JSON-schema subset used here; raises InvalidOutput."""
+    kind = schema.get("type")
+    if kind and (not isinstance(value, _TYPES[kind]) or (isinstance(value, bool) and kind != "boolean")):
+        raise InvalidOutput(f"{path}: expected {kind}, got {type(value).__name__}")
+    if "enum" in schema and value not in schema["enum"]:
+        raise InvalidOutput(f"{path}: {value!r} is not one of {schema['enum']}")
+    if ("minimum" in schema and value < schema["minimum"]) or ("maximum" in schema and value > schema["maximum"]):
+        raise InvalidOutput(f"{path}: {value} is out of range")
+    if kind == "object":
+        for name in schema.get("required", ()):
+            if name not in value:
+                raise InvalidOutput(f"{path}: missing {name!r}")
+        for name, child in schema.get("properties", {}).items():
+            if name in value:
+                validate(value[name], child, f"{path}.{name}")
+    elif kind == "array" and "items" in schema:
+        for index, item in enumerate(value):
+            validate(item, schema["items"], f"{path}[{index}]")
+
+
+def response_schema(schema):
+    """`schema` without the keys only the local validator understands."""
+    if isinstance(schema, dict):
+        return {key: response_schema(value) for key, value in schema.items() if key not in LOCAL_SCHEMA_KEYS}
+    return schema
+
+
+def parse_json(text, schema):
+    """Decode and validate a JSON reply (tolerating a ```json fence around it)."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        value = json.loads(text)
+    except ValueError as e:
+        raise InvalidOutput(f"Reply is not JSON: {e}")
+    validate(value, schema)
+    return value
+
+
+def is_transient(error):
+    """Worth retrying: anything but a permanent HTTP status or a rejected prompt/reply."""
+    if getattr(error, "code", None) in PERMANENT_STATUSES:
+        return False
+    return not isinstance(error, (ValueError, TypeError))  # e.g. .text of a blocked response
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive failures -> one trial call after `reset_after` s.
+
+    A successful trial closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(self, failures=LLM_BREAKER_FAILURES, reset_after=LLM_BREAKER_RESET, clock=time.monotonic):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.clock = clock
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise LLMUnavailable unless a call may go out now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = self.clock() - self._opened_at
+            if waited < self.reset_after or self._trial:
+                raise LLMUnavailable(max(1.0, self.reset_after - waited))
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or self._consecutive >= self.failures:
+                if self._opened_at is None or self._trial:
+                    metrics.inc("truthscan_llm_circuit_opened_total")
+                self._opened_at = self.clock()
+                self._trial = False
+
+
+class LLMClient:
+    """Gemini calls with JSON-schema replies, retries, a concurrency cap and a circuit breaker.
+
+    `model` returns the object to call generate_content() on (the Gemini model, or
+    benchmarks.fakes.FakeModel). Slots are held only while a call is in flight,
+    never during backoff.
+    """
+
+    def __init__(self, model, max_concurrency=LLM_MAX_CONCURRENCY, retries=LLM_RETRIES, timeout=LLM_TIMEOUT,
+                 breaker=None):
+        self.model = model
+        self.retries = retries
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def generate(self, prompt, schema, mode="single"):
+        """Validated JSON reply to `prompt`; raises LLMUnavailable, InvalidOutput or LLMError."""
+        config = {"response_mime_type": "application/json", "response_schema": response_schema(schema)}
+        for attempt in range(self.retries + 1):
+            self.breaker.before_call()
+            try:
+                with self._slots, metrics.timed("truthscan_gemini_seconds", errors="truthscan_gemini_errors_total",
+                                                mode=mode):
+                    text = self.model().generate_content(prompt, generation_config=config,
+                                                         request_options={"timeout": self.timeout}).text
+            except Exception as e:
+                if not is_transient(e):
+                    self.breaker.record_success()  # Gemini answered; the request itself is at fault
+                    raise LLMError(f"Gemini rejected the request: {e}") from e
+                self.breaker.record_failure()
+                error, reason = LLMError(f"Gemini call failed: {e}"), "error"
+            else:
+                self.breaker.record_success()
+                try:
+                    return parse_json(text, schema)
+                except InvalidOutput as e:
+                    error, reason = e, "invalid_output"
+            if attempt < self.retries:
+                metrics.inc("truthscan_llm_retries_total", mode=mode, reason=reason)
+                time.sleep(min(LLM_BACKOFF_MAX, LLM_BACKOFF * (2 ** attempt)) * (0.5 + random.random()))
+        raise error
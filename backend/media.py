@@ -0,0 +1,168 @@
+import hashlib
+import os
+import tempfile
+import threading
+from io import BytesIO
+
+import ffmpeg
+
+import metrics
+
+# -------------------- CONFIGURATION --------------------
+SAMPLE_RATE = 16000  # Hz; speech recognition does not need more
+SAMPLE_WIDTH = 2  # bytes per sample (signed 16-bit little endian)
+SPOOL_DIR = os.environ.get("SPOOL_DIR") or None  # None = the system temp directory
+CHUNK_SIZE = 1024 * 1024
+FFMPEG_ERROR_TAIL = 4096  # bytes of ffmpeg's stderr kept for the MediaError message
+
+
+class MediaError(Exception):
+    """Raised when ffmpeg cannot decode an upload."""
+
+
+def _pcm_output(stream, sample_rate):
+    return stream.output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=sample_rate).global_args("-loglevel", "error")
+
+
+def _feed(stdin, source):
+    """Copy a file-like source into ffmpeg's stdin, then close it."""
+    try:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            stdin.write(chunk)
+    except (BrokenPipeError, ValueError):
+        pass  # ffmpeg stopped reading; its exit status reports why
+    finally:
+        try:
+            stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def _drain(stderr, tail):
+    """Read ffmpeg's stderr to the end, so ffmpeg never blocks on a full pipe; keeps the last bytes in `tail`."""
+    for chunk in iter(lambda: stderr.read(CHUNK_SIZE), b""):
+        tail += chunk
+        del tail[:-FFMPEG_ERROR_TAIL]
+
+
+def decode_audio(source, sample_rate=SAMPLE_RATE):
+    """Decode the audio track of `source` to mono 16-bit PCM bytes, entirely in memory.
+
+    `source` is either a path (ffmpeg reads it directly, which containers such as mp4
+    need for random access) or a binary file-like object streamed through ffmpeg's stdin.
+    Raises MediaError if ffmpeg fails or decodes no audio.
+    """
+    with metrics.timed("truthscan_ffmpeg_seconds", errors="truthscan_ffmpeg_errors_total"):
+        pcm = _decode(source, sample_rate)
+    metrics.inc("truthscan_ffmpeg_output_bytes_total", len(pcm))
+    return pcm
+
+
+def _decode(source, sample_rate):
+    if isinstance(source, (str, os.PathLike)):
+        process = _pcm_output(ffmpeg.input(os.fspath(source)), sample_rate).global_args("-nostdin").run_async(
+            pipe_stdout=True, pipe_stderr=True)
+        feeder = None
+    else:
+        process = _pcm_output(ffmpeg.input("pipe:"), sample_rate).run_async(
+            pipe_stdin=True, pipe_stdout=True, pipe_stderr=True)
+        feeder = threading.Thread(target=_feed, args=(process.stdin, source), daemon=True)
+        feeder.start()
+    error = bytearray()
+    drainer = threading.Thread(target=_drain, args=(process.stderr, error), daemon=True)
+    drainer.start()
+
+    buffer = BytesIO()
+    for chunk in iter(lambda: process.stdout.read(CHUNK_SIZE), b""):
+        buffer.write(chunk)
+    process.wait()
+    drainer.join()
+    if feeder is not None:
+        feeder.join()
+
+    if process.returncode != 0:
+        raise MediaError(error.decode("utf-8", "replace").strip() or f"ffmpeg exited with {process.returncode}")
+    if not buffer.tell():
+        raise MediaError("No audio decoded")  # e.g. an MP4 whose index is at the end, read through a pipe
+    return buffer.getvalue()
+
+
+def is_mp4_family(stream):
+    """Whether a seekable stream holds an ISO media file (mp4, m4a, mov, 3gp); rewinds it.
+
+    ffmpeg cannot decode these from a pipe when their index (moov atom) follows the
+    audio data, so they have to be decoded from a file.
+    """
+    header = stream.read(12)
+    stream.seek(0)
+    return header[4:8] == b"ftyp"
+
+
+def stream_sha256(stream):
+    """SHA-256 of a seekable binary stream; the stream is rewound afterwards."""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    metrics.inc("truthscan_upload_bytes_total", size, mode="streamed")
+    return digest.hexdigest()
+
+
+def spool_upload(stream, suffix=".mp4"):
+    """Copy an upload stream to a unique temporary file; returns (path, sha256).
+
+    Only needed for media that must be randomly accessed (video frames); the caller
+    removes the file when done.
+    """
+    digest = hashlib.sha256()
+    with metrics.timed("truthscan_upload_save_seconds"):
+        with tempfile.NamedTemporaryFile(prefix="truthscan_", suffix=suffix, dir=SPOOL_DIR, delete=False) as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
+            size = f.tell()
+    metrics.inc("truthscan_upload_bytes_total", size, mode="spooled")
+    return f.name, digest.hexdigest()
+
+
+class SpoolFile:
+    """Named temporary file that hashes what is written to it.
+
+    Used as the werkzeug stream factory so a multipart upload lands on disk once,
+    already hashed, instead of being parsed into one temporary file and then copied
+    by spool_upload. The file is removed on close unless detach() handed it off.
+    """
+
+    def __init__(self, suffix=""):
+        self._file = tempfile.NamedTemporaryFile(prefix="truthscan_", suffix=suffix, dir=SPOOL_DIR, delete=False)
+        self.name = self._file.name
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self._detached = False
+
+    def write(self, data):
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def detach(self):
+        """Close the file and leave it on disk; returns its path, now owned by the caller."""
+        self._detached = True
+        self.close()
+        return self.name
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        metrics.inc("truthscan_upload_bytes_total", self.size, mode="spooled")
+        if not self._detached:
+            os.remove(self.name)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)  # read, seek, tell, flush, ...
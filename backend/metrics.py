@@ -0,0 +1,158 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------- CONFIGURATION --------------------
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)  # seconds
+
+# Every metric the backend records: name -> (type, help). Histograms are latencies in seconds.
+METRICS = {
+    "truthscan_stage_seconds": ("histogram", "Wall-clock time of analysis stages (stage=\"total\" is the whole graph)."),
+    "truthscan_stage_errors_total": ("counter", "Analysis stages that raised."),
+    "truthscan_upload_bytes_total": ("counter", "Upload bytes hashed or spooled to disk."),
+    "truthscan_upload_save_seconds": ("histogram", "Time to spool an upload to a temporary file."),
+    "truthscan_ffmpeg_seconds": ("histogram", "Time ffmpeg takes to decode an upload to PCM."),
+    "truthscan_ffmpeg_output_bytes_total": ("counter", "PCM bytes produced by ffmpeg."),
+    "truthscan_ffmpeg_errors_total": ("counter", "Uploads ffmpeg failed to decode."),
+    "truthscan_recognizer_seconds": ("histogram", "Speech recognizer latency per audio chunk (including retries)."),
+    "truthscan_transcribe_chunks_total": ("counter", "Audio chunks sent to the speech recognizer, by outcome."),
+    "truthscan_gaze_frames_total": ("counter", "Video frames read by gaze analysis (kind=\"sampled\" were run through FaceMesh)."),
+    "truthscan_gemini_seconds": ("histogram", "Gemini generate_content latency."),
+    "truthscan_gemini_errors_total": ("counter", "Failed Gemini calls."),
+    "truthscan_llm_retries_total": ("counter", "Gemini calls retried, by reason (error or invalid_output)."),
+    "truthscan_llm_circuit_opened_total": ("counter", "Times the Gemini circuit breaker opened."),
+    "truthscan_db_insert_seconds": ("histogram", "Time to insert and commit analysis results."),
+    "truthscan_db_rows_inserted_total": ("counter", "Analysis results written to the results table."),
+    "truthscan_cache_requests_total": ("counter", "Result cache lookups by namespace and outcome."),
+    "truthscan_live_sessions_total": ("counter", "WebSocket /live sessions opened."),
+    "truthscan_live_final_seconds": ("histogram", "Time from a live answer's end to its final verdict."),
+}
+
+_trace = contextvars.ContextVar("truthscan_trace", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Process-wide counters and histograms, rendered in the Prometheus text format."""
+
+    def __init__(self, metrics=METRICS, buckets=LATENCY_BUCKETS):
+        self.metrics = metrics
+        self.buckets = buckets
+        self._values = {}  # (name, label key) -> count, or [bucket counts..., sum, count] for histograms
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        if self.metrics[name][0] != "counter":
+            raise ValueError(f"{name} is not a counter")
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        if self.metrics[name][0] != "histogram":
+            raise ValueError(f"{name} is not a histogram")
+        key = (name, _label_key(labels))
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        """All recorded series as Prometheus exposition text."""
+        with self._lock:
+            values = {key: list(state) if isinstance(state, list) else state for key, state in self._values.items()}
+        lines = []
+        for name, (kind, help_text) in self.metrics.items():
+            series = sorted((labels, state) for (metric, labels), state in values.items() if metric == name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, state in series:
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(state)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {state[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {state[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def inc(name, amount=1, **labels):
+    """Add to a counter (and the active request trace, if any)."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.append({"metric": name, **labels, "value": amount})
+    if METRICS_ENABLED:
+        registry.inc(name, amount, **labels)
+
+
+def observe(name, seconds, **labels):
+    """Record a latency in a histogram (and the active request trace, if any)."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.append({"metric": name, **labels, "ms": round(seconds * 1000, 3)})
+    if METRICS_ENABLED:
+        registry.observe(name, seconds, **labels)
+
+
+@contextmanager
+def timed(name, errors=None, **labels):
+    """Time the enclosed block into histogram `name`; failures also bump counter `errors`."""
+    if not METRICS_ENABLED and _trace.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if errors is not None:
+            inc(errors, **labels)
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+@contextmanager
+def tracing(enabled=True):
+    """Collect the metrics recorded by this request (including its stage threads) into a list."""
+    if not enabled:
+        yield None
+        return
+    events = []
+    token = _trace.set(events)
+    try:
+        yield events
+    finally:
+        _trace.reset(token)
@@ -0,0 +1,75 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Stage:
+    """A named step of the analysis graph.
+
+    `func` is called with the results of the stages listed in `deps` as keyword
+    arguments (keyed by stage name) once all of them have finished.
+    """
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+
+class StageError(Exception):
+    """Raised when a stage fails; carries the failing stage name and timings so far."""
+
+    def __init__(self, stage, error, timings):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+        self.timings = timings
+
+
+def _timed(stage, results):
+    start = time.perf_counter()
+    value = stage.func(**{dep: results[dep] for dep in stage.deps})
+    return value, (time.perf_counter() - start) * 1000
+
+
+def run_stages(stages, max_workers=4):
+    """Run a stage graph, starting every stage as soon as its dependencies are done.
+
+    Independent branches run concurrently on a thread pool. Returns the results and
+    the per-stage wall-clock timings in milliseconds (plus "total").
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage {stage.name!r} depends on unknown stages {missing}")
+
+    results = {}
+    timings = {}
+    pending = dict(by_name)
+    running = {}
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if all(dep in results for dep in stage.deps):
+                    # copy the caller's context so per-request state (e.g. a metrics trace) follows the stage
+                    running[executor.submit(contextvars.copy_context().run, _timed, stage, results)] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(f"Stage graph has a cycle: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                except Exception as e:
+                    for other in running:
+                        other.cancel()
+                    timings["total"] = (time.perf_counter() - start) * 1000
+                    raise StageError(name, e, timings) from e
+
+    timings["total"] = (time.perf_counter() - start) * 1000
+    return results, timings
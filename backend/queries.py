@@ -0,0 +1,137 @@
+import base64
+import json
+
+# -------------------- CONFIGURATION --------------------
+RESULTS_PAGE_SIZE = 50
+RESULTS_MAX_PAGE_SIZE = 500
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SNIPPET_TOKENS = 16  # words of context around each match
+
+RESULT_COLUMNS = ["id", "transcription", "classification", "human_prob", "ai_prob", "justification", "timestamp"]
+# id and timestamp are always returned: together they are the pagination cursor
+KEY_COLUMNS = ["id", "timestamp"]
+
+# Indexes backing the list/filter queries below (newest first, optionally per classification)
+RESULTS_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_results_class_timestamp ON results (classification, timestamp, id)",
+    "CREATE INDEX IF NOT EXISTS idx_results_ai_prob ON results (ai_prob)",
+]
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor pointing just after the given row."""
+    return base64.urlsafe_b64encode(json.dumps([timestamp, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); raises ValueError for malformed cursors."""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(timestamp), int(row_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def results_filters(args):
+    """WHERE clauses and parameters for the filters shared by the results endpoints.
+
+    Supported query arguments: classification, min_ai_prob, max_ai_prob, since and
+    until (timestamps as stored, "YYYY-MM-DD[ HH:MM:SS]"). Raises ValueError for
+    malformed values.
+    """
+    clauses, params = [], []
+    if args.get("classification"):
+        clauses.append("classification = ?")
+        params.append(args["classification"])
+    if args.get("min_ai_prob") not in (None, ""):
+        clauses.append("ai_prob >= ?")
+        params.append(float(args["min_ai_prob"]))
+    if args.get("max_ai_prob") not in (None, ""):
+        clauses.append("ai_prob <= ?")
+        params.append(float(args["max_ai_prob"]))
+    if args.get("since"):
+        clauses.append("timestamp >= ?")
+        params.append(args["since"])
+    if args.get("until"):
+        until = args["until"]
+        clauses.append("timestamp <= ?")
+        # a bare date includes the whole day
+        params.append(until + " 23:59:59" if len(until) == 10 else until)
+    return clauses, params
+
+
+def results_fields(args):
+    """Columns selected by the `fields` argument (comma separated), defaulting to all."""
+    if not args.get("fields"):
+        return list(RESULT_COLUMNS)
+    requested = [field.strip() for field in args["fields"].split(",") if field.strip()]
+    unknown = [field for field in requested if field not in RESULT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [column for column in RESULT_COLUMNS if column in requested or column in KEY_COLUMNS]
+
+
+def results_page_query(args):
+    """SQL, parameters, selected columns and page size for one page of results.
+
+    Pages are ordered newest first by (timestamp, id) and continue from `cursor`
+    with a keyset condition, so every page is an index range scan regardless of depth.
+    """
+    fields = results_fields(args)
+    limit = min(max(int(args.get("limit", RESULTS_PAGE_SIZE)), 1), RESULTS_MAX_PAGE_SIZE)
+    clauses, params = results_filters(args)
+    if args.get("cursor"):
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(decode_cursor(args["cursor"]))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT {', '.join(fields)} FROM results{where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+    # fetch one extra row to know whether there is a next page
+    return sql, params + [limit + 1], fields, limit
+
+
+def results_export_query(args):
+    """SQL, parameters and selected columns for exporting every matching result, oldest first.
+
+    Takes the same `fields` and filter arguments as results_page_query(), without paging.
+    """
+    fields = results_fields(args)
+    clauses, params = results_filters(args)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT {', '.join(fields)} FROM results{where} ORDER BY timestamp, id", params, fields
+
+
+def match_expression(query, phrase=False):
+    """FTS5 MATCH expression for user input, with every term quoted.
+
+    Quoting disables FTS5 operators, so arbitrary text cannot cause syntax errors;
+    terms are ANDed, or matched as one contiguous phrase when `phrase` is true.
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    if not terms:
+        raise ValueError("Empty search query")
+    if phrase:
+        return '"' + " ".join(terms) + '"'
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def search_query(args):
+    """SQL, parameters, columns and paging for a ranked full-text search of results.
+
+    Query arguments: q (required), phrase=1 for an exact phrase, limit, offset and
+    the results_filters() filters. Matches are ordered by BM25 relevance.
+    """
+    expression = match_expression(args.get("q", ""), args.get("phrase") in ("1", "true"))
+    limit = min(max(int(args.get("limit", SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    offset = max(int(args.get("offset", 0)), 0)
+    clauses, params = results_filters(args)
+    where = "".join(f" AND {clause}" for clause in clauses)
+    fields = ["id", "classification", "human_prob", "ai_prob", "timestamp", "transcription_snippet",
+              "justification_snippet", "score"]
+    sql = (f"SELECT results.id, classification, human_prob, ai_prob, timestamp, "
+           f"snippet(results_fts, 0, '[', ']', '…', {SNIPPET_TOKENS}), "
+           f"snippet(results_fts, 1, '[', ']', '…', {SNIPPET_TOKENS}), bm25(results_fts) AS score "
+           f"FROM results_fts JOIN results ON results.id = results_fts.rowid "
+           f"WHERE results_fts MATCH ?{where} ORDER BY score LIMIT ? OFFSET ?")
+    return sql, [expression] + params + [limit + 1, offset], fields, limit, offset
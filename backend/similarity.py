@@ -0,0 +1,247 @@
+import functools
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+# -------------------- CONFIGURATION --------------------
+SIMILARITY_ENABLED = os.environ.get("SIMILARITY_ENABLED", "1") == "1"
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", 0.5))  # min estimated Jaccard to report
+SIMILARITY_MAX_RESULTS = 5
+# newest transcripts held in each process's LSH buckets (~384 bytes apiece); older ones are not matched
+SIMILARITY_MAX_INDEXED = int(os.environ.get("SIMILARITY_MAX_INDEXED", 200000))
+SHINGLE_SIZE = 3  # words per shingle
+NUM_PERM = 96
+LSH_BANDS = 32  # 32 bands x 3 rows: a pair at Jaccard 0.5 shares a bucket with ~99% probability, at 0.1 with ~3%
+LSH_MERGE_EVERY = 1024  # pending signatures merged into the sorted band arrays
+REFRESH_CHUNK = 50000  # signature rows fetched from SQLite at a time when loading the index
+LOOKUP_CHUNK = 500  # candidate ids per IN (...) query, well under SQLite's bound-variable limit
+
+_rng = np.random.default_rng(20240501)
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)  # odd multipliers
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_GRAM_MIX = _rng.integers(1, 2 ** 63, SHINGLE_SIZE, dtype=np.uint64) | np.uint64(1)
+_BAND_MIX = _rng.integers(1, 2 ** 63, NUM_PERM // LSH_BANDS, dtype=np.uint64) | np.uint64(1)
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """Distinct 64-bit hashes of the word n-grams of the normalized text."""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+    if len(words) < size:
+        return np.array([(hashes * _GRAM_MIX[:len(words)]).sum()], dtype=np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(hashes, size)
+    return np.unique((windows * _GRAM_MIX).sum(axis=1))  # uint64 arithmetic wraps, which is fine for hashing
+
+
+@functools.lru_cache(maxsize=256)
+def signature(text):
+    """MinHash signature (NUM_PERM uint32 values) of a transcript, or None if it has no words."""
+    grams = shingle_hashes(text)
+    if not len(grams):
+        return None
+    # multiply-shift hashing: the high 32 bits of a*x + b (mod 2**64) for odd a
+    permuted = (_A[:, None] * grams[None, :] + _B[:, None]) >> np.uint64(32)
+    signature = permuted.min(axis=1).astype(np.uint32)
+    signature.flags.writeable = False  # shared through the lru_cache
+    return signature
+
+
+def estimate_jaccard(signature_a, signature_b):
+    """Estimated Jaccard similarity: the fraction of equal MinHash values."""
+    return float(np.mean(signature_a == signature_b))
+
+
+def band_keys(signatures):
+    """One uint64 bucket key per band for each signature (rows of a 2-D array)."""
+    signatures = np.atleast_2d(signatures).astype(np.uint64)
+    bands = signatures.reshape(len(signatures), LSH_BANDS, NUM_PERM // LSH_BANDS)
+    return (bands * _BAND_MIX).sum(axis=2)  # wraps modulo 2**64, which is fine for hashing
+
+
+class LSHIndex:
+    """MinHash LSH buckets held as one sorted key array per band.
+
+    Lookups are a binary search per band, so they stay sub-linear in the number of
+    stored transcripts. Each entry is a uint64 key and an int32 id, 12 bytes per
+    transcript per band or ~384 bytes per transcript, held once per process.
+    """
+
+    def __init__(self):
+        self._keys = [np.zeros(0, dtype=np.uint64) for _ in range(LSH_BANDS)]
+        self._ids = [np.zeros(0, dtype=np.int32) for _ in range(LSH_BANDS)]
+        self._pending_keys = np.zeros((LSH_MERGE_EVERY, LSH_BANDS), dtype=np.uint64)
+        self._pending_ids = np.zeros(LSH_MERGE_EVERY, dtype=np.int32)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def add_many(self, ids, signatures):
+        """Index several (id, signature) pairs at once."""
+        if len(ids) == 0:
+            return
+        self.add_keys(np.asarray(ids, dtype=np.int32), band_keys(np.asarray(signatures)))
+
+    def add_keys(self, ids, keys):
+        """Index ids whose band keys (one row per id) are already computed."""
+        with self._lock:
+            count = self._pending
+            if count + len(ids) > LSH_MERGE_EVERY:
+                self._merge(np.concatenate((self._pending_ids[:count], ids)),
+                            np.concatenate((self._pending_keys[:count], keys)))
+                self._pending = 0
+            else:
+                self._pending_ids[count:count + len(ids)] = ids
+                self._pending_keys[count:count + len(ids)] = keys
+                self._pending += len(ids)
+            self.size += len(ids)
+
+    def keep_newest(self, count):
+        """Drop all but the `count` highest ids; filtering keeps each band sorted."""
+        with self._lock:
+            if self.size <= count:
+                return
+            pending_ids = self._pending_ids[:self._pending]
+            cutoff = np.partition(np.concatenate((self._ids[0], pending_ids)), self.size - count)[self.size - count]
+            for band in range(LSH_BANDS):
+                keep = self._ids[band] >= cutoff
+                self._keys[band], self._ids[band] = self._keys[band][keep], self._ids[band][keep]
+            keep = pending_ids >= cutoff
+            kept = int(keep.sum())
+            self._pending_keys[:kept] = self._pending_keys[:self._pending][keep]
+            self._pending_ids[:kept] = pending_ids[keep]
+            self._pending = kept
+            self.size = len(self._ids[0]) + kept
+
+    def _merge(self, ids, keys):
+        """Merge a run into the sorted band arrays.
+
+        The run is sorted and appended; a stable argsort (timsort) of two sorted runs
+        is a linear merge, so small runs never re-sort the whole index.
+        """
+        for band in range(LSH_BANDS):
+            run_keys = np.ascontiguousarray(keys[:, band])
+            order = np.argsort(run_keys)
+            run_keys, run_ids = run_keys[order], ids[order]
+            if not len(self._keys[band]):
+                self._keys[band], self._ids[band] = run_keys, run_ids
+                continue
+            merged_keys = np.concatenate((self._keys[band], run_keys))
+            merged_ids = np.concatenate((self._ids[band], run_ids))
+            order = np.argsort(merged_keys, kind="stable")
+            self._keys[band], self._ids[band] = merged_keys[order], merged_ids[order]
+
+    def candidates(self, signature):
+        """Ids sharing at least one band bucket with `signature`."""
+        keys = band_keys(signature)[0]
+        found = set()
+        with self._lock:
+            for band in range(LSH_BANDS):
+                sorted_keys = self._keys[band]
+                lo = np.searchsorted(sorted_keys, keys[band], side="left")
+                hi = np.searchsorted(sorted_keys, keys[band], side="right")
+                found.update(self._ids[band][lo:hi].tolist())
+            hits = (self._pending_keys[:self._pending] == keys).any(axis=1)
+            found.update(self._pending_ids[:self._pending][hits].tolist())
+        return found
+
+
+class SimilarityIndex:
+    """Near-duplicate lookup over stored transcripts.
+
+    Signatures are persisted in the `result_minhash` table; the LSH buckets live in
+    memory and are topped up from SQLite before each lookup, so rows written by
+    other processes are seen too. Only the newest `max_indexed` transcripts are
+    kept in the buckets; the index is trimmed back once it grows a quarter past that.
+    """
+
+    def __init__(self, connect, threshold=SIMILARITY_THRESHOLD, max_results=SIMILARITY_MAX_RESULTS,
+                 max_indexed=SIMILARITY_MAX_INDEXED):
+        self.connect = connect
+        self.threshold = threshold
+        self.max_results = max_results
+        self.max_indexed = max_indexed
+        self.lsh = LSHIndex()
+        self._loaded_id = 0
+        self._refresh_lock = threading.Lock()
+
+    def start(self):
+        """Load the stored signatures on a background thread; lookups wait for it."""
+        threading.Thread(target=self.refresh, name="similarity-load", daemon=True).start()
+
+    def refresh(self):
+        """Load signatures stored since the last refresh into the LSH buckets."""
+        with self._refresh_lock:
+            conn = self.connect()
+            try:
+                if not self._loaded_id:
+                    # a cold load starts at the oldest transcript that will be kept
+                    row = conn.execute("SELECT result_id FROM result_minhash ORDER BY result_id DESC LIMIT 1 OFFSET ?",
+                                       (self.max_indexed,)).fetchone()
+                    self._loaded_id = row[0] if row else 0
+                cursor = conn.execute("SELECT result_id, signature FROM result_minhash WHERE result_id > ? ORDER BY result_id",
+                                      (self._loaded_id,))
+                ids, keys = [], []
+                while True:
+                    rows = cursor.fetchmany(REFRESH_CHUNK)
+                    if not rows:
+                        break
+                    signatures = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint32)
+                    ids.append(np.fromiter((row[0] for row in rows), dtype=np.int32, count=len(rows)))
+                    keys.append(band_keys(signatures.reshape(len(rows), NUM_PERM)))
+                if ids:
+                    # one merge for everything read: a cold load sorts each band once
+                    self.lsh.add_keys(np.concatenate(ids), np.concatenate(keys))
+                    self._loaded_id = int(ids[-1][-1])
+                if self.lsh.size > self.max_indexed + self.max_indexed // 4:
+                    self.lsh.keep_newest(self.max_indexed)
+            finally:
+                conn.close()
+
+    def similar(self, transcription, file_hash=None):
+        """Prior results whose transcripts have estimated Jaccard >= threshold, best first.
+
+        Results of the same upload (`file_hash`) are left out, so a re-analysis does
+        not list its own earlier row.
+        """
+        if not SIMILARITY_ENABLED:
+            return []
+        query = signature(transcription)
+        if query is None:
+            return []
+        self.refresh()
+        candidates = list(self.lsh.candidates(query))
+        if not candidates:
+            return []
+        rows = []
+        conn = self.connect()
+        try:
+            for start in range(0, len(candidates), LOOKUP_CHUNK):
+                chunk = candidates[start:start + LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows += conn.execute(f"SELECT result_id, signature, file_hash FROM result_minhash "
+                                     f"WHERE result_id IN ({placeholders})", chunk).fetchall()
+        finally:
+            conn.close()
+        matches = [{"id": result_id, "jaccard": round(estimate_jaccard(query, np.frombuffer(blob, dtype=np.uint32)), 3)}
+                   for result_id, blob, row_hash in rows if file_hash is None or row_hash != file_hash]
+        matches = [match for match in matches if match["jaccard"] >= self.threshold]
+        return sorted(matches, key=lambda match: -match["jaccard"])[:self.max_results]
+
+    def store_inserted(self, conn, values):
+        """Persist signatures for rows just inserted with storage.RESULTS_INSERT.
+
+        Must run inside the inserting transaction: the write lock it holds keeps the
+        newest len(values) result ids ours.
+        """
+        ids = [row[0] for row in conn.execute("SELECT id FROM results ORDER BY id DESC LIMIT ?", (len(values),))][::-1]
+        rows = []
+        for result_id, row in zip(ids, values):
+            sig = signature(row[0])
+            if sig is not None:
+                rows.append((result_id, sig.tobytes(), row[6]))
+        conn.executemany("INSERT OR REPLACE INTO result_minhash (result_id, signature, file_hash) VALUES (?, ?, ?)", rows)
@@ -0,0 +1,240 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from queries import RESULTS_INDEXES
+
+# -------------------- CONFIGURATION --------------------
+DB_PATH = os.environ.get("DB_PATH", "analysis_results.db")
+DB_JOURNAL_MODE = os.environ.get("DB_JOURNAL_MODE", "WAL")  # WAL lets readers and the writer proceed concurrently
+DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", "NORMAL")  # NORMAL is durable across app crashes in WAL mode
+DB_BUSY_TIMEOUT_MS = 5000
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))  # idle connections kept open
+
+# Optional write-behind buffer for result inserts
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_MAX_ROWS = 200  # flush when this many rows are waiting
+WRITE_BEHIND_INTERVAL = 0.5  # seconds; flush at least this often
+
+# Schema migrations, applied in order once at startup and tracked in PRAGMA user_version.
+# Statements use IF NOT EXISTS so databases created before migrations existed upgrade cleanly.
+MIGRATIONS = [
+    # 1: results table and the indexes behind /results
+    ['''CREATE TABLE IF NOT EXISTS results
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         transcription TEXT,
+         classification TEXT,
+         human_prob REAL,
+         ai_prob REAL,
+         justification TEXT,
+         timestamp TEXT)''',
+     *RESULTS_INDEXES],
+    # 2: asynchronous job queue
+    ['''CREATE TABLE IF NOT EXISTS jobs
+        (id TEXT PRIMARY KEY,
+         status TEXT,
+         file_path TEXT,
+         file_type TEXT,
+         params TEXT,
+         result TEXT,
+         error TEXT,
+         created_at TEXT,
+         updated_at TEXT)''',
+     "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)"],
+    # 3: content-addressed result cache
+    ['''CREATE TABLE IF NOT EXISTS cache
+        (namespace TEXT,
+         key TEXT,
+         value TEXT,
+         size INTEGER,
+         created_at REAL,
+         accessed_at REAL,
+         PRIMARY KEY (namespace, key))''',
+     "CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)"],
+    # 4: batch progress
+    ['''CREATE TABLE IF NOT EXISTS batches
+        (id TEXT PRIMARY KEY,
+         status TEXT,
+         total INTEGER,
+         processed INTEGER,
+         failed INTEGER,
+         items TEXT,
+         created_at TEXT,
+         updated_at TEXT)'''],
+    # 5: full-text index over results, kept in sync by triggers and backfilled once
+    ["CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5(transcription, justification, content='results', content_rowid='id')",
+     '''CREATE TRIGGER IF NOT EXISTS results_fts_insert AFTER INSERT ON results BEGIN
+            INSERT INTO results_fts (rowid, transcription, justification) VALUES (new.id, new.transcription, new.justification);
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS results_fts_delete AFTER DELETE ON results BEGIN
+            INSERT INTO results_fts (results_fts, rowid, transcription, justification) VALUES ('delete', old.id, old.transcription, old.justification);
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS results_fts_update AFTER UPDATE ON results BEGIN
+            INSERT INTO results_fts (results_fts, rowid, transcription, justification) VALUES ('delete', old.id, old.transcription, old.justification);
+            INSERT INTO results_fts (rowid, transcription, justification) VALUES (new.id, new.transcription, new.justification);
+        END''',
+     "INSERT INTO results_fts (results_fts) VALUES ('rebuild')"],
+    # 6: MinHash signatures for near-duplicate lookup (see similarity.py); older rows are not backfilled
+    ['''CREATE TABLE IF NOT EXISTS result_minhash
+        (result_id INTEGER PRIMARY KEY,
+         signature BLOB)'''],
+    # 7: which process is running a job, so a restarting worker only requeues jobs of dead ones
+    ["ALTER TABLE jobs ADD COLUMN worker TEXT"],
+    # 8: per-frame gaze landmarks, so gaze metrics can be recomputed without decoding the video
+    ['''CREATE TABLE IF NOT EXISTS gaze_series
+        (series_key TEXT PRIMARY KEY,
+         file_hash TEXT,
+         frames_total INTEGER,
+         frame_stride INTEGER,
+         sample_interval REAL,
+         landmarks BLOB,
+         created_at REAL)''',
+     "CREATE INDEX IF NOT EXISTS idx_gaze_series_file ON gaze_series (file_hash, created_at)"],
+    # 9: SHA-256 of the analyzed upload (NULL for live answers), so a re-analysis is not reported as similar to itself
+    ["ALTER TABLE results ADD COLUMN file_hash TEXT",
+     "ALTER TABLE result_minhash ADD COLUMN file_hash TEXT"],
+    # 10: sizes and last use of gaze series, so they are evicted like cache entries
+    ["ALTER TABLE gaze_series ADD COLUMN size INTEGER",
+     "ALTER TABLE gaze_series ADD COLUMN accessed_at REAL",
+     "UPDATE gaze_series SET size = length(landmarks), accessed_at = created_at"],
+    # 11: the process running each batch, so a restart only interrupts its own batches
+    ["ALTER TABLE batches ADD COLUMN worker TEXT"],
+]
+
+RESULTS_INSERT = ("INSERT INTO results (transcription, classification, human_prob, ai_prob, justification, timestamp, "
+                  "file_hash) VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+
+class PooledConnection:
+    """A sqlite3 connection borrowed from a pool; close() hands it back instead of closing it."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+
+class ConnectionPool:
+    """Reuses tuned SQLite connections across requests and threads.
+
+    Connections are created on demand; up to `size` idle ones are kept for reuse.
+    """
+
+    def __init__(self, path=DB_PATH, size=DB_POOL_SIZE, journal_mode=DB_JOURNAL_MODE, synchronous=DB_SYNCHRONOUS):
+        self.path = path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        return conn
+
+    def connect(self):
+        """Borrow a connection; call close() on it (or use try/finally) to return it."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()  # never hand out a connection with someone else's open transaction
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def migrate(self, migrations=MIGRATIONS):
+        """Apply pending schema migrations; returns the resulting schema version."""
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, statements in enumerate(migrations[version:], start=version + 1):
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+            return max(version, len(migrations))
+        finally:
+            conn.close()
+
+
+class WriteBehindBuffer:
+    """Groups single-row inserts into batched transactions on a background thread.
+
+    add() returns immediately; rows are written with one executemany per flush,
+    when WRITE_BEHIND_MAX_ROWS rows are waiting or every WRITE_BEHIND_INTERVAL seconds.
+    Rows still buffered when the process exits are flushed by an atexit hook.
+    `after_insert(conn, rows)`, if given, runs in the same transaction after each batch.
+    """
+
+    def __init__(self, pool, sql, max_rows=WRITE_BEHIND_MAX_ROWS, interval=WRITE_BEHIND_INTERVAL, after_insert=None):
+        self.pool = pool
+        self.sql = sql
+        self.after_insert = after_insert
+        self.max_rows = max_rows
+        self.interval = interval
+        self._rows = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def add(self, rows):
+        with self._lock:
+            self._rows.extend(rows)
+            if len(self._rows) >= self.max_rows:
+                self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+        conn = self.pool.connect()
+        try:
+            conn.executemany(self.sql, rows)
+            if self.after_insert is not None:
+                self.after_insert(conn, rows)
+            conn.commit()
+        except sqlite3.Error:
+            with self._lock:
+                self._rows[:0] = rows  # keep them for the next flush
+            raise
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                time.sleep(self.interval)  # database busy or locked; the rows are retried
+
+
+pool = ConnectionPool()
+connect = pool.connect
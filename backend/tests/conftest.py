@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+
+
+@pytest.fixture
+def pool(tmp_path):
+    """A connection pool on a fresh, fully migrated database."""
+    pool = storage.ConnectionPool(path=str(tmp_path / "results.db"))
+    pool.migrate()
+    return pool
+
+
+def insert_results(pool, rows):
+    """Insert (transcription, classification, ai_prob, timestamp) rows; returns their ids."""
+    conn = pool.connect()
+    try:
+        ids = []
+        for transcription, classification, ai_prob, timestamp in rows:
+            cursor = conn.execute(storage.RESULTS_INSERT, (transcription, classification, 100 - ai_prob, ai_prob,
+                                                           "- Justification: test", timestamp, None))
+            ids.append(cursor.lastrowid)
+        conn.commit()
+        return ids
+    finally:
+        conn.close()
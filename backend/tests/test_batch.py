@@ -0,0 +1,70 @@
+import io
+import os
+import socket
+import zipfile
+
+import pytest
+
+import media
+from batch import BatchRunner, collect_uploads
+
+
+class Upload:
+    """The parts of a werkzeug FileStorage that collect_uploads reads."""
+
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.stream = io.BytesIO(data)
+
+
+def archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "SPOOL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_zip_members_and_plain_files_are_spooled(spool_dir):
+    items = collect_uploads([Upload("answers.zip", archive({"a.wav": b"RIFF", "notes.txt": b"skip", "b.mp4": b"ftyp"})),
+                             Upload("c.mp3", b"ID3")])
+    assert [(item["name"], item["file_type"]) for item in items] == [("a.wav", "audio"), ("b.mp4", "video"),
+                                                                     ("c.mp3", "audio")]
+    assert len(list(spool_dir.iterdir())) == 3
+
+
+def test_an_archive_that_unpacks_too_large_is_rejected_before_spooling(spool_dir):
+    bomb = archive({"a.wav": b"\x00" * 600, "b.wav": b"\x00" * 600})  # compresses to a few bytes each
+    with pytest.raises(ValueError, match="unpack to more than 1000 bytes"):
+        collect_uploads([Upload("bomb.zip", bomb)], max_unzipped_bytes=1000)
+    assert not list(spool_dir.iterdir())
+
+
+def test_the_limit_covers_all_archives_in_the_request(spool_dir):
+    uploads = [Upload(f"{i}.zip", archive({f"{i}.wav": b"\x00" * 600})) for i in range(2)]
+    with pytest.raises(ValueError):
+        collect_uploads(uploads, max_unzipped_bytes=1000)
+    assert not list(spool_dir.iterdir())  # the first archive's member is removed again
+
+
+def test_recover_only_interrupts_batches_whose_process_is_gone(pool):
+    conn = pool.connect()
+    try:
+        for batch_id, worker in [("live", f"{socket.gethostname()}:{os.getppid()}"),
+                                 ("ours", f"{socket.gethostname()}:{os.getpid()}"),  # from before a restart
+                                 ("unowned", None)]:
+            conn.execute("INSERT INTO batches (id, status, total, processed, failed, items, worker) "
+                         "VALUES (?, 'running', 0, 0, 0, '[]', ?)", (batch_id, worker))
+        conn.commit()
+    finally:
+        conn.close()
+    runner = BatchRunner(pool.connect, prepare=None, classify=None, save=None)
+    runner.recover()
+    assert {batch_id: runner.get(batch_id)["status"] for batch_id in ("live", "ours", "unowned")} == \
+        {"live": "running", "ours": "interrupted", "unowned": "interrupted"}
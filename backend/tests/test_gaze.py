@@ -0,0 +1,47 @@
+import threading
+
+from gaze import MeshPool, sampling_stride, segment_bounds
+
+
+class Mesh:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_meshes_are_reused_across_threads():
+    pool = MeshPool(size=1)
+    used = []
+
+    def analyze():
+        with pool.borrow(Mesh) as mesh:
+            used.append(mesh)
+
+    for _ in range(3):
+        thread = threading.Thread(target=analyze)
+        thread.start()
+        thread.join()
+    assert len(set(map(id, used))) == 1
+
+
+def test_meshes_beyond_the_pool_size_are_closed():
+    pool = MeshPool(size=1)
+    first, second = pool.acquire(Mesh), pool.acquire(Mesh)
+    assert first is not second  # never lent twice at once
+    pool.release(first, Mesh)
+    pool.release(second, Mesh)
+    assert not first.closed and second.closed
+    assert pool.acquire(Mesh) is first
+
+
+def test_sampling_stride():
+    assert sampling_stride(30, target_fps=5) == 6
+    assert sampling_stride(30, target_fps=0, frame_stride=2) == 2
+    assert sampling_stride(4, target_fps=5) == 1
+
+
+def test_segment_bounds_cover_the_video():
+    assert segment_bounds(1000, 4, min_segment_frames=600) == [(0, None)]
+    assert segment_bounds(2400, 4, min_segment_frames=600) == [(0, 600), (600, 1200), (1200, 1800), (1800, None)]
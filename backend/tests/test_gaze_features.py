@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from gaze_features import (LANDMARKS, LEFT_IRIS, RIGHT_EYE_INNER, RIGHT_EYE_OUTER, RIGHT_IRIS, decode_series,
+                           encode_series, eye_position, gaze_report, reading_sweeps)
+
+
+def face(gaze=0.0, nose=0.5):
+    """Landmarks of one frame: eyes 0.06 wide centred 0.04 either side of the nose, irises shifted by `gaze`."""
+    x = {468: nose - 0.04 + gaze, 473: nose + 0.04 + gaze, 1: nose,
+         33: nose - 0.07, 133: nose - 0.01, 362: nose + 0.01, 263: nose + 0.07}
+    return np.array([(x[index], 0.4) for index in LANDMARKS], dtype=np.float32)
+
+
+def series(frames, sample_interval=0.2):
+    no_face = np.full((len(LANDMARKS), 2), np.nan, dtype=np.float32)
+    landmarks = np.stack([no_face if frame is None else face(frame) for frame in frames])
+    return {"landmarks": landmarks, "sample_interval": sample_interval, "frames_total": len(frames) * 6,
+            "frame_stride": 6}
+
+
+def test_eye_position_pairs_each_iris_with_its_own_eye():
+    # a slightly turned head: the right eye looks narrower than the left
+    landmarks = face()[None].copy()
+    landmarks[0, [RIGHT_EYE_OUTER, RIGHT_EYE_INNER], 0] = (0.44, 0.48)  # around the right iris at 0.46
+    assert eye_position(landmarks) == pytest.approx([0.5], abs=1e-3)
+
+    swapped = landmarks.copy()
+    swapped[:, [RIGHT_IRIS, LEFT_IRIS]] = swapped[:, [LEFT_IRIS, RIGHT_IRIS]]
+    assert eye_position(swapped)[0] != pytest.approx(0.5, abs=0.1)
+
+
+def test_report_counts_away_episodes_and_absent_frames():
+    frames = [0.0] * 4 + [0.2] * 3 + [0.0] * 2 + [-0.2] + [None] * 2 + [0.0] * 8  # 20 samples, 4 s
+    report = gaze_report(series(frames))
+    assert report["looking_away_percentage"] == pytest.approx(20.0)
+    assert report["away_episodes"] == 2
+    assert report["longest_away_seconds"] == pytest.approx(0.6)
+    assert report["face_absent_frames"] == 2
+    assert report["face_absent_percentage"] == pytest.approx(10.0)
+    assert report["frames_sampled"] == 20 and report["frames_total"] == 120
+
+
+def test_thresholds_are_applied_on_recompute():
+    frames = [0.0] * 5 + [0.08] * 5  # irises 0.12 and 0.04 from the nose
+    assert gaze_report(series(frames))["looking_away_percentage"] == pytest.approx(50.0)
+    relaxed = gaze_report(series(frames), away_offset=0.15)
+    assert relaxed["looking_away_percentage"] == 0
+    assert relaxed["thresholds"]["away_offset"] == 0.15
+
+
+def reading(durations, sample_interval=0.2, seed=0):
+    """Eye positions of lines read one after another: a drift from 0.2 to 0.8, then a jump back."""
+    rng = np.random.default_rng(seed)
+    lines = [np.linspace(0.2, 0.8, max(2, int(round(duration / sample_interval))))
+             for duration in rng.uniform(*durations, size=10)]
+    return np.concatenate(lines) + rng.normal(0, 0.005, sum(map(len, lines)))
+
+
+@pytest.mark.parametrize("durations", [(1.0, 1.5), (2.0, 3.9), (4.5, 8.0)])
+def test_every_line_return_is_counted(durations):
+    position = reading(durations)
+    assert reading_sweeps(position, 0.2) == 9
+    assert reading_sweeps(1 - position, 0.2) == 9  # a mirrored camera
+
+
+def test_steady_or_jittery_gaze_is_not_reading():
+    rng = np.random.default_rng(1)
+    assert reading_sweeps(0.5 + rng.normal(0, 0.01, 300), 0.2) == 0
+    assert reading_sweeps(rng.choice([0.3, 0.7], 300), 0.2) == 0  # darting back and forth, no drift
+
+
+def test_empty_series():
+    report = gaze_report({"landmarks": np.empty((0, len(LANDMARKS), 2), dtype=np.float32), "sample_interval": 0,
+                          "frames_total": 0, "frame_stride": 1})
+    assert report["looking_away_percentage"] == 0
+    assert report["reading_sweeps_per_minute"] is None
+
+
+def test_series_encoding_keeps_missing_faces():
+    landmarks = series([0.0, None, 0.1])["landmarks"]
+    decoded = decode_series(encode_series(landmarks))
+    assert decoded.shape == landmarks.shape
+    assert np.isnan(decoded[1]).all()
+    assert decoded[[0, 2]] == pytest.approx(landmarks[[0, 2]], abs=1e-3)
@@ -0,0 +1,80 @@
+import sqlite3
+import time
+
+import pytest
+
+import jobs
+from jobs import JobQueue, QueueFull
+
+
+@pytest.fixture
+def upload(tmp_path):
+    def write(name="clip.wav"):
+        path = tmp_path / name
+        path.write_bytes(b"RIFF")
+        return str(path)
+    return write
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_POLL_INTERVAL", 0.01)
+
+
+def test_job_runs_and_its_upload_is_removed(pool, upload, tmp_path):
+    queue = JobQueue(pool.connect, lambda path, file_type, params: {"file_type": file_type, **params},
+                     workers=1, upload_dir=str(tmp_path / "jobs"))
+    queue.start()
+    job_id = queue.submit(upload(), "audio", {"threshold": 50})
+    job = wait_for(queue, job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"file_type": "audio", "threshold": 50}
+    assert not list((tmp_path / "jobs").iterdir())
+
+
+def test_a_busy_database_does_not_strand_a_finished_job(pool, upload, tmp_path, monkeypatch):
+    queue = JobQueue(pool.connect, lambda path, file_type, params: {"ok": True}, workers=1,
+                     upload_dir=str(tmp_path / "jobs"))
+    finish = queue._finish
+    failures = []
+
+    def flaky_finish(*args, **kwargs):
+        if len(failures) < 2:
+            failures.append(1)
+            raise sqlite3.OperationalError("database is locked")
+        finish(*args, **kwargs)
+
+    monkeypatch.setattr(queue, "_finish", flaky_finish)
+    queue.start()
+    first = queue.submit(upload("a.wav"), "audio", {})
+    assert wait_for(queue, first)["status"] == "done"
+    second = queue.submit(upload("b.wav"), "audio", {})  # the worker thread survived
+    assert wait_for(queue, second)["status"] == "done"
+
+
+def test_an_unstorable_result_fails_the_job(pool, upload, tmp_path):
+    queue = JobQueue(pool.connect, lambda path, file_type, params: {"value": object()}, workers=1,
+                     upload_dir=str(tmp_path / "jobs"))
+    queue.start()
+    job = wait_for(queue, queue.submit(upload(), "audio", {}))
+    assert job["status"] == "failed"
+    assert "Could not store the result" in job["error"]
+
+
+def test_full_queue_leaves_the_upload_in_place(pool, upload, tmp_path):
+    queue = JobQueue(pool.connect, lambda *args: {}, workers=0, max_queued=1, upload_dir=str(tmp_path / "jobs"))
+    queue.submit(upload("a.wav"), "audio", {})
+    path = upload("b.wav")
+    with pytest.raises(QueueFull):
+        queue.submit(path, "audio", {})
+    assert open(path, "rb").read() == b"RIFF"
@@ -0,0 +1,143 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import llm
+from llm import (BATCH_SCHEMA, VERDICT_SCHEMA, CircuitBreaker, InvalidOutput, LLMClient, LLMError, LLMUnavailable,
+                 is_transient, parse_json, response_schema, validate)
+
+VERDICT = {"classification": "Fake (AI-Generated)", "probability": 80, "justification": "polished"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedModel:
+    """generate_content() returns (or raises) the scripted replies in order."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(text=reply)
+
+
+class HttpError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm.time, "sleep", lambda seconds: None)
+
+
+def test_validate_accepts_a_verdict():
+    validate(VERDICT, VERDICT_SCHEMA)
+    validate({"items": [{"item": 1, **VERDICT}]}, BATCH_SCHEMA)
+
+
+@pytest.mark.parametrize("value, message", [
+    ({"classification": "Maybe", "probability": 80, "justification": ""}, "is not one of"),
+    ({**VERDICT, "probability": 101}, "out of range"),
+    ({**VERDICT, "probability": "80"}, "expected integer"),
+    ({**VERDICT, "probability": True}, "expected integer"),
+    ({"classification": "Fake (AI-Generated)", "probability": 80}, "missing 'justification'"),
+    ([VERDICT], "expected object"),
+])
+def test_validate_rejects(value, message):
+    with pytest.raises(InvalidOutput, match=message):
+        validate(value, VERDICT_SCHEMA)
+
+
+def test_validate_names_the_path_of_a_bad_batch_item():
+    with pytest.raises(InvalidOutput, match=r"\$\.items\[1\]\.item"):
+        validate({"items": [{"item": 1, **VERDICT}, {"item": "2", **VERDICT}]}, BATCH_SCHEMA)
+
+
+def test_parse_json_tolerates_a_code_fence():
+    assert parse_json("```json\n" + json.dumps(VERDICT) + "\n```", VERDICT_SCHEMA) == VERDICT
+    with pytest.raises(InvalidOutput, match="not JSON"):
+        parse_json('{"classification": "Fake', VERDICT_SCHEMA)
+
+
+def test_response_schema_drops_local_only_keys():
+    schema = response_schema(VERDICT_SCHEMA)
+    assert schema["properties"]["probability"] == {"type": "integer",
+                                                  "description": "Confidence in the classification, in percent"}
+    assert "minimum" in VERDICT_SCHEMA["properties"]["probability"]  # the original is untouched
+
+
+def test_is_transient():
+    assert is_transient(TimeoutError())
+    assert is_transient(HttpError(503))
+    assert not is_transient(HttpError(400))
+    assert not is_transient(ValueError("blocked response"))
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    clock = Clock()
+    breaker = CircuitBreaker(failures=2, reset_after=30, clock=clock)
+    breaker.record_failure()
+    breaker.before_call()  # one failure: still closed
+    breaker.record_failure()
+    with pytest.raises(LLMUnavailable) as opened:
+        breaker.before_call()
+    assert opened.value.retry_after == 30
+
+    clock.now = 31
+    breaker.before_call()  # the trial call
+    with pytest.raises(LLMUnavailable):
+        breaker.before_call()  # only one trial at a time
+    breaker.record_failure()  # failed trial: open again for a full period
+    clock.now = 45
+    with pytest.raises(LLMUnavailable):
+        breaker.before_call()
+
+    clock.now = 62
+    breaker.before_call()
+    breaker.record_success()
+    breaker.before_call()
+    breaker.before_call()  # closed
+
+
+def test_client_retries_transient_errors_and_invalid_output():
+    model = ScriptedModel(HttpError(503), "not json", json.dumps(VERDICT))
+    client = LLMClient(lambda: model, retries=2)
+    assert client.generate("prompt", VERDICT_SCHEMA) == VERDICT
+    assert model.calls == 3
+
+
+def test_client_does_not_retry_a_rejected_request():
+    model = ScriptedModel(HttpError(400), json.dumps(VERDICT))
+    client = LLMClient(lambda: model, retries=2)
+    with pytest.raises(LLMError, match="rejected"):
+        client.generate("prompt", VERDICT_SCHEMA)
+    assert model.calls == 1
+
+
+def test_client_raises_the_last_error_once_retries_are_spent():
+    model = ScriptedModel("{}", "{}")
+    client = LLMClient(lambda: model, retries=1)
+    with pytest.raises(InvalidOutput, match="missing"):
+        client.generate("prompt", VERDICT_SCHEMA)
+
+
+def test_client_stops_calling_once_the_breaker_opens():
+    model = ScriptedModel(*[HttpError(503)] * 3)
+    client = LLMClient(lambda: model, retries=5, breaker=CircuitBreaker(failures=3, reset_after=30, clock=Clock()))
+    with pytest.raises(LLMUnavailable):
+        client.generate("prompt", VERDICT_SCHEMA)
+    assert model.calls == 3
@@ -0,0 +1,66 @@
+import io
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+import media
+from media import MediaError, decode_audio, is_mp4_family
+
+# Stands in for ffmpeg: floods stderr before writing any PCM, as ffmpeg does with
+# per-packet warnings on a damaged upload. Exits with the status given in FAKE_FFMPEG_EXIT.
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys
+sys.stdin.buffer.read() if "pipe:" == sys.argv[sys.argv.index("-i") + 1] else None
+for _ in range(4000):
+    sys.stderr.write("[mp3 @ 0x55d0] Header missing, skipping one frame\\n")
+sys.stderr.flush()
+if os.environ.get("FAKE_FFMPEG_EXIT", "0") == "0":
+    sys.stdout.buffer.write(b"\\x01\\x00" * 1600)
+sys.exit(int(os.environ.get("FAKE_FFMPEG_EXIT", "0")))
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    path = tmp_path / "ffmpeg"
+    path.write_text(FAKE_FFMPEG)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def decode_with_timeout(source, timeout=20):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["pcm"] = decode_audio(source)
+        except MediaError as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "decode_audio blocked on ffmpeg's stderr"
+    return outcome
+
+
+@pytest.mark.parametrize("source", [io.BytesIO(b"ID3 damaged mp3"), "upload.mp3"])
+def test_a_chatty_ffmpeg_does_not_block_decoding(fake_ffmpeg, source):
+    assert decode_with_timeout(source)["pcm"] == b"\x01\x00" * 1600
+
+
+def test_failure_reports_the_end_of_ffmpeg_stderr(fake_ffmpeg, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_EXIT", "1")
+    error = str(decode_with_timeout(io.BytesIO(b"garbage"))["error"])
+    assert error.endswith("Header missing, skipping one frame")
+    assert len(error) <= media.FFMPEG_ERROR_TAIL
+
+
+def test_is_mp4_family_rewinds():
+    stream = io.BytesIO(b"\x00\x00\x00\x20ftypM4A rest of the file")
+    assert is_mp4_family(stream)
+    assert stream.tell() == 0
+    assert not is_mp4_family(io.BytesIO(b"RIFF\x24\x00\x00\x00WAVEfmt "))
@@ -0,0 +1,114 @@
+import pytest
+
+from conftest import insert_results
+from queries import (RESULT_COLUMNS, decode_cursor, encode_cursor, match_expression, results_export_query,
+                     results_fields, results_filters, results_page_query, search_query)
+
+REAL, FAKE = "Real (Human-Created)", "Fake (AI-Generated)"
+
+
+def fetch_page(pool, args):
+    sql, params, fields, limit = results_page_query(args)
+    conn = pool.connect()
+    try:
+        rows = [dict(zip(fields, row)) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+    cursor = encode_cursor(rows[limit - 1]["timestamp"], rows[limit - 1]["id"]) if len(rows) > limit else None
+    return rows[:limit], cursor
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("2025-06-02 10:00:00", 42)) == ("2025-06-02 10:00:00", 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor("2025-06-02", "x"), "WzFd"])
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_filters():
+    clauses, params = results_filters({"classification": FAKE, "min_ai_prob": "50", "max_ai_prob": "",
+                                       "since": "2025-06-02", "until": "2025-06-08"})
+    assert clauses == ["classification = ?", "ai_prob >= ?", "timestamp >= ?", "timestamp <= ?"]
+    assert params == [FAKE, 50.0, "2025-06-02", "2025-06-08 23:59:59"]  # a bare `until` date includes the whole day
+
+
+def test_malformed_filter_is_a_value_error():
+    with pytest.raises(ValueError):
+        results_filters({"min_ai_prob": "lots"})
+
+
+def test_fields_always_include_the_cursor_columns():
+    assert results_fields({}) == RESULT_COLUMNS
+    assert results_fields({"fields": "ai_prob, classification"}) == ["id", "classification", "ai_prob", "timestamp"]
+    with pytest.raises(ValueError, match="Unknown fields: secret"):
+        results_fields({"fields": "ai_prob,secret"})
+
+
+def test_pages_walk_every_row_once_newest_first(pool):
+    # equal timestamps are ordered by id, so the cursor must carry both
+    insert_results(pool, [(f"answer {i}", REAL, i, f"2025-06-0{1 + i // 4} 12:00:00") for i in range(10)])
+    seen, cursor = [], None
+    while True:
+        args = {"limit": "3", **({"cursor": cursor} if cursor else {})}
+        rows, cursor = fetch_page(pool, args)
+        seen += [(row["timestamp"], row["id"]) for row in rows]
+        if cursor is None:
+            break
+    assert len(seen) == 10
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_page_size_is_clamped():
+    assert results_page_query({"limit": "0"})[3] == 1
+    assert results_page_query({"limit": "100000"})[3] == 500
+
+
+def test_filtered_page_and_export(pool):
+    insert_results(pool, [("a", REAL, 10, "2025-06-01 09:00:00"), ("b", FAKE, 90, "2025-06-02 09:00:00"),
+                          ("c", FAKE, 60, "2025-06-03 09:00:00"), ("d", FAKE, 95, "2025-06-09 09:00:00")])
+    args = {"classification": FAKE, "min_ai_prob": "70", "until": "2025-06-08"}
+    rows, cursor = fetch_page(pool, args)
+    assert [row["transcription"] for row in rows] == ["b"] and cursor is None
+
+    sql, params, fields = results_export_query({"classification": FAKE, "fields": "transcription"})
+    conn = pool.connect()
+    try:
+        assert fields == ["id", "transcription", "timestamp"]
+        assert [row[1] for row in conn.execute(sql, params)] == ["b", "c", "d"]  # oldest first
+    finally:
+        conn.close()
+
+
+def test_match_expression_quotes_every_term():
+    assert match_expression('led the "migration"') == '"led" "the" """migration"""'
+    assert match_expression("led the migration", phrase=True) == '"led the migration"'
+    with pytest.raises(ValueError):
+        match_expression("   ")
+
+
+@pytest.mark.parametrize("query", ['migration AND', 'NEAR(led', '"', '*', 'col:umn', '-led ^the'])
+def test_search_accepts_fts_syntax_as_plain_text(pool, query):
+    insert_results(pool, [("I led the migration AND it went fine", REAL, 20, "2025-06-01 09:00:00")])
+    sql, params, _, _, _ = search_query({"q": query})
+    conn = pool.connect()
+    try:
+        conn.execute(sql, params).fetchall()  # must not raise an FTS5 syntax error
+    finally:
+        conn.close()
+
+
+def test_search_ranks_and_filters(pool):
+    insert_results(pool, [("we migrated the database", REAL, 20, "2025-06-01 09:00:00"),
+                          ("the migration of the migration", FAKE, 80, "2025-06-02 09:00:00"),
+                          ("unrelated answer", FAKE, 80, "2025-06-03 09:00:00")])
+    sql, params, fields, _, _ = search_query({"q": "migration", "classification": FAKE})
+    conn = pool.connect()
+    try:
+        rows = [dict(zip(fields, row)) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+    assert len(rows) == 1
+    assert "[migration]" in rows[0]["transcription_snippet"]
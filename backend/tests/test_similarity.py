@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+import similarity
+import storage
+from similarity import LSHIndex, SimilarityIndex, estimate_jaccard, shingle_hashes, signature
+
+BASE = ("so in my last role I led the migration of our billing system to the new platform and "
+        "we cut the monthly processing time from three days to about four hours")
+
+
+def save(pool, index, texts, file_hash=None):
+    """Insert results the way backend.save_results does; returns their ids."""
+    values = [(text, "Real (Human-Created)", 80, 20, "- Justification: test", "2025-06-01 09:00:00", file_hash)
+              for text in texts]
+    conn = pool.connect()
+    try:
+        conn.executemany(storage.RESULTS_INSERT, values)
+        index.store_inserted(conn, values)
+        conn.commit()
+        return [row[0] for row in conn.execute("SELECT id FROM results ORDER BY id DESC LIMIT ?", (len(values),))][::-1]
+    finally:
+        conn.close()
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert np.array_equal(shingle_hashes("I led, the MIGRATION."), shingle_hashes("i led the migration"))
+    assert len(shingle_hashes("")) == 0
+    assert len(shingle_hashes("two words")) == 1
+
+
+def test_signature_estimates_jaccard():
+    assert signature("") is None
+    assert estimate_jaccard(signature(BASE), signature(BASE.upper())) == 1.0
+    edited = BASE.replace("billing", "payroll")  # 3 of 27 shingles change: true Jaccard 24/30 = 0.8
+    assert estimate_jaccard(signature(BASE), signature(edited)) == pytest.approx(0.8, abs=0.15)
+    assert estimate_jaccard(signature(BASE), signature("what a lovely day for a walk in the park")) < 0.1
+
+
+def test_lsh_finds_near_duplicates_across_merges(monkeypatch):
+    monkeypatch.setattr(similarity, "LSH_MERGE_EVERY", 4)
+    index = LSHIndex()
+    texts = [f"answer number {i} about something else entirely {i * 7}" for i in range(10)] + [BASE]
+    index.add_many(np.arange(len(texts)), np.stack([signature(text) for text in texts]))
+    assert index.size == len(texts)
+    assert 10 in index.candidates(signature(BASE.replace("four", "five")))
+    assert 10 not in index.candidates(signature("what a lovely day for a walk in the park"))
+
+
+def test_similar_reports_matches_best_first(pool):
+    index = SimilarityIndex(pool.connect, threshold=0.5)
+    exact, edited, _ = save(pool, index, [BASE, BASE.replace("billing", "payroll"), "an unrelated answer entirely"])
+    matches = index.similar(BASE)
+    assert [match["id"] for match in matches] == [exact, edited]
+    assert matches[0]["jaccard"] == 1.0
+
+
+def test_similar_leaves_out_the_same_upload(pool):
+    index = SimilarityIndex(pool.connect)
+    own, = save(pool, index, [BASE], file_hash="abc")
+    other, = save(pool, index, [BASE], file_hash="def")
+    live, = save(pool, index, [BASE])
+    assert {match["id"] for match in index.similar(BASE, file_hash="abc")} == {other, live}
+    assert {match["id"] for match in index.similar(BASE)} == {own, other, live}
+
+
+def test_similar_looks_candidates_up_in_chunks(pool, monkeypatch):
+    monkeypatch.setattr(similarity, "LOOKUP_CHUNK", 2)
+    index = SimilarityIndex(pool.connect, max_results=10)
+    ids = save(pool, index, [BASE] * 5)
+    assert sorted(match["id"] for match in index.similar(BASE)) == ids
+
+
+def test_index_sees_rows_written_by_another_process(pool):
+    writer, reader = SimilarityIndex(pool.connect), SimilarityIndex(pool.connect)
+    reader.refresh()
+    row_id, = save(pool, writer, [BASE])
+    assert [match["id"] for match in reader.similar(BASE)] == [row_id]
+
+
+def test_keep_newest_drops_the_oldest_ids(monkeypatch):
+    monkeypatch.setattr(similarity, "LSH_MERGE_EVERY", 4)
+    index = LSHIndex()
+    texts = [BASE] + [f"answer number {i} about something else entirely {i * 7}" for i in range(9)]
+    index.add_many(np.arange(len(texts)), np.stack([signature(text) for text in texts]))
+    index.keep_newest(3)
+    assert index.size == 3
+    assert 0 not in index.candidates(signature(BASE))
+    assert 9 in index.candidates(signature(texts[9]))
+
+
+def test_only_the_newest_transcripts_are_indexed(pool):
+    writer = SimilarityIndex(pool.connect)
+    old, = save(pool, writer, [BASE])
+    save(pool, writer, [f"answer number {i} about something else entirely" for i in range(4)])
+    index = SimilarityIndex(pool.connect, max_indexed=4)
+    index.refresh()
+    assert index.lsh.size == 4  # a cold load skips the oldest rows
+    assert index.similar(BASE) == []
+    new, = save(pool, writer, [BASE])
+    assert [match["id"] for match in index.similar(BASE)] == [new]
+    save(pool, writer, [f"another answer {i} on a different topic" for i in range(3)])
+    index.refresh()
+    assert index.lsh.size == 4  # grew a quarter past the cap, trimmed back
+    assert old not in index.lsh.candidates(signature(BASE))
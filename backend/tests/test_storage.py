@@ -0,0 +1,78 @@
+import sqlite3
+
+import storage
+from storage import MIGRATIONS, ConnectionPool, WriteBehindBuffer
+
+
+def tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+
+
+def test_migrate_creates_the_schema_once(tmp_path):
+    pool = ConnectionPool(path=str(tmp_path / "results.db"))
+    assert pool.migrate() == len(MIGRATIONS)
+    assert pool.migrate() == len(MIGRATIONS)  # nothing left to apply
+    conn = pool.connect()
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+        assert {"results", "jobs", "cache", "batches", "results_fts", "result_minhash", "gaze_series",
+                "idx_results_timestamp", "idx_gaze_series_file"} <= tables(conn)
+    finally:
+        conn.close()
+
+
+def test_migrate_upgrades_a_database_from_before_migrations(tmp_path):
+    path = str(tmp_path / "results.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE results (id INTEGER PRIMARY KEY AUTOINCREMENT, transcription TEXT, "
+                 "classification TEXT, human_prob REAL, ai_prob REAL, justification TEXT, timestamp TEXT)")
+    conn.execute("INSERT INTO results (transcription, timestamp) VALUES ('we shipped it on time', '2025-01-01')")
+    conn.commit()
+    conn.close()
+
+    pool = ConnectionPool(path=path)
+    pool.migrate()
+    conn = pool.connect()
+    try:
+        # the full-text index is backfilled with the existing row
+        assert conn.execute("SELECT rowid FROM results_fts WHERE results_fts MATCH 'shipped'").fetchall() == [(1,)]
+    finally:
+        conn.close()
+
+
+def test_migrate_resumes_from_the_recorded_version(tmp_path):
+    pool = ConnectionPool(path=str(tmp_path / "results.db"))
+    assert pool.migrate(MIGRATIONS[:6]) == 6
+    assert pool.migrate() == len(MIGRATIONS)
+
+
+def test_released_connections_are_reused_without_open_transactions(tmp_path):
+    pool = ConnectionPool(path=str(tmp_path / "results.db"), size=1)
+    pool.migrate()
+    conn = pool.connect()
+    raw = conn._conn
+    conn.execute("INSERT INTO jobs (id, status) VALUES ('a', 'queued')")  # left uncommitted
+    conn.close()
+    again = pool.connect()
+    try:
+        assert again._conn is raw
+        assert not again.in_transaction
+        assert again.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+    finally:
+        again.close()
+
+
+def test_write_behind_buffer_flushes_in_one_transaction(pool):
+    seen = []
+    buffer = WriteBehindBuffer(pool, storage.RESULTS_INSERT, interval=60,
+                               after_insert=lambda conn, rows: seen.append(len(rows)))
+    row = ("answer", "Real (Human-Created)", 80, 20, "- Justification: test", "2025-06-01 09:00:00", None)
+    buffer.add([row])
+    buffer.add([row, row])
+    buffer.flush()
+    conn = pool.connect()
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 3
+    finally:
+        conn.close()
+    assert seen == [3]
@@ -0,0 +1,44 @@
+import numpy as np
+
+from transcription import VAD_MAX_CHUNK_S, split_on_silence
+
+RATE = 16000
+
+
+def pcm(*segments, seed=0):
+    """int16 PCM bytes from (seconds, amplitude) segments of noise (amplitude 0 = digital silence)."""
+    rng = np.random.default_rng(seed)
+    parts = [rng.normal(0, amplitude, int(seconds * RATE)) if amplitude else np.zeros(int(seconds * RATE))
+             for seconds, amplitude in segments]
+    return np.concatenate(parts).astype(np.int16).tobytes()
+
+
+def test_splits_at_a_long_pause():
+    chunks = split_on_silence(pcm((3, 3000), (1, 10), (3, 3000)), RATE)
+    assert len(chunks) == 2
+    (first_start, first_end), (second_start, second_end) = chunks
+    assert first_start == 0 and second_end == 7 * RATE
+    assert 3 * RATE <= first_end <= second_start <= 4 * RATE  # the cut lies inside the pause
+
+
+def test_short_chunks_are_merged():
+    # 0.5 s words with 0.6 s pauses: every pause is a split point, but chunks stay >= 2 s
+    chunks = split_on_silence(pcm(*[(0.5, 3000), (0.6, 10)] * 6), RATE)
+    assert 1 < len(chunks) < 6
+    assert all(end - start >= 2 * RATE for start, end in chunks[:-1])
+
+
+def test_speech_without_pauses_is_one_chunk():
+    assert split_on_silence(pcm((5, 3000)), RATE) == [(0, 5 * RATE)]
+
+
+def test_silence_has_no_chunks():
+    assert split_on_silence(pcm((3, 0)), RATE) == []
+    assert split_on_silence(b"", RATE) == []
+
+
+def test_chunks_are_capped():
+    chunks = split_on_silence(pcm((70, 3000)), RATE)
+    assert all(end - start <= VAD_MAX_CHUNK_S * RATE for start, end in chunks)
+    assert chunks[0][0] == 0 and chunks[-1][1] == 70 * RATE
+    assert all(end == start for (_, end), (start, _) in zip(chunks, chunks[1:]))  # contiguous, no gaps
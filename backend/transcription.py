@@ -0,0 +1,160 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+from media import SAMPLE_RATE, SAMPLE_WIDTH
+
+# -------------------- CONFIGURATION --------------------
+TRANSCRIBE_MODE = os.environ.get("TRANSCRIBE_MODE", "segmented")  # "segmented" or "single"
+TRANSCRIBE_WORKERS = int(os.environ.get("TRANSCRIBE_WORKERS", 4))  # concurrent chunk requests
+TRANSCRIBE_RETRIES = 2  # extra attempts per chunk after a service error
+TRANSCRIBE_BACKOFF = 0.5  # seconds, doubled per retry
+
+# Energy-based voice activity detection
+VAD_FRAME_MS = 30
+VAD_MIN_SILENCE_MS = 400  # silences at least this long are split points
+VAD_MIN_CHUNK_S = 2.0  # avoid tiny chunks: merge until at least this long
+VAD_MAX_CHUNK_S = 30.0  # hard cap per recognition request
+VAD_PADDING_MS = 150  # silence kept around each chunk so words are not clipped
+
+
+class GoogleRecognizer:
+    """Default chunk recognizer: Google Web Speech via speech_recognition.
+
+    Recognizers are callables `(pcm, sample_rate) -> text`; they return "" when the
+    chunk contains no intelligible speech and raise for errors worth retrying.
+    """
+
+    def __init__(self, language="en"):
+        self.language = language
+
+    def __call__(self, pcm, sample_rate):
+        import speech_recognition as sr  # imported on first use; API-only processes never need it
+        audio = sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+        try:
+            return sr.Recognizer().recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            return ""
+
+
+default_recognizer = GoogleRecognizer()
+
+
+def warm_up():
+    """Import the speech recognition client before the first request needs it."""
+    import speech_recognition  # noqa: F401
+
+
+def frame_energies(samples, sample_rate=SAMPLE_RATE, frame_ms=VAD_FRAME_MS):
+    """RMS energy of consecutive non-overlapping frames."""
+    frame = int(sample_rate * frame_ms / 1000)
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros(0)
+    frames = samples[:count * frame].astype(np.float32).reshape(count, frame)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def speech_threshold(energies):
+    """Frame energy above which a frame counts as speech.
+
+    Adapts to the recording: a multiple of its quietest frames, capped at half of its
+    loudest so recordings without any pause still count as speech, with an absolute
+    floor for digitally silent input.
+    """
+    return max(min(np.percentile(energies, 10) * 3.0, np.percentile(energies, 90) * 0.5), 200.0)
+
+
+def split_on_silence(pcm, sample_rate=SAMPLE_RATE):
+    """Split PCM into (start, end) sample ranges at silences, using frame energy.
+
+    Frames louder than speech_threshold() are speech. Chunks are merged up to
+    VAD_MIN_CHUNK_S and cut to at most VAD_MAX_CHUNK_S.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    energies = frame_energies(samples, sample_rate)
+    if len(energies) == 0:
+        return []
+    frame = int(sample_rate * VAD_FRAME_MS / 1000)
+    voiced = energies > speech_threshold(energies)
+    if not voiced.any():
+        return []
+
+    # speech regions are runs of voiced frames separated by less than the minimum silence
+    min_silence = max(1, VAD_MIN_SILENCE_MS // VAD_FRAME_MS)
+    voiced_idx = np.flatnonzero(voiced)
+    gaps = np.flatnonzero(np.diff(voiced_idx) > min_silence)
+    starts = np.concatenate(([voiced_idx[0]], voiced_idx[gaps + 1]))
+    ends = np.concatenate((voiced_idx[gaps], [voiced_idx[-1]])) + 1
+
+    padding = int(sample_rate * VAD_PADDING_MS / 1000)
+    min_len = int(sample_rate * VAD_MIN_CHUNK_S)
+    max_len = int(sample_rate * VAD_MAX_CHUNK_S)
+    chunks = []
+    for start, end in zip(starts * frame, ends * frame):
+        start, end = max(0, int(start) - padding), min(len(samples), int(end) + padding)
+        if chunks and (end - chunks[-1][0] <= max_len) and (chunks[-1][1] - chunks[-1][0] < min_len):
+            chunks[-1] = (chunks[-1][0], end)
+            continue
+        if chunks:
+            start = max(start, chunks[-1][1])
+        chunks.append((start, end))
+
+    bounded = []
+    for start, end in chunks:
+        while end - start > max_len:
+            bounded.append((start, start + max_len))
+            start += max_len
+        bounded.append((start, end))
+    return bounded
+
+
+def recognize_chunk(index, pcm, start, end, sample_rate, recognizer, retries):
+    """Recognize one chunk with retry and exponential backoff; never raises."""
+    began = time.perf_counter()
+    chunk = {"index": index, "start": round(start / sample_rate, 2), "end": round(end / sample_rate, 2)}
+    for attempt in range(retries + 1):
+        try:
+            chunk.update(text=recognizer(pcm[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH], sample_rate), ok=True, error=None)
+            break
+        except Exception as e:
+            chunk.update(text="", ok=False, error=str(e) or type(e).__name__)
+            if attempt < retries:
+                time.sleep(TRANSCRIBE_BACKOFF * (2 ** attempt) * (0.5 + random.random()))
+    chunk["attempts"] = attempt + 1
+    chunk["ms"] = round((time.perf_counter() - began) * 1000, 1)
+    return chunk
+
+
+def transcribe_segmented(pcm, sample_rate=SAMPLE_RATE, recognizer=None, mode=None,
+                         workers=TRANSCRIBE_WORKERS, retries=TRANSCRIBE_RETRIES):
+    """Transcribe PCM chunk by chunk and stitch the text back in order.
+
+    In "segmented" mode the audio is split at silences and chunks are recognized
+    concurrently on a bounded thread pool; "single" sends the whole recording as one
+    chunk. Failed chunks are retried and otherwise reported, so a single failure only
+    loses its own words. Returns {"text", "chunks", "complete", "failed_chunks"}.
+    """
+    recognizer = recognizer or default_recognizer
+    mode = mode or TRANSCRIBE_MODE
+    total = len(pcm) // SAMPLE_WIDTH
+    bounds = split_on_silence(pcm, sample_rate) if mode == "segmented" else [(0, total)]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(bounds) or 1))) as executor:
+        chunks = list(executor.map(lambda args: recognize_chunk(args[0], pcm, *args[1], sample_rate, recognizer, retries),
+                                   enumerate(bounds)))
+
+    for chunk in chunks:
+        metrics.observe("truthscan_recognizer_seconds", chunk["ms"] / 1000)
+        metrics.inc("truthscan_transcribe_chunks_total", status="ok" if chunk["ok"] else "failed")
+    failed = sum(not chunk["ok"] for chunk in chunks)
+    return {
+        "text": " ".join(chunk["text"].strip() for chunk in chunks if chunk["text"].strip()),
+        "chunks": chunks,
+        "complete": failed == 0,
+        "failed_chunks": failed,
+    }
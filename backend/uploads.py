@@ -0,0 +1,124 @@
+import fcntl
+import os
+import re
+import time
+import uuid
+
+from flask import Request
+
+from media import SpoolFile, CHUNK_SIZE
+
+# -------------------- CONFIGURATION --------------------
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", os.path.join("uploads", "partial"))  # resumable uploads in progress
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 4 * 1024 ** 3))
+UPLOAD_EXPIRY_S = 24 * 3600  # unfinished uploads older than this are removed
+SPOOL_MIN_BYTES = 500 * 1024  # smaller request bodies are parsed in memory as before
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadRequest(Request):
+    """Request whose multipart file parts are written straight to a hashing SpoolFile."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= SPOOL_MIN_BYTES:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return SpoolFile(suffix=os.path.splitext(filename or "")[1][:8])
+
+
+class UploadNotFound(Exception):
+    """Raised for an unknown or expired upload id."""
+
+
+class UploadConflict(Exception):
+    """Raised when a chunk does not start at the upload's current offset, or another chunk is being written."""
+
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload grows beyond UPLOAD_MAX_BYTES."""
+
+
+class UploadStore:
+    """Resumable uploads kept as `<id>.part` files under `directory`.
+
+    A client creates an upload, appends chunks at the offset the server reports
+    (resuming after a dropped connection from GET /uploads/<id>) and then analyzes
+    it by id. The file is the only state, so API processes sharing the directory
+    can serve chunks of the same upload; concurrent appends are refused via flock.
+    """
+
+    def __init__(self, directory=UPLOAD_DIR, max_bytes=UPLOAD_MAX_BYTES, expiry=UPLOAD_EXPIRY_S):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.expiry = expiry
+
+    def _path(self, upload_id):
+        if not _UPLOAD_ID.match(upload_id or ""):
+            raise UploadNotFound(upload_id)
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def create(self):
+        """Start an empty upload; returns its id."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.expire()
+        upload_id = uuid.uuid4().hex
+        open(self._path(upload_id), "xb").close()
+        return upload_id
+
+    def offset(self, upload_id):
+        """Bytes received so far."""
+        try:
+            return os.path.getsize(self._path(upload_id))
+        except FileNotFoundError:
+            raise UploadNotFound(upload_id)
+
+    def append(self, upload_id, offset, stream):
+        """Copy `stream` to the end of the upload if it is at `offset`; returns the new offset."""
+        try:
+            f = open(self._path(upload_id), "r+b")
+        except FileNotFoundError:
+            raise UploadNotFound(upload_id)
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadConflict(os.fstat(f.fileno()).st_size)
+            size = f.seek(0, os.SEEK_END)
+            if offset != size:
+                raise UploadConflict(size)
+            try:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    if size + len(chunk) > self.max_bytes:
+                        raise UploadTooLarge()
+                    f.write(chunk)
+                    size += len(chunk)
+            finally:
+                f.flush()  # keep what arrived so the client can resume from here
+            return size
+
+    def path(self, upload_id):
+        """Path of an upload's data; the caller removes or moves the file once it has used it."""
+        path = self._path(upload_id)
+        if not os.path.exists(path):
+            raise UploadNotFound(upload_id)
+        return path
+
+    def delete(self, upload_id):
+        try:
+            os.remove(self._path(upload_id))
+        except FileNotFoundError:
+            raise UploadNotFound(upload_id)
+
+    def expire(self):
+        """Remove uploads not written to for `expiry` seconds."""
+        cutoff = time.time() - self.expiry
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".part") and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
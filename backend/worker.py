@@ -0,0 +1,30 @@
+"""Analysis worker: runs jobs queued through POST /jobs without serving HTTP.
+
+Usage:
+    BACKEND_ROLE=api python backend.py     # HTTP only (or any WSGI server, e.g. gunicorn backend:app)
+    python worker.py                       # one or more analysis worker processes
+
+Workers share the API's database (DB_PATH) and upload directory (JOB_UPLOAD_DIR),
+so start them from the same directory. Each runs JOB_WORKERS analysis threads and
+loads Gemini, OpenCV/MediaPipe and the speech client before taking the first job.
+"""
+import os
+import time
+
+os.environ.setdefault("BACKEND_ROLE", "worker")
+os.environ.setdefault("PRELOAD_ANALYZERS", "1")
+
+import backend  # noqa: E402  (starts the job workers on import)
+
+
+def main():
+    print(f"Analysis worker {os.getpid()} running {backend.job_queue.workers} job threads", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 
 import streamlit as st
-import base64
-import requests
-import os
+import tempfile
 import numpy as np
 import sounddevice as sd
 import wavio
 import threading
-import speech_recognition as sr
+
+import client
 
 # -------------------- CONFIGURATION --------------------
 # Flask API URL
-FLASK_API_URL = "http://localhost:5000"
+FLASK_API_URL = client.API_URL
+
+# Saved results shown per page
+RESULTS_PAGE_SIZE = 20
 
 # Supported language (English only)
 SUPPORTED_LANGUAGES = {"en": "English"}
@@ -24,7 +26,11 @@ if "transcription" not in st.session_state:
 if "gaze_percentage" not in st.session_state:
     st.session_state["gaze_percentage"] = 0.0
 if "audio_file" not in st.session_state:
-    st.session_state["audio_file"] = None
+    st.session_state["audio_file"] = None  # path of a recording or an uploaded file object, never a bytes copy
+if "video_file" not in st.session_state:
+    st.session_state["video_file"] = None
+if "uploaded_file_id" not in st.session_state:
+    st.session_state["uploaded_file_id"] = None  # the uploader's file last taken as the source
 
 # -------------------- TITLE --------------------
 st.title("🎙️ AI-TruthScan: Detect AI-Generated Interview Responses")
@@ -34,23 +40,20 @@ with st.expander("📁 Upload Audio or Video File", expanded=True):
     upload_option = st.radio("Select file type to upload", ("Audio", "Video"))
     if upload_option == "Audio":
         uploaded_file = st.file_uploader("Upload an audio file (mp3, wav, m4a)", type=["mp3", "wav", "m4a"])
+        # the uploader keeps returning its file on every rerun; only a new upload replaces a later recording
+        if uploaded_file and uploaded_file.file_id != st.session_state["uploaded_file_id"]:
+            st.session_state["uploaded_file_id"] = uploaded_file.file_id
+            client.discard_recording(st.session_state["audio_file"])
+            st.session_state["audio_file"] = uploaded_file
+            st.session_state["video_file"] = None
         if uploaded_file:
-            audio_bytes = uploaded_file.read()
-            st.session_state["audio_file"] = audio_bytes
-            b64_audio = base64.b64encode(audio_bytes).decode()
-            audio_html = f"""
-            <audio controls>
-                <source src="data:audio/wav;base64,{b64_audio}" type="audio/wav">
-            </audio>
-            """
-            st.components.v1.html(audio_html, height=70)
+            st.audio(uploaded_file)
     else:
         uploaded_file = st.file_uploader("Upload a video file (mp4, mov)", type=["mp4", "mov"])
-        if uploaded_file:
-            video_path = "temp_video.mp4"
-            with open(video_path, "wb") as f:
-                f.write(uploaded_file.read())
-            st.session_state["video_file"] = video_path
+        if uploaded_file and uploaded_file.file_id != st.session_state["uploaded_file_id"]:
+            st.session_state["uploaded_file_id"] = uploaded_file.file_id
+            client.discard_recording(st.session_state["audio_file"])
+            st.session_state["video_file"] = uploaded_file
             st.session_state["audio_file"] = None
 
 # -------------------- RECORDING SECTION --------------------
@@ -67,12 +70,12 @@ with st.expander("🎧 Live Audio Recording", expanded=True):
                     data = stream.read(fs // 10)[0]  # Read in chunks
                     recording.append(data)
             audio_data = np.concatenate(recording, axis=0)
-            wav_path = "temp_audio.wav"
-            # Save audio as WAV file
+            # Save audio as WAV file; it is streamed from disk when analyzed
+            wav_path = tempfile.NamedTemporaryFile(prefix="truthscan_", suffix=".wav", delete=False).name
             wavio.write(wav_path, audio_data, fs, sampwidth=2)
-            with open(wav_path, "rb") as f:
-                st.session_state["audio_file"] = f.read()
-            os.remove(wav_path)
+            client.discard_recording(st.session_state["audio_file"])  # the previous recording
+            st.session_state["audio_file"] = wav_path
+            st.session_state["video_file"] = None
             st.session_state["recording_audio"] = False
             st.write("Audio recording complete.")
 
@@ -87,48 +90,50 @@ with st.expander("🧠 Analysis Settings", expanded=True):
     threshold = st.slider("Set AI-Generated Probability Threshold (%)", 0, 100, 50)
 
 if st.button("🧠 Analyze"):
-    if st.session_state["audio_file"]:
+    source = st.session_state["audio_file"] or st.session_state["video_file"]
+    if source:
         with st.spinner("Analyzing..."):
-            files = {"file": ("audio.wav", st.session_state["audio_file"], "audio/wav")}
-            data = {
-                "file_type": "audio",
-                "context": context,
-                "threshold": str(threshold)
-            }
+            file_type = "audio" if st.session_state["audio_file"] else "video"
+            if not isinstance(source, str):
+                source.seek(0)
 
             try:
-                response = requests.post(f"{FLASK_API_URL}/analyze", files=files, data=data)
-                result = response.json()
-                if "error" in result:
-                    st.error(f"Error: {result['error']}")
-                else:
-                    st.session_state["transcription"] = result["transcription"]
-                    st.session_state["gaze_percentage"] = result["gaze_percentage"]
-
-                    st.subheader("📊 Analysis Result")
-                    st.markdown(f"**Transcription:**\n\n{result['transcription']}")
-                    st.markdown(f"**Gaze Analysis:** Looking away {result['gaze_percentage']:.2f}% of the time")
-                    st.markdown("---")
-                    st.markdown(f"**Classification:** {result['classification']}")
-                    st.markdown(f"**Probabilities:** Real (Human-Created) - {result['human_prob']}% | Fake (AI-Generated) - {result['ai_prob']}%")
-                    st.markdown(f"**Justification:**\n\n{result['justification']}")
+                result = client.analyze(source, file_type, context, threshold, api_url=FLASK_API_URL)
+                st.session_state["transcription"] = result["transcription"]
+                st.session_state["gaze_percentage"] = result["gaze_percentage"]
+
+                st.subheader("📊 Analysis Result")
+                st.markdown(f"**Transcription:**\n\n{result['transcription']}")
+                st.markdown(f"**Gaze Analysis:** Looking away {result['gaze_percentage']:.2f}% of the time")
+                st.markdown("---")
+                st.markdown(f"**Classification:** {result['classification']}")
+                st.markdown(f"**Probabilities:** Real (Human-Created) - {result['human_prob']}% | Fake (AI-Generated) - {result['ai_prob']}%")
+                st.markdown(f"**Justification:**\n\n{result['justification']}")
+            except client.ApiError as e:
+                st.error(f"Error: {e}")
             except Exception as e:
                 st.error(f"Error analyzing file: {e}")
     else:
-        st.warning("⚠️ No audio file available for analysis.")
+        st.warning("⚠️ No audio or video file available for analysis.")
 
 # -------------------- VIEW SAVED RESULTS --------------------
 with st.expander("📂 View Saved Results"):
     try:
-        response = requests.get(f"{FLASK_API_URL}/results")
-        results = response.json()
-        for result in results:
+        page = client.get_results(st.session_state.get("results_cursor"), RESULTS_PAGE_SIZE, api_url=FLASK_API_URL)
+        for result in page["results"]:
             st.markdown(f"**ID:** {result['id']} | **Timestamp:** {result['timestamp']}")
             st.markdown(f"**Transcription:** {result['transcription']}")
             st.markdown(f"**Classification:** {result['classification']}")
             st.markdown(f"**Probabilities:** Real - {result['human_prob']}% | Fake - {result['ai_prob']}%")
             st.markdown(f"**Justification:** {result['justification']}")
             st.markdown("---")
+        col1, col2 = st.columns(2)
+        if st.session_state.get("results_cursor") and col1.button("⬅️ Newest results"):
+            st.session_state["results_cursor"] = None
+            st.rerun()
+        if page["next_cursor"] and col2.button("Older results ➡️"):
+            st.session_state["results_cursor"] = page["next_cursor"]
+            st.rerun()
     except Exception as e:
         st.error(f"Error fetching saved results: {e}")
 
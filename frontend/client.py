@@ -0,0 +1,148 @@
+import os
+import uuid
+
+import requests
+
+# -------------------- CONFIGURATION --------------------
+API_URL = os.environ.get("TRUTHSCAN_API_URL", "http://localhost:5000")
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # bytes per resumable-upload request
+RESUMABLE_MIN_BYTES = 64 * 1024 * 1024  # files at least this large use resumable uploads
+UPLOAD_RETRIES = 5  # attempts per chunk before giving up
+READ_SIZE = 1024 * 1024
+
+
+class ApiError(Exception):
+    """The backend answered with an error; the message is the backend's."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _size(source):
+    """Length in bytes of a path or a seekable file object, without reading it."""
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size - position
+
+
+def _error(response):
+    try:
+        message = response.json().get("error")
+    except ValueError:
+        message = None
+    return ApiError(message or f"HTTP {response.status_code}", response.status_code)
+
+
+class MultipartBody:
+    """multipart/form-data body that reads the file as it is sent.
+
+    requests builds `files=` bodies in memory; this one has a known length (so no
+    chunked encoding is needed) and holds at most READ_SIZE bytes of the file.
+    """
+
+    def __init__(self, fields, name, filename, source, content_type="application/octet-stream"):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        head = b"".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode()
+            for key, value in fields.items())
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                 f'Content-Type: {content_type}\r\n\r\n').encode()
+        self._parts = [head, source, f"\r\n--{self.boundary}--\r\n".encode()]
+        self._length = len(head) + _size(source) + len(self._parts[2])
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        yield self._parts[0]
+        source = self._parts[1]
+        f = open(source, "rb") if isinstance(source, str) else source
+        try:
+            yield from iter(lambda: f.read(READ_SIZE), b"")
+        finally:
+            if f is not source:
+                f.close()
+        yield self._parts[2]
+
+
+def upload_resumable(source, api_url=API_URL, session=None, chunk_size=UPLOAD_CHUNK_SIZE, progress=None):
+    """Send a path or seekable file to /uploads in chunks; returns the upload id.
+
+    A failed chunk is retried from the offset the server reports, so a dropped
+    connection costs at most one chunk. `progress(sent, total)` is called per chunk.
+    """
+    session = session or requests.Session()
+    response = session.post(f"{api_url}/uploads")
+    if response.status_code != 201:
+        raise _error(response)
+    upload_id = response.json()["upload_id"]
+    total = _size(source)
+    f = open(source, "rb") if isinstance(source, str) else source
+    start = f.tell()
+    try:
+        offset, failures = 0, 0
+        while offset < total:
+            f.seek(start + offset)
+            chunk = f.read(chunk_size)
+            try:
+                response = session.patch(f"{api_url}/uploads/{upload_id}", data=chunk,
+                                         headers={"Upload-Offset": str(offset)})
+            except requests.ConnectionError:
+                response = None
+            if response is not None and response.status_code == 200:
+                offset, failures = response.json()["offset"], 0
+            elif response is not None and response.status_code not in (409, 500, 502, 503):
+                raise _error(response)
+            else:
+                failures += 1
+                if failures >= UPLOAD_RETRIES:
+                    raise ApiError(f"Upload failed after {failures} attempts at offset {offset}")
+                offset = session.get(f"{api_url}/uploads/{upload_id}").json()["offset"]
+            if progress:
+                progress(offset, total)
+    finally:
+        if f is not source:
+            f.close()
+    return upload_id
+
+
+def analyze(source, file_type, context, threshold, filename=None, api_url=API_URL, session=None, progress=None):
+    """Analyze a recording or upload (a path or a seekable binary file object) with POST /analyze.
+
+    Files of RESUMABLE_MIN_BYTES or more go through upload_resumable() first; smaller
+    ones are streamed as one multipart request. Returns the result dict or raises ApiError.
+    """
+    session = session or requests.Session()
+    fields = {"file_type": file_type, "context": context, "threshold": str(threshold)}
+    if _size(source) >= RESUMABLE_MIN_BYTES:
+        fields["upload_id"] = upload_resumable(source, api_url, session, progress=progress)
+        response = session.post(f"{api_url}/analyze", data=fields)
+    else:
+        filename = filename or (os.path.basename(source) if isinstance(source, str) else getattr(source, "name", "upload"))
+        body = MultipartBody(fields, "file", os.path.basename(filename), source)
+        response = session.post(f"{api_url}/analyze", data=body, headers={"Content-Type": body.content_type})
+    if response.status_code != 200:
+        raise _error(response)
+    return response.json()
+
+
+def get_results(cursor=None, limit=20, api_url=API_URL, session=None):
+    """One page of saved results: {"results": [...], "next_cursor": ...}."""
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    response = (session or requests).get(f"{api_url}/results", params=params)
+    if response.status_code != 200:
+        raise _error(response)
+    return response.json()
+
+
+def discard_recording(source):
+    """Delete a temporary recording that is being replaced; uploaded file objects and None are left alone."""
+    if isinstance(source, str) and os.path.exists(source):
+        os.remove(source)